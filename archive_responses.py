@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Archival job that moves responses of long-closed forms to the archive tier
+
+Usage:
+    python archive_responses.py                          # every form past the policy window
+    python archive_responses.py --dry-run                # only list them
+    python archive_responses.py --older-than-days 365
+    python archive_responses.py --form-id 12             # archive one form regardless of the policy
+"""
+
+import argparse
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from db import SessionLocal
+from utils.archival import ARCHIVE_AFTER_DAYS, archivable_forms, archive_form
+
+
+def run(form_ids, older_than_days, dry_run):
+    """Archive the given forms (or all forms past the policy window), returns True if none failed"""
+    db = SessionLocal()
+    try:
+        if not form_ids:
+            form_ids = archivable_forms(db, older_than_days=older_than_days)
+        print(f"{len(form_ids)} forms to archive")
+        if dry_run:
+            for form_id in form_ids:
+                print(f"  form {form_id}")
+            return True
+
+        failed = 0
+        for form_id in form_ids:
+            try:
+                summary = archive_form(db, form_id, SessionLocal)
+                print(
+                    f"✅ Form {form_id}: {summary['responses']} responses, {summary['fields']} answers, "
+                    f"{summary['voice_files']} voice files archived"
+                )
+            except Exception as e:
+                failed += 1
+                db.rollback()
+                print(f"❌ Form {form_id}: archival failed: {str(e)}")
+        return failed == 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move responses of closed forms to the archive tier")
+    parser.add_argument("--form-id", type=int, action="append", dest="form_ids", help="Form to archive (repeatable)")
+    parser.add_argument("--older-than-days", type=float, default=ARCHIVE_AFTER_DAYS, help="Policy window for closed forms")
+    parser.add_argument("--dry-run", action="store_true", help="List the forms without archiving them")
+    args = parser.parse_args()
+
+    print("Running response archival...")
+    success = run(args.form_ids, args.older_than_days, args.dry_run)
+    if success:
+        print("\n🎉 Archival completed successfully!")
+    else:
+        print("\n❌ Archival failed for some forms!")
+        sys.exit(1)
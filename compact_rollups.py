@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Maintenance job for the response rollups behind the trends endpoint
+
+Compaction drops hourly buckets past ROLLUP_HOURLY_RETENTION_DAYS (the daily
+buckets cover them). Rebuilding recomputes a form's rollups from its responses,
+to backfill forms that predate the rollups or to correct drift after answers
+were deleted.
+
+Usage:
+    python compact_rollups.py                              # compact once
+    python compact_rollups.py --interval-minutes 60        # keep compacting periodically
+    python compact_rollups.py --rebuild --form-id 12 --form-id 40
+    python compact_rollups.py --rebuild                    # every form
+"""
+
+import argparse
+import sys
+import time
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from sqlalchemy import select
+
+from db import SessionLocal
+from models.form import Form
+from utils.rollups import ROLLUP_HOURLY_RETENTION_DAYS, compact_rollups, rebuild_rollups
+
+
+def compact_once(retention_days):
+    db = SessionLocal()
+    try:
+        deleted = compact_rollups(db, retention_days=retention_days)
+    finally:
+        db.close()
+    print(f"✅ Dropped {deleted} hourly rollup rows older than {retention_days:g} days")
+    return True
+
+
+def rebuild(form_ids, retention_days):
+    """Rebuild the given forms (or all forms), returns True if none failed"""
+    db = SessionLocal()
+    try:
+        if not form_ids:
+            form_ids = db.scalars(select(Form.id).order_by(Form.id)).all()
+
+        failed = 0
+        for form_id in form_ids:
+            try:
+                summary = rebuild_rollups(db, form_id, retention_days=retention_days)
+                print(f"✅ Form {form_id}: {summary['rollups']} buckets, {summary['counts']} sentiment/language counts")
+            except Exception as e:
+                db.rollback()
+                failed += 1
+                print(f"❌ Form {form_id}: rebuild failed: {str(e)}")
+        return failed == 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact or rebuild the response rollups")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute rollups from the responses instead of compacting")
+    parser.add_argument("--form-id", type=int, action="append", dest="form_ids", help="Form to rebuild (repeatable)")
+    parser.add_argument("--retention-days", type=float, default=ROLLUP_HOURLY_RETENTION_DAYS,
+                        help="Days of hourly buckets to keep (default: %(default)s)")
+    parser.add_argument("--interval-minutes", type=float, help="Repeat every N minutes instead of running once")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        print("Rebuilding rollups...")
+        success = rebuild(args.form_ids, args.retention_days)
+    elif not args.interval_minutes:
+        print("Compacting rollups...")
+        success = compact_once(args.retention_days)
+    else:
+        while True:
+            compact_once(args.retention_days)
+            time.sleep(args.interval_minutes * 60)
+
+    if success:
+        print("\n🎉 Done!")
+    else:
+        print("\n❌ Some forms failed!")
+        sys.exit(1)
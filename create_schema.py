@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Create the tables of all models that do not exist yet
+
+The application no longer does this on startup (see CREATE_SCHEMA_ON_STARTUP),
+run it on deploy before starting the new version. Existing tables are left
+untouched, column changes still need their migrate_*.py script. On PostgreSQL
+the partitioned tables get their default partitions, run
+`python manage_partitions.py ensure` afterwards for the formId ranges.
+
+Usage:
+    python create_schema.py
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, inspect
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from models import Base
+
+
+def create_schema():
+    """Create missing tables from the models"""
+
+    # Get database URL
+    db_url = os.getenv("DATABASE_URL") or os.getenv("DB_CONNECTION_STRING")
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        return False
+
+    try:
+        # Create database engine
+        engine = create_engine(db_url)
+
+        existing = set(inspect(engine).get_table_names())
+        missing = [table.name for table in Base.metadata.sorted_tables if table.name not in existing]
+
+        Base.metadata.create_all(bind=engine)
+
+        for name in missing:
+            print(f"✅ Created table {name}")
+        if not missing:
+            print("✅ All tables already exist")
+        return True
+
+    except Exception as e:
+        print(f"❌ Schema creation failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("Creating database schema...")
+    success = create_schema()
+
+    if success:
+        print("\n🎉 Schema is up to date!")
+    else:
+        print("\n❌ Schema creation failed!")
+        sys.exit(1)
@@ -1,17 +1,117 @@
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 import os
+import threading
+import time
+import logging
 from dotenv import load_dotenv
 
 load_dotenv()
 
-DATABASE_URL = os.getenv("DB_CONNECTION_STRING") 
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = os.getenv("DB_CONNECTION_STRING")
 engine = create_engine(DATABASE_URL, echo=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Comma-separated read replica URLs for dashboard and analytics reads, empty = primary only
+REPLICA_URLS = [url.strip() for url in os.getenv("REPLICA_URLS", "").split(",") if url.strip()]
+# Replicas further behind the primary than this are skipped until they catch up
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+# How often each replica's lag is re-measured
+REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "10"))
+
+# Replication delay; 0 when the replica has replayed everything it received, and for a
+# server that is not in recovery (a second database standing in for a replica)
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaPool:
+    """Round-robin over read replicas, skipping replicas that lag or are unreachable"""
+
+    def __init__(self, urls, max_lag_seconds: float = REPLICA_MAX_LAG_SECONDS,
+                 check_interval_seconds: float = REPLICA_CHECK_INTERVAL_SECONDS):
+        self.engines = [create_engine(url, echo=True, pool_pre_ping=True) for url in urls]
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self._healthy = [False] * len(self.engines)
+        self._checked_at = [float("-inf")] * len(self.engines)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _lag_seconds(self, replica_engine) -> float:
+        if replica_engine.dialect.name != "postgresql":
+            return 0.0
+        with replica_engine.connect() as conn:
+            return float(conn.execute(REPLICA_LAG_SQL).scalar() or 0)
+
+    def _is_healthy(self, index: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at[index] < self.check_interval_seconds:
+                return self._healthy[index]
+            # Claim the check so concurrent requests keep using the last result meanwhile
+            self._checked_at[index] = now
+
+        replica_engine = self.engines[index]
+        try:
+            lag = self._lag_seconds(replica_engine)
+            healthy = lag <= self.max_lag_seconds
+            if not healthy:
+                logger.warning(f"Replica {replica_engine.url.host} is {lag:.1f}s behind, reading from primary")
+        except Exception as e:
+            healthy = False
+            logger.warning(f"Replica {replica_engine.url.host} unavailable, reading from primary: {e}")
+
+        with self._lock:
+            self._healthy[index] = healthy
+        return healthy
+
+    def choose(self):
+        """Engine of the next healthy replica, or None when all of them are lagging or down"""
+        count = len(self.engines)
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % count if count else 0
+        for offset in range(count):
+            index = (start + offset) % count
+            if self._is_healthy(index):
+                return self.engines[index]
+        return None
+
+
+replica_pool = ReplicaPool(REPLICA_URLS)
+
+
+def ReadSessionLocal():
+    """
+    Session for read-only dashboard and analytics queries
+
+    Bound to a replica that is within REPLICA_MAX_LAG_SECONDS of the primary,
+    or to the primary when there are no healthy replicas. Writes and reads that
+    must see the caller's own just-committed changes use SessionLocal instead.
+    """
+    return SessionLocal(bind=replica_pool.choose() or engine)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -7,15 +7,34 @@ from routes.form import router as form_router
 from routes.form_response import router as form_response_router
 from routes.form_response_field import router as form_response_field_router
 from routes.form_analytics import router as form_analytics_router
-from db import engine
+from routes.admin import router as admin_router
+from db import engine, SessionLocal
+from utils.fast_json import FastJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from middleware.compression import CompressionMiddleware
+from middleware.rate_limit import RateLimitMiddleware
+from utils import b2, oauth
+from utils.background_tasks import background_manager, SHUTDOWN_DRAIN_SECONDS
+from utils.pipeline import resume_unfinished
+from utils.processing_status import field_leases, PROCESSING_LEASE_RENEW_SECONDS
 
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
+# Create missing tables at boot, for local development; deployments run create_schema.py instead
+CREATE_SCHEMA_ON_STARTUP = os.getenv("CREATE_SCHEMA_ON_STARTUP", "false").lower() == "true"
+# Authorize B2 and fetch the OAuth metadata in the background after boot, not on the first request
+WARM_UP_CLIENTS = os.getenv("WARM_UP_CLIENTS", "true").lower() == "true"
+# Pick up the answers a stopped instance left unprocessed, at startup and then periodically, since
+# in a rolling deploy the old instance only marks its answers interrupted after the new one started
+RESUME_INTERRUPTED = os.getenv("RESUME_INTERRUPTED", "true").lower() == "true"
+RESUME_INTERRUPTED_INTERVAL_SECONDS = float(os.getenv("RESUME_INTERRUPTED_INTERVAL_SECONDS", "60"))
 
 
+# Added before CORS so 429 responses still carry the CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[FRONTEND_URL],  
@@ -29,16 +48,38 @@ app.add_middleware(
     secret_key=os.getenv("SESSION_SECRET_KEY", "super-secret-session-key"),
 )
 
+# Compresses complete JSON bodies only, streamed exports and SSE feeds pass through unbuffered
+app.add_middleware(CompressionMiddleware)
+
 app.include_router(users_router)
 app.include_router(form_router)
 app.include_router(form_response_router)
 app.include_router(form_response_field_router)
 app.include_router(form_analytics_router)
+app.include_router(admin_router)
 
 
 @app.on_event("startup")
 def on_startup():
-    Base.metadata.create_all(bind=engine)
+    if CREATE_SCHEMA_ON_STARTUP:
+        Base.metadata.create_all(bind=engine)
+    if WARM_UP_CLIENTS:
+        # Startup does not wait for these, requests arriving first initialize the clients themselves
+        background_manager.add_task("warm_up_b2", b2.warm_up)
+        background_manager.add_task("warm_up_oauth", oauth.warm_up)
+    # Keeps the answers this instance is processing from being reclaimed by the others
+    background_manager.add_periodic_task(
+        "renew_field_leases", field_leases.renew, PROCESSING_LEASE_RENEW_SECONDS, SessionLocal
+    )
+    if RESUME_INTERRUPTED:
+        background_manager.add_periodic_task(
+            "resume_interrupted", resume_unfinished, RESUME_INTERRUPTED_INTERVAL_SECONDS, SessionLocal, run_now=True
+        )
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # Runs once the server stopped taking requests; keep the platform's stop timeout above the drain time
+    background_manager.shutdown(SHUTDOWN_DRAIN_SECONDS)
 
 @app.get("/health")
 def health_check():
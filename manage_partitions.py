@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Partition management for form_responses and form_response_fields
+
+Usage:
+    python manage_partitions.py list
+    python manage_partitions.py ensure                      # cover all forms plus PARTITION_LOOKAHEAD ranges
+    python manage_partitions.py ensure --upto-form-id 50000 --lookahead 5
+    python manage_partitions.py detach --form-id 1234       # detach the range holding form 1234
+
+Run `ensure` periodically (e.g. daily from cron) so new forms get their own
+partition instead of landing in the default one.
+"""
+
+import argparse
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from db import engine
+from utils.partitions import (
+    PARTITIONED_TABLES,
+    PARTITION_LOOKAHEAD,
+    detach_partition_range,
+    ensure_partitions,
+    list_partitions,
+    partition_bounds,
+)
+
+
+def list_command(args):
+    with engine.connect() as conn:
+        for table in PARTITIONED_TABLES:
+            partitions = list_partitions(conn, table)
+            print(f"\n{table} ({len(partitions)} partitions)")
+            for partition in partitions:
+                print(f"  {partition['name']:<45} {partition['bound']:<40} ~{partition['rows']} rows")
+    return True
+
+
+def ensure_command(args):
+    with engine.begin() as conn:
+        created = ensure_partitions(conn, upto_form_id=args.upto_form_id, lookahead=args.lookahead)
+    for lower, upper in created:
+        print(f"✅ Created partitions for formId [{lower}, {upper})")
+    if not created:
+        print("✅ All partitions already exist")
+    return True
+
+
+def detach_command(args):
+    lower, upper = partition_bounds(args.form_id)
+    with engine.begin() as conn:
+        detached = detach_partition_range(conn, lower, upper)
+    for name in detached:
+        print(f"✅ Detached {name}, it is now a standalone table")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage formId range partitions")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("list", help="Show partitions with bounds and estimated row counts")
+
+    ensure_parser = subparsers.add_parser("ensure", help="Pre-create missing partitions")
+    ensure_parser.add_argument("--upto-form-id", type=int, help="Highest form id to cover (default: current maximum)")
+    ensure_parser.add_argument("--lookahead", type=int, default=PARTITION_LOOKAHEAD, help="Extra ranges to create ahead")
+
+    detach_parser = subparsers.add_parser("detach", help="Detach the partitions of a formId range")
+    detach_parser.add_argument("--form-id", type=int, required=True, help="Any form id inside the range")
+
+    args = parser.parse_args()
+    commands = {"list": list_command, "ensure": ensure_command, "detach": detach_command}
+
+    try:
+        success = commands[args.command](args)
+    except Exception as e:
+        print(f"❌ {args.command} failed: {str(e)}")
+        success = False
+
+    if not success:
+        sys.exit(1)
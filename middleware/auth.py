@@ -29,4 +29,10 @@ def get_current_user(
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    return user 
\ No newline at end of file
+    return user
+
+def require_admin(current_user: User = Depends(get_current_user)):
+    """Dependency restricting a route to users with the admin role"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
@@ -0,0 +1,220 @@
+import json
+import math
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Bucket sizes (burst) and refill rates (tokens per second), one token per request. Every
+# answer is a request and respondents behind one NAT (offices, campuses) share an IP, so the
+# IP bucket allows a room full of people; the form bucket only stops floods, not a viral form
+RATE_LIMIT_IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", "120"))
+RATE_LIMIT_IP_RATE = float(os.getenv("RATE_LIMIT_IP_RATE", "5"))
+RATE_LIMIT_FORM_BURST = float(os.getenv("RATE_LIMIT_FORM_BURST", "3000"))
+RATE_LIMIT_FORM_RATE = float(os.getenv("RATE_LIMIT_FORM_RATE", "300"))
+RATE_LIMIT_GLOBAL_BURST = float(os.getenv("RATE_LIMIT_GLOBAL_BURST", "5000"))
+RATE_LIMIT_GLOBAL_RATE = float(os.getenv("RATE_LIMIT_GLOBAL_RATE", "500"))
+# Shared backend so all workers enforce the same buckets, in-process buckets when unset
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+# Use the first X-Forwarded-For address as client IP (only behind a proxy that sets it)
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# Unauthenticated endpoints that start background processing
+RATE_LIMITED_ROUTES = [
+    ("POST", "/form-responses/"),
+    ("POST", "/form-responses/submit"),
+    ("POST", "/form-response-fields/"),
+]
+
+
+class InMemoryBucketStore:
+    """Token buckets in a bounded LRU dict, shared by the threads of one process"""
+
+    is_remote = False
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, burst: float, rate: float, cost: float = 1) -> Tuple[bool, float]:
+        """Take tokens from a bucket, returns (allowed, seconds until enough tokens are available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                # A full bucket evicted early only lets its client burst again
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / rate
+
+
+# Same refill logic as InMemoryBucketStore, atomic on the Redis server and based on its clock
+REDIS_TAKE_SCRIPT = """
+local burst = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    allowed = 1
+    tokens = tokens - cost
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStore:
+    """Token buckets in Redis, shared by every worker (requires the redis package)"""
+
+    is_remote = True
+
+    def __init__(self, url: str, fallback: Optional[InMemoryBucketStore] = None):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+        self.script = self.client.register_script(REDIS_TAKE_SCRIPT)
+        self.fallback = fallback or InMemoryBucketStore()
+
+    def take(self, key: str, burst: float, rate: float, cost: float = 1) -> Tuple[bool, float]:
+        try:
+            allowed, tokens = self.script(keys=[f"ratelimit:{key}"], args=[burst, rate, cost])
+        except Exception as e:
+            # Keep limiting per process rather than failing open or rejecting everyone
+            logger.warning(f"Rate limit backend unavailable, using in-process buckets: {e}")
+            return self.fallback.take(key, burst, rate, cost)
+        tokens = float(tokens)
+        return bool(allowed), 0.0 if allowed else (cost - tokens) / rate
+
+
+def create_bucket_store():
+    if RATE_LIMIT_REDIS_URL:
+        try:
+            return RedisBucketStore(RATE_LIMIT_REDIS_URL)
+        except ImportError:
+            logger.warning("RATE_LIMIT_REDIS_URL is set but redis is not installed, using in-process buckets")
+    return InMemoryBucketStore()
+
+
+bucket_store = create_bucket_store()
+
+
+def _retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+def check_rate_limits(*buckets: Tuple[str, float, float]) -> Optional[float]:
+    """
+    Take one token from each bucket in order, stopping at the first empty one
+
+    Args:
+        buckets: (key, burst, rate) tuples, most specific first so an abusive
+            client runs out of its own tokens before it can drain shared ones
+
+    Returns:
+        Seconds to wait before retrying, or None if the request is allowed
+    """
+    for key, burst, rate in buckets:
+        allowed, retry_after = bucket_store.take(key, burst, rate)
+        if not allowed:
+            return retry_after
+    return None
+
+
+def enforce_form_rate_limit(form_id: int):
+    """
+    Per-form bucket for the submission routes, which know the form only after parsing the body
+
+    May make a network call to Redis, async routes call it with run_in_threadpool.
+
+    Raises:
+        HTTPException: 429 with Retry-After when the form's bucket is empty
+    """
+    if not RATE_LIMIT_ENABLED:
+        return
+    retry_after = check_rate_limits((f"form:{form_id}", RATE_LIMIT_FORM_BURST, RATE_LIMIT_FORM_RATE))
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many submissions for this form, please retry later",
+            headers={"Retry-After": _retry_after(retry_after)},
+        )
+
+
+def client_ip(scope: Scope) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded_for = Headers(scope=scope).get("x-forwarded-for")
+        if forwarded_for:
+            return forwarded_for.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class RateLimitMiddleware:
+    """
+    Per-IP and global token buckets in front of the unauthenticated submission endpoints
+
+    Other routes are not limited. The per-form bucket is applied by the routes
+    through enforce_form_rate_limit, since the form id is in the request body.
+    """
+
+    def __init__(self, app: ASGIApp, routes: Iterable[Tuple[str, str]] = RATE_LIMITED_ROUTES,
+                 enabled: bool = RATE_LIMIT_ENABLED):
+        self.app = app
+        self.routes = set(routes)
+        self.enabled = enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self.enabled or scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            await self.app(scope, receive, send)
+            return
+
+        buckets = (
+            (f"ip:{client_ip(scope)}", RATE_LIMIT_IP_BURST, RATE_LIMIT_IP_RATE),
+            ("global", RATE_LIMIT_GLOBAL_BURST, RATE_LIMIT_GLOBAL_RATE),
+        )
+        if bucket_store.is_remote:
+            retry_after = await anyio.to_thread.run_sync(check_rate_limits, *buckets)
+        else:
+            retry_after = check_rate_limits(*buckets)
+
+        if retry_after is None:
+            await self.app(scope, receive, send)
+            return
+
+        body = json.dumps({"detail": "Too many requests, please retry later"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", _retry_after(retry_after).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Migration script to add forms.archived_at and create the response archive tables
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from models import Base
+from models.archive import ArchivedFormResponse, ArchivedFormResponseField
+
+def migrate_archival():
+    """Add archived_at column to forms and create archived_form_responses / archived_form_response_fields"""
+    
+    # Get database URL
+    db_url = os.getenv("DATABASE_URL") or os.getenv("DB_CONNECTION_STRING")
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        return False
+    
+    try:
+        # Create database engine
+        engine = create_engine(db_url)
+        
+        with engine.connect() as conn:
+            # Check if column already exists
+            result = conn.execute(text("""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name = 'forms' 
+                AND column_name = 'archived_at'
+            """)).fetchone()
+            
+            if result:
+                print("✅ archived_at column already exists")
+            else:
+                conn.execute(text("ALTER TABLE forms ADD COLUMN archived_at TIMESTAMP"))
+                print("✅ Added archived_at column to forms table")
+            
+            Base.metadata.create_all(conn, tables=[ArchivedFormResponse.__table__, ArchivedFormResponseField.__table__])
+            conn.commit()
+            print("✅ Ensured archive tables exist")
+            
+            return True
+            
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("Running archival migration...")
+    success = migrate_archival()
+    
+    if success:
+        print("\n🎉 Migration completed successfully!")
+    else:
+        print("\n❌ Migration failed!")
+        sys.exit(1)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Migration script to convert form_responses and form_response_fields into tables
+range-partitioned by formId
+
+The existing tables are renamed to *_legacy, the partitioned tables are created
+from the models (with their default partitions), range partitions are created
+for every existing form and the rows are copied over, all in one transaction.
+Writes to both tables are blocked while it runs, so run it in a maintenance window.
+
+Usage:
+    python migrate_partitioning.py                # drop the legacy tables after copying
+    python migrate_partitioning.py --keep-legacy  # keep them for verification
+"""
+
+import argparse
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from models import Base
+from models.form_response import FormResponse
+from models.form_response_field import FormResponseField
+from utils.partitions import PARTITIONED_TABLES, ensure_partitions
+
+SERIAL_COLUMNS = {"form_responses": "responseId", "form_response_fields": "responsefieldId"}
+
+
+def _legacy(name: str) -> str:
+    # Identifiers are limited to 63 characters
+    return f"{name[:56]}_legacy"
+
+
+def migrate_partitioning(keep_legacy: bool = False):
+    """Move form_responses and form_response_fields into partitioned tables"""
+
+    # Get database URL
+    db_url = os.getenv("DATABASE_URL") or os.getenv("DB_CONNECTION_STRING")
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        return False
+
+    try:
+        # Create database engine
+        engine = create_engine(db_url)
+
+        with engine.begin() as conn:
+            relkind = conn.execute(text(
+                "SELECT relkind FROM pg_class WHERE relname = 'form_response_fields' AND relnamespace = 'public'::regnamespace"
+            )).scalar()
+            if relkind == "p":
+                print("✅ form_response_fields is already partitioned")
+                return True
+
+            # Move the old tables, their indexes and sequences out of the way
+            for table in PARTITIONED_TABLES:
+                sequence = conn.execute(
+                    text("SELECT pg_get_serial_sequence(:table, :column)"),
+                    {"table": table, "column": SERIAL_COLUMNS[table]}
+                ).scalar()
+                indexes = conn.execute(
+                    text("SELECT indexname FROM pg_indexes WHERE schemaname = 'public' AND tablename = :table"),
+                    {"table": table}
+                ).scalars().all()
+                conn.execute(text(f"ALTER TABLE {table} RENAME TO {_legacy(table)}"))
+                for index in indexes:
+                    conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{_legacy(index)}"'))
+                if sequence:
+                    sequence_name = sequence.split(".")[-1].strip('"')
+                    conn.execute(text(f'ALTER SEQUENCE {sequence} RENAME TO "{_legacy(sequence_name)}"'))
+                print(f"✅ Renamed {table} to {_legacy(table)}")
+
+            # Partitioned tables plus their default partitions
+            Base.metadata.create_all(conn, tables=[FormResponse.__table__, FormResponseField.__table__])
+            print("✅ Created partitioned tables")
+
+            created = ensure_partitions(conn)
+            print(f"✅ Created {len(created)} formId range partitions")
+
+            # Copy the rows, only the columns both versions of a table have
+            skipped = 0
+            for table in PARTITIONED_TABLES:
+                new_columns = set(conn.execute(
+                    text("SELECT column_name FROM information_schema.columns WHERE table_name = :table"),
+                    {"table": table}
+                ).scalars().all())
+                old_columns = set(conn.execute(
+                    text("SELECT column_name FROM information_schema.columns WHERE table_name = :table"),
+                    {"table": _legacy(table)}
+                ).scalars().all())
+                columns = ", ".join(f'"{column}"' for column in sorted(new_columns & old_columns))
+
+                condition = ""
+                if table == "form_response_fields":
+                    # The composite foreign key needs the answer's form to match its response's form
+                    condition = """
+                        WHERE EXISTS (
+                            SELECT 1 FROM form_responses r
+                            WHERE r."responseId" = legacy."formResponseId" AND r."formId" = legacy."formId"
+                        )
+                    """
+                copied = conn.execute(text(
+                    f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {_legacy(table)} legacy {condition}"
+                )).rowcount
+                total = conn.execute(text(f"SELECT count(*) FROM {_legacy(table)}")).scalar()
+                skipped += total - copied
+                print(f"✅ Copied {copied} of {total} rows into {table}")
+
+                column = SERIAL_COLUMNS[table]
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', '{column}'), "
+                    f'COALESCE(MAX("{column}"), 0) + 1, false) FROM {table}'
+                ))
+
+            if skipped:
+                print(f"⚠️ {skipped} answers reference a missing response or a response of another form, "
+                      f"they were left in {_legacy('form_response_fields')}")
+                keep_legacy = True
+
+            if not keep_legacy:
+                for table in reversed(PARTITIONED_TABLES):
+                    conn.execute(text(f"DROP TABLE {_legacy(table)}"))
+                print("✅ Dropped legacy tables")
+
+        with engine.connect() as conn:
+            for table in PARTITIONED_TABLES:
+                conn.execute(text(f"ANALYZE {table}"))
+            conn.commit()
+            print("✅ Analyzed partitioned tables")
+
+        return True
+
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partition form_responses and form_response_fields by formId")
+    parser.add_argument("--keep-legacy", action="store_true", help="Keep the unpartitioned *_legacy tables")
+    args = parser.parse_args()
+
+    print("Running partitioning migration...")
+    success = migrate_partitioning(keep_legacy=args.keep_legacy)
+
+    if success:
+        print("\n🎉 Migration completed successfully!")
+    else:
+        print("\n❌ Migration failed!")
+        sys.exit(1)
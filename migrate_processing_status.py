@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Migration script to add background processing status columns to form_response_fields table
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+COLUMNS = {
+    "processing_status": "VARCHAR(20) NOT NULL DEFAULT 'queued'",
+    "processing_stage": "VARCHAR(32)",
+    "processing_progress": "INTEGER NOT NULL DEFAULT 0",
+    "processing_error": "TEXT",
+    "processing_lease_expires_at": "TIMESTAMP",
+}
+
+# Matches PROCESSING_LEASE_SECONDS of the application
+PROCESSING_LEASE_SECONDS = float(os.getenv("PROCESSING_LEASE_SECONDS", "300"))
+
+def migrate_processing_status():
+    """Add processing_status, processing_stage, processing_progress, processing_error and lease columns"""
+    
+    # Get database URL
+    db_url = os.getenv("DATABASE_URL") or os.getenv("DB_CONNECTION_STRING")
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        return False
+    
+    try:
+        # Create database engine
+        engine = create_engine(db_url)
+        
+        with engine.connect() as conn:
+            existing = {
+                row[0] for row in conn.execute(text("""
+                    SELECT column_name 
+                    FROM information_schema.columns 
+                    WHERE table_name = 'form_response_fields'
+                """))
+            }
+            
+            added_status = False
+            added_lease = False
+            for column, definition in COLUMNS.items():
+                if column in existing:
+                    print(f"✅ {column} column already exists")
+                    continue
+                conn.execute(text(f"ALTER TABLE form_response_fields ADD COLUMN {column} {definition}"))
+                added_status = added_status or column == "processing_status"
+                added_lease = added_lease or column == "processing_lease_expires_at"
+                print(f"✅ Added {column} column to form_response_fields table")
+            
+            if added_status:
+                # Rows that existed before the state machine were already processed
+                conn.execute(text("""
+                    UPDATE form_response_fields 
+                    SET processing_status = 'done', processing_progress = 100
+                """))
+                print("✅ Marked existing records as processed")
+            elif added_lease:
+                # Fields in progress get a full lease, instances still running the previous release
+                # do not renew it, so they have that long to finish before the fields are reclaimed
+                conn.execute(text("""
+                    UPDATE form_response_fields 
+                    SET processing_lease_expires_at = now() + make_interval(secs => :seconds)
+                    WHERE processing_status IN ('queued', 'running')
+                """), {"seconds": PROCESSING_LEASE_SECONDS})
+                print("✅ Leased the records still being processed")
+            
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS "ix_form_response_fields_formResponseId" 
+                ON form_response_fields ("formResponseId")
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_form_response_fields_lease 
+                ON form_response_fields (processing_lease_expires_at) 
+                WHERE processing_status IN ('queued', 'running')
+            """))
+            conn.commit()
+            print("✅ Ensured indexes on formResponseId and processing_lease_expires_at")
+            
+            return True
+            
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("Running processing status migration...")
+    success = migrate_processing_status()
+    
+    if success:
+        print("\n🎉 Migration completed successfully!")
+    else:
+        print("\n❌ Migration failed!")
+        sys.exit(1)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the response rollup tables and backfill them
+
+Usage:
+    python migrate_rollups.py                  # create the tables and rebuild every form
+    python migrate_rollups.py --skip-backfill  # only create the tables
+"""
+
+import argparse
+import os
+import sys
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from models import Base
+from models.form import Form
+from models.form_rollup import FormRollup, FormRollupCount
+from utils.rollups import rebuild_rollups
+
+def migrate_rollups(backfill: bool = True):
+    """Create form_rollups / form_rollup_counts and fill them from the existing responses"""
+    
+    # Get database URL
+    db_url = os.getenv("DATABASE_URL") or os.getenv("DB_CONNECTION_STRING")
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        return False
+    
+    try:
+        # Create database engine
+        engine = create_engine(db_url)
+        
+        Base.metadata.create_all(engine, tables=[FormRollup.__table__, FormRollupCount.__table__])
+        print("✅ Ensured rollup tables exist")
+        
+        if backfill:
+            db = sessionmaker(bind=engine)()
+            try:
+                form_ids = db.scalars(select(Form.id).order_by(Form.id)).all()
+                for form_id in form_ids:
+                    rebuild_rollups(db, form_id)
+                print(f"✅ Backfilled rollups of {len(form_ids)} forms")
+            finally:
+                db.close()
+        
+        return True
+            
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and backfill the response rollup tables")
+    parser.add_argument("--skip-backfill", action="store_true", help="Only create the tables")
+    args = parser.parse_args()
+
+    print("Running rollups migration...")
+    success = migrate_rollups(backfill=not args.skip_backfill)
+    
+    if success:
+        print("\n🎉 Migration completed successfully!")
+    else:
+        print("\n❌ Migration failed!")
+        sys.exit(1)
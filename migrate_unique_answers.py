@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Migration script to remove duplicate answers and add the unique answer key to form_response_fields
+
+Duplicates are rows with the same (formId, formResponseId, formfeildId), created by
+retried submissions. The most processed row of each group is kept (done first,
+then the oldest).
+"""
+
+import os
+import sys
+from sqlalchemy import create_engine, text
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+CONSTRAINT_NAME = "uq_form_response_fields_answer"
+
+def migrate_unique_answers():
+    """Delete duplicate answers and add the uq_form_response_fields_answer constraint"""
+    
+    # Get database URL
+    db_url = os.getenv("DATABASE_URL") or os.getenv("DB_CONNECTION_STRING")
+    if not db_url:
+        print("❌ DATABASE_URL not found in environment variables")
+        return False
+    
+    try:
+        # Create database engine
+        engine = create_engine(db_url)
+        
+        with engine.connect() as conn:
+            # Check if constraint already exists
+            result = conn.execute(text("""
+                SELECT 1 FROM pg_constraint WHERE conname = :name
+            """), {"name": CONSTRAINT_NAME}).fetchone()
+            
+            if result:
+                print(f"✅ {CONSTRAINT_NAME} constraint already exists")
+                return True
+            
+            deleted = conn.execute(text("""
+                DELETE FROM form_response_fields f
+                USING (
+                    SELECT "responsefieldId", "formId",
+                           row_number() OVER (
+                               PARTITION BY "formId", "formResponseId", "formfeildId"
+                               ORDER BY (processing_status = 'done') DESC, "responsefieldId"
+                           ) AS duplicate_rank
+                    FROM form_response_fields
+                ) ranked
+                WHERE f."responsefieldId" = ranked."responsefieldId"
+                AND f."formId" = ranked."formId"
+                AND ranked.duplicate_rank > 1
+            """)).rowcount
+            print(f"✅ Removed {deleted} duplicate answers")
+            
+            conn.execute(text(f"""
+                ALTER TABLE form_response_fields 
+                ADD CONSTRAINT {CONSTRAINT_NAME} UNIQUE ("formId", "formResponseId", "formfeildId")
+            """))
+            conn.commit()
+            print(f"✅ Added {CONSTRAINT_NAME} constraint to form_response_fields table")
+            
+            if deleted:
+                print("ℹ️ Category counts in form_analytics still include the duplicates, "
+                      "run recluster_analytics.py to rebuild them")
+            
+            return True
+            
+    except Exception as e:
+        print(f"❌ Migration failed: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    print("Running unique answer migration...")
+    success = migrate_unique_answers()
+    
+    if success:
+        print("\n🎉 Migration completed successfully!")
+    else:
+        print("\n❌ Migration failed!")
+        sys.exit(1)
@@ -8,4 +8,6 @@ from .form import Form
 from .form_fields import FormField
 from .form_response import FormResponse
 from .form_response_field import FormResponseField
-from .form_analytics import FormAnalytics 
\ No newline at end of file
+from .form_analytics import FormAnalytics 
+from .archive import ArchivedFormResponse, ArchivedFormResponseField
+from .form_rollup import FormRollup, FormRollupCount
\ No newline at end of file
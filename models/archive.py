@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Float, JSON, TIMESTAMP, func
+from . import Base
+
+class ArchivedFormResponse(Base):
+    """Cold copy of a form_responses row, moved here by the archival job"""
+    __tablename__ = "archived_form_responses"
+
+    responseId = Column(Integer, primary_key=True, autoincrement=False)
+    formId = Column(Integer, ForeignKey("forms.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(TIMESTAMP, nullable=False)
+    updated_at = Column(TIMESTAMP, nullable=False)
+    status = Column(String(32), nullable=False)
+    submitTimestamp = Column(TIMESTAMP, nullable=True)
+    language = Column(String(10), nullable=True)
+    archived_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
+
+
+class ArchivedFormResponseField(Base):
+    """Cold copy of a form_response_fields row, without the processing state columns"""
+    __tablename__ = "archived_form_response_fields"
+
+    responsefieldId = Column(Integer, primary_key=True, autoincrement=False)
+    formResponseId = Column(Integer, ForeignKey("archived_form_responses.responseId", ondelete="CASCADE"), nullable=False, index=True)
+    formId = Column(Integer, ForeignKey("forms.id"), nullable=False, index=True)
+    formfeildId = Column(Integer, ForeignKey("form_fields.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    responseText = Column(Text, nullable=True)
+    voiceFileLink = Column(String(255), nullable=True)
+    response_time = Column(Float, nullable=True)
+    transcribed_text = Column(Text, nullable=True)
+    translated_text = Column(Text, nullable=True)
+    categories = Column(JSON, nullable=True)
+    sentiment = Column(String(20), nullable=True)
+    language = Column(String(10), nullable=True)
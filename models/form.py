@@ -20,6 +20,8 @@ class Form(Base):
     status = Column(String(20), nullable=False, default="draft")
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+    # Set once the archival job moved the form's responses to the archive tables
+    archived_at = Column(TIMESTAMP, nullable=True)
     # Relationship
     owner = relationship("User", back_populates="forms")
     fields = relationship("FormField", back_populates="form", cascade="all, delete-orphan") 
\ No newline at end of file
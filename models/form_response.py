@@ -1,12 +1,16 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, ForeignKey, func
+from sqlalchemy import Column, Integer, String, TIMESTAMP, ForeignKey, func, DDL, event
 from sqlalchemy.orm import relationship
 from . import Base
 
 class FormResponse(Base):
     __tablename__ = "form_responses"
+    # Range-partitioned by form on PostgreSQL, see utils/partitions.py and manage_partitions.py
+    __table_args__ = {"postgresql_partition_by": 'RANGE ("formId")'}
 
-    responseId = Column(Integer, primary_key=True, index=True)
-    formId = Column(Integer, ForeignKey("forms.id"), nullable=False)
+    # The partition key has to be part of the primary key; responseId alone is still unique
+    # (one sequence for all partitions) and is what the ORM identifies rows by
+    responseId = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    formId = Column(Integer, ForeignKey("forms.id"), primary_key=True, autoincrement=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -15,4 +19,14 @@ class FormResponse(Base):
     language = Column(String(10), nullable=True, default="en")
 
     form = relationship("Form")
-    user = relationship("User") 
\ No newline at end of file
+    user = relationship("User")
+
+    __mapper_args__ = {"primary_key": [responseId]}
+
+
+# Rows of forms without a pre-created range partition land in the default partition
+event.listen(
+    FormResponse.__table__,
+    "after_create",
+    DDL('CREATE TABLE IF NOT EXISTS form_responses_default PARTITION OF form_responses DEFAULT').execute_if(dialect="postgresql"),
+) 
\ No newline at end of file
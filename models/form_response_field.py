@@ -1,14 +1,32 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Float, JSON
+from sqlalchemy import Column, Integer, String, ForeignKey, ForeignKeyConstraint, UniqueConstraint, Index, Text, Float, JSON, TIMESTAMP, DDL, event, text
 from sqlalchemy.orm import relationship
 from . import Base
 
 class FormResponseField(Base):
     __tablename__ = "form_response_fields"
+    # Range-partitioned by form on PostgreSQL like form_responses, with matching bounds
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ["formResponseId", "formId"],
+            ["form_responses.responseId", "form_responses.formId"],
+            ondelete="CASCADE",
+        ),
+        # One answer per question and response, retried submissions hit this key (includes the partition key)
+        UniqueConstraint("formId", "formResponseId", "formfeildId", name="uq_form_response_fields_answer"),
+        # Reclaiming abandoned fields only scans the few that are still being processed
+        Index(
+            "ix_form_response_fields_lease",
+            "processing_lease_expires_at",
+            postgresql_where=text("processing_status IN ('queued', 'running')"),
+        ),
+        {"postgresql_partition_by": 'RANGE ("formId")'},
+    )
 
-    responsefieldId = Column(Integer, primary_key=True, index=True)
-    formResponseId = Column(Integer, ForeignKey("form_responses.responseId"), nullable=False)
-    formId = Column(Integer, ForeignKey("forms.id"), nullable=False)
-    formfeildId = Column(Integer, ForeignKey("form_fields.id"), nullable=False)
+    # responsefieldId alone is unique and is what the ORM identifies rows by
+    responsefieldId = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    formResponseId = Column(Integer, nullable=False, index=True)
+    formId = Column(Integer, ForeignKey("forms.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    formfeildId = Column(Integer, ForeignKey("form_fields.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     responseText = Column(Text, nullable=True)
     voiceFileLink = Column(String(255), nullable=True)
@@ -18,8 +36,24 @@ class FormResponseField(Base):
     categories = Column(JSON, nullable=True)
     sentiment = Column(String(20), nullable=True, default="neutral")
     language = Column(String(10), nullable=True, default="en")
+    # Background processing state machine: queued -> running -> done/failed (or interrupted by a shutdown)
+    processing_status = Column(String(20), nullable=False, default="queued", server_default="queued")
+    processing_stage = Column(String(32), nullable=True)
+    processing_progress = Column(Integer, nullable=False, default=0, server_default="0")
+    processing_error = Column(Text, nullable=True)
+    # Until when the process working on a queued or running field holds it, renewed while it is alive
+    processing_lease_expires_at = Column(TIMESTAMP, nullable=True)
 
-    form_response = relationship("FormResponse")
+    form_response = relationship("FormResponse", overlaps="form")
     form_field = relationship("FormField")
-    form = relationship("Form")
-    user = relationship("User") 
\ No newline at end of file
+    form = relationship("Form", overlaps="form_response")
+    user = relationship("User")
+
+    __mapper_args__ = {"primary_key": [responsefieldId]}
+
+
+event.listen(
+    FormResponseField.__table__,
+    "after_create",
+    DDL('CREATE TABLE IF NOT EXISTS form_response_fields_default PARTITION OF form_response_fields DEFAULT').execute_if(dialect="postgresql"),
+) 
\ No newline at end of file
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, TIMESTAMP, UniqueConstraint
+from . import Base
+
+class FormRollup(Base):
+    """Response counters of a form per hour or day, maintained as responses come in"""
+    __tablename__ = "form_rollups"
+    __table_args__ = (
+        UniqueConstraint("formId", "granularity", "bucket_start", name="uq_form_rollups_bucket"),
+    )
+
+    rollupId = Column(Integer, primary_key=True, index=True)
+    formId = Column(Integer, ForeignKey("forms.id", ondelete="CASCADE"), nullable=False)
+    granularity = Column(String(8), nullable=False)  # hour or day
+    bucket_start = Column(TIMESTAMP, nullable=False)
+    submitted = Column(Integer, nullable=False, default=0, server_default="0")  # responses started
+    completed = Column(Integer, nullable=False, default=0, server_default="0")  # responses submitted in full
+    answers = Column(Integer, nullable=False, default=0, server_default="0")
+    # Sum and count rather than the average so increments from concurrent writers add up
+    response_time_sum = Column(Float, nullable=False, default=0, server_default="0")
+    response_time_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class FormRollupCount(Base):
+    """Answers per sentiment or language of a form per hour or day"""
+    __tablename__ = "form_rollup_counts"
+    __table_args__ = (
+        UniqueConstraint("formId", "granularity", "bucket_start", "dimension", "value", name="uq_form_rollup_counts_bucket"),
+    )
+
+    rollupCountId = Column(Integer, primary_key=True, index=True)
+    formId = Column(Integer, ForeignKey("forms.id", ondelete="CASCADE"), nullable=False)
+    granularity = Column(String(8), nullable=False)
+    bucket_start = Column(TIMESTAMP, nullable=False)
+    dimension = Column(String(16), nullable=False)  # sentiment or language
+    value = Column(String(20), nullable=False)
+    count = Column(Integer, nullable=False, default=0, server_default="0")
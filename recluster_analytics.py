@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Batch job that rebuilds form analytics categories by clustering response embeddings
+
+Usage:
+    python recluster_analytics.py                      # every form with active analytics
+    python recluster_analytics.py --form-id 12 --form-id 40
+    python recluster_analytics.py --interval-minutes 360   # keep running periodically
+"""
+
+import argparse
+import sys
+import time
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from db import SessionLocal
+from utils.reclustering import forms_with_analytics, run_recluster_job
+
+
+def run_once(form_ids):
+    """Recluster the given forms (or all forms with analytics), returns True if none failed"""
+    if not form_ids:
+        db = SessionLocal()
+        try:
+            form_ids = forms_with_analytics(db)
+        finally:
+            db.close()
+
+    failed = 0
+    for form_id in form_ids:
+        summary = run_recluster_job(form_id, SessionLocal)
+        if summary["status"] == "failed":
+            failed += 1
+            print(f"❌ Form {form_id}: reclustering failed after {summary['llm_calls']} LLM calls")
+        else:
+            print(
+                f"✅ Form {form_id}: {summary['responses']} responses -> "
+                f"{summary['clusters']} categories ({summary['llm_calls']} LLM calls)"
+            )
+    return failed == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild form analytics categories by batch clustering")
+    parser.add_argument("--form-id", type=int, action="append", dest="form_ids", help="Form to recluster (repeatable)")
+    parser.add_argument("--interval-minutes", type=float, help="Repeat every N minutes instead of running once")
+    args = parser.parse_args()
+
+    print("Running analytics reclustering...")
+    if not args.interval_minutes:
+        success = run_once(args.form_ids)
+        if success:
+            print("\n🎉 Reclustering completed successfully!")
+        else:
+            print("\n❌ Reclustering failed for some forms!")
+            sys.exit(1)
+    else:
+        while True:
+            run_once(args.form_ids)
+            time.sleep(args.interval_minutes * 60)
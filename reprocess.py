@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Re-run pipeline stages on stored answers, e.g. to backfill after a pipeline change
+or to retry failed processing
+
+Answers are selected by form, response date and missing results, read in
+responsefieldId order in chunks and processed on a pool of worker threads.
+Progress is checkpointed after every chunk, so an interrupted run continues
+where it stopped when started again with the same selection. Answers the live
+pipeline is still processing are skipped; on Ctrl-C the answers in progress are
+marked interrupted until they finish, so they are never left running.
+
+Usage:
+    python reprocess.py --missing sentiment                       # every answer without sentiment
+    python reprocess.py --form-id 12 --since 2024-01-01 --stages translation sentiment
+    python reprocess.py --missing transcript --stages transcription translation sentiment categories
+    python reprocess.py --status failed --workers 8                # retry failed answers
+    python reprocess.py --status interrupted --stages transcription translation sentiment categories analytics
+    python reprocess.py --missing translation --restart            # ignore the checkpoint
+    python reprocess.py --missing sentiment --dry-run              # only count matching answers
+    python reprocess.py --form-id 12 --batch --batch-size 20000   # whole form through the batch API
+
+The analytics stage is not run unless requested, since merging an answer into
+the form analytics twice counts it twice; use --recluster to rebuild the
+categories of the touched forms from scratch instead.
+
+With --batch the text stages are not called online answer by answer: each chunk
+is written to a JSONL job file, submitted to the provider's batch endpoint
+(BATCH_PROVIDER) and the results are applied in bulk once the batch is done.
+Batches are cheaper and leave the interactive quota to live submissions, but
+take minutes to hours. A run interrupted while waiting resumes polling the
+submitted batch instead of submitting it again. When a batch fails its answers
+are marked failed and can be retried with --status failed. Transcription stays
+online; with the analytics stage the touched forms are reclustered afterwards.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from sqlalchemy import and_, func, or_, select
+
+from db import SessionLocal
+from models.form_response import FormResponse
+from models.form_response_field import FormResponseField
+from utils.batch_pipeline import (
+    BATCH_POLL_SECONDS,
+    BatchFailedError,
+    apply_results,
+    claim_fields,
+    fail_fields,
+    lease_keys,
+    load_fields,
+    process_batch,
+)
+from utils.gemini_batch import BATCH_PROVIDER, get_batch_provider
+from utils.pipeline import REPROCESS_STAGES, TEXT_STAGES, release_reprocessing, reprocess_field
+from utils.background_tasks import background_manager
+from utils.processing_status import (
+    FAILED, INTERRUPTED, QUEUED, BATCH_STAGE, PROCESSING_LEASE_RENEW_SECONDS, field_leases
+)
+
+# Conditions selecting answers whose result of a stage is missing
+MISSING_CONDITIONS = {
+    "transcript": and_(
+        FormResponseField.voiceFileLink.isnot(None),
+        or_(FormResponseField.transcribed_text.is_(None), FormResponseField.transcribed_text == ""),
+    ),
+    "translation": and_(
+        FormResponseField.translated_text.is_(None),
+        or_(FormResponseField.transcribed_text.isnot(None), FormResponseField.responseText.isnot(None)),
+    ),
+    "sentiment": FormResponseField.sentiment.is_(None),
+    "categories": FormResponseField.categories.is_(None),
+}
+
+
+def selection_filters(args):
+    """WHERE conditions of the answers selected by the command line"""
+    filters = []
+    if args.form_ids:
+        filters.append(FormResponseField.formId.in_(args.form_ids))
+    if args.since:
+        filters.append(FormResponse.created_at >= args.since)
+    if args.until:
+        filters.append(FormResponse.created_at < args.until)
+    if args.missing:
+        filters.append(or_(*(MISSING_CONDITIONS[name] for name in args.missing)))
+    if args.status:
+        filters.append(FormResponseField.processing_status == args.status)
+    return filters
+
+
+def selection_query(args, columns):
+    query = select(*columns).select_from(FormResponseField)
+    if args.since or args.until:
+        query = query.join(
+            FormResponse,
+            and_(
+                FormResponse.responseId == FormResponseField.formResponseId,
+                FormResponse.formId == FormResponseField.formId,
+            ),
+        )
+    return query.where(*selection_filters(args))
+
+
+def selection_signature(args) -> str:
+    """Identifies a selection and stage list, a checkpoint only applies to the same one"""
+    selection = {
+        "form_ids": sorted(args.form_ids or []),
+        "since": args.since.isoformat() if args.since else None,
+        "until": args.until.isoformat() if args.until else None,
+        "missing": sorted(args.missing or []),
+        "status": args.status,
+        "stages": args.stages,
+        "batch": args.batch,
+    }
+    return hashlib.sha256(json.dumps(selection, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def load_checkpoint(path: str, signature: str):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("signature") != signature:
+        print(f"⚠️ Checkpoint {path} belongs to a different selection, starting over")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path: str, checkpoint):
+    # Write then rename, an interrupted write must not corrupt the previous checkpoint
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, path)
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+def process_chunk_as_batch(args, ids, checkpoint, checkpoint_path):
+    """
+    Run a chunk's text stages as provider batches and apply the results
+
+    The claimed answers and submitted batches are kept in the checkpoint until the
+    results are applied, a restart then waits for the same batches; answers a
+    server reclaimed while this run was stopped are left out. When a batch fails
+    the answers are released and the chunk is dropped from the checkpoint, so
+    retrying them submits new batches.
+
+    Returns:
+        Number of answers that failed
+    """
+    fields = []
+    db = SessionLocal()
+    try:
+        chunk = checkpoint.get("batch_chunk")
+        if chunk is None or chunk["ids"] != ids:
+            fields, counted = claim_fields(db, load_fields(db, ids))
+            chunk = {
+                "ids": ids,
+                "claimed": [field["id"] for field in fields],
+                "counted": {str(field_id): value for field_id, value in counted.items()},
+                "rounds": {},
+            }
+            checkpoint["batch_chunk"] = chunk
+            save_checkpoint(checkpoint_path, checkpoint)
+            skipped = len(ids) - len(fields)
+            if skipped:
+                print(f"⏭️ Skipping {skipped} answers without text or still being processed live")
+        else:
+            fields = [
+                field for field in load_fields(db, chunk["claimed"])
+                if field["status"] == QUEUED and field["stage"] == BATCH_STAGE
+            ]
+            reclaimed = len(chunk["claimed"]) - len(fields)
+            if reclaimed:
+                print(f"⏭️ Skipping {reclaimed} answers reclaimed while the run was stopped")
+        db.rollback()
+        field_leases.hold(*lease_keys(fields))
+
+        name = f"reprocess-{checkpoint['signature']}-{ids[0]}"
+        job_dir = args.job_dir or f"reprocess-{checkpoint['signature']}-jobs"
+        os.makedirs(job_dir, exist_ok=True)
+        counted = {int(field_id): value for field_id, value in chunk["counted"].items()}
+        try:
+            results, errors = process_batch(
+                args.provider, job_dir, name, fields, args.stages, chunk["rounds"],
+                lambda: save_checkpoint(checkpoint_path, checkpoint), args.poll_interval
+            )
+        except BatchFailedError as e:
+            print(f"❌ {e}")
+            failed = fail_fields(db, fields, counted, str(e))
+            checkpoint["failed_ids"].extend(field["id"] for field in fields if counted.get(field["id"]) is not None)
+            del checkpoint["batch_chunk"]
+            save_checkpoint(checkpoint_path, checkpoint)
+            return failed
+        failed = apply_results(db, fields, counted, results, errors)
+        for field in fields:
+            if errors.get(field["id"]):
+                checkpoint["failed_ids"].append(field["id"])
+        del checkpoint["batch_chunk"]
+        return failed
+    finally:
+        field_leases.release(*lease_keys(fields))
+        db.close()
+
+
+def reprocess(args):
+    """Process the selected answers chunk by chunk, returns True if none failed"""
+    signature = selection_signature(args)
+    checkpoint_path = args.checkpoint or f"reprocess-{signature}.checkpoint.json"
+
+    checkpoint = None if args.restart else load_checkpoint(checkpoint_path, signature)
+    db = SessionLocal()
+    try:
+        if checkpoint is None:
+            # Answers submitted after the start are processed by the live pipeline
+            max_id = db.scalar(selection_query(args, [func.max(FormResponseField.responsefieldId)]))
+            checkpoint = {
+                "signature": signature,
+                "max_id": max_id or 0,
+                "last_id": 0,
+                "processed": 0,
+                "failed": 0,
+                "failed_ids": [],
+                "started_at": datetime.utcnow().isoformat(),
+            }
+        elif checkpoint["last_id"]:
+            print(f"↩️ Resuming after responsefieldId {checkpoint['last_id']} "
+                  f"({checkpoint['processed']} answers already processed)")
+
+        in_range = [
+            FormResponseField.responsefieldId > checkpoint["last_id"],
+            FormResponseField.responsefieldId <= checkpoint["max_id"],
+        ]
+        remaining = db.scalar(selection_query(args, [func.count()]).where(*in_range))
+        print(f"📋 {remaining} answers to process with stages: {', '.join(args.stages)}")
+        if args.dry_run:
+            return True
+
+        # Keeps the answers in progress, and those waiting on a batch, from being reclaimed by the servers
+        background_manager.add_periodic_task(
+            "renew_field_leases", field_leases.renew, PROCESSING_LEASE_RENEW_SECONDS, SessionLocal
+        )
+        form_ids = set()
+        done = 0
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=args.workers)
+        try:
+            while True:
+                # Keyset pagination, the offset of a page does not grow with the table
+                chunk = db.execute(
+                    selection_query(args, [FormResponseField.responsefieldId, FormResponseField.formId])
+                    .where(FormResponseField.responsefieldId > checkpoint["last_id"], in_range[1])
+                    .order_by(FormResponseField.responsefieldId)
+                    .limit(args.chunk_size)
+                ).all()
+                db.rollback()
+                if not chunk:
+                    break
+
+                ids = [row.responsefieldId for row in chunk]
+                if args.batch:
+                    checkpoint["failed"] += process_chunk_as_batch(args, ids, checkpoint, checkpoint_path)
+                else:
+                    results = executor.map(lambda field_id: reprocess_field(field_id, SessionLocal, args.stages), ids)
+                    for field_id, succeeded in zip(ids, results):
+                        if succeeded is None:
+                            # Still queued or running in the live pipeline
+                            checkpoint["skipped"] = checkpoint.get("skipped", 0) + 1
+                        elif not succeeded:
+                            checkpoint["failed"] += 1
+                            checkpoint["failed_ids"].append(field_id)
+                form_ids.update(row.formId for row in chunk)
+
+                # The whole chunk is finished, resuming starts after it
+                done += len(ids)
+                checkpoint["processed"] += len(ids)
+                checkpoint["last_id"] = ids[-1]
+                save_checkpoint(checkpoint_path, checkpoint)
+
+                elapsed = time.monotonic() - started
+                rate = done / elapsed if elapsed else 0.0
+                eta = (remaining - done) / rate if rate else 0.0
+                print(f"⏱️ {done}/{remaining} answers, {rate:.1f}/s, {checkpoint['failed']} failed, "
+                      f"ETA {_format_duration(max(eta, 0))}")
+        except KeyboardInterrupt:
+            # Start no more answers; the running ones are marked interrupted first, so they are
+            # not left running forever if this process is killed before they finish
+            executor.shutdown(wait=False, cancel_futures=True)
+            released = release_reprocessing(SessionLocal)
+            if released:
+                print(f"\n⏸️ {released} answers in progress marked interrupted, waiting for them to finish "
+                      f"(retry with --status interrupted if the selection no longer matches them)")
+            raise
+        finally:
+            executor.shutdown()
+
+        elapsed = time.monotonic() - started
+        print(f"✅ Processed {done} answers in {_format_duration(elapsed)} "
+              f"({done / elapsed if elapsed else 0:.1f}/s)")
+        if checkpoint.get("skipped"):
+            print(f"⏭️ Skipped {checkpoint['skipped']} answers the live pipeline was still processing")
+    finally:
+        db.close()
+
+    if args.recluster:
+        from utils.reclustering import run_recluster_job
+
+        for form_id in sorted(form_ids):
+            summary = run_recluster_job(form_id, SessionLocal)
+            print(f"{'❌' if summary['status'] == 'failed' else '✅'} Form {form_id}: reclustering {summary['status']}")
+
+    if checkpoint["failed"]:
+        print(f"⚠️ {checkpoint['failed']} answers failed, see processing_error "
+              f"(ids in {checkpoint_path}, retry with --status failed)")
+        return False
+
+    os.remove(checkpoint_path)
+    return True
+
+
+def _parse_date(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-run pipeline stages on stored answers")
+    parser.add_argument("--form-id", type=int, action="append", dest="form_ids", help="Form to reprocess (repeatable)")
+    parser.add_argument("--since", type=_parse_date, help="Only responses created at or after this date (ISO format)")
+    parser.add_argument("--until", type=_parse_date, help="Only responses created before this date (ISO format)")
+    parser.add_argument("--missing", nargs="+", choices=sorted(MISSING_CONDITIONS),
+                        help="Only answers missing any of these results")
+    parser.add_argument("--status", choices=[FAILED, INTERRUPTED],
+                        help="Only answers whose processing failed or was cut off by a shutdown")
+    parser.add_argument("--stages", nargs="+", choices=REPROCESS_STAGES, default=TEXT_STAGES,
+                        help="Stages to run (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Answers processed in parallel, keep below the database pool size (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Answers per chunk and checkpoint (default: %(default)s)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: derived from the selection)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--recluster", action="store_true", help="Rebuild the analytics categories of touched forms afterwards")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the selected answers")
+    parser.add_argument("--batch", action="store_true", help="Run the text stages through the provider's batch API")
+    parser.add_argument("--provider", default=BATCH_PROVIDER, choices=["gemini"],
+                        help="Batch provider (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, help="Answers per batch job with --batch (default: 10000)")
+    parser.add_argument("--job-dir", help="Directory of the batch job files (default: derived from the selection)")
+    parser.add_argument("--poll-interval", type=float, default=BATCH_POLL_SECONDS,
+                        help="Seconds between batch status checks (default: %(default)s)")
+    args = parser.parse_args()
+
+    # Run the stages in pipeline order whatever order they were given in
+    args.stages = [stage for stage in REPROCESS_STAGES if stage in args.stages]
+    if args.batch:
+        if "transcription" in args.stages:
+            parser.error("transcription is not available with --batch, run it online first")
+        if "analytics" in args.stages:
+            # Merging answers one by one defeats the bulk apply, rebuild the categories instead
+            args.stages.remove("analytics")
+            args.recluster = True
+        args.chunk_size = args.batch_size or 10000
+        if not args.dry_run:
+            args.provider = get_batch_provider(args.provider)
+
+    print("Running reprocessing...")
+    try:
+        success = reprocess(args)
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted, run the same command again to resume")
+        sys.exit(130)
+
+    if success:
+        print("\n🎉 Reprocessing completed successfully!")
+    else:
+        print("\n❌ Reprocessing finished with failures!")
+        sys.exit(1)
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from middleware.auth import require_admin
+from utils.background_tasks import background_manager, QUEUED, RUNNING, COMPLETED, FAILED, INTERRUPTED
+from utils.passwords import password_hasher
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/tasks", response_model=None)
+def list_tasks(
+    status: Optional[str] = Query(None, pattern=f"^({QUEUED}|{RUNNING}|{COMPLETED}|{FAILED}|{INTERRUPTED})$", description="Only tasks in this state"),
+    form_id: Optional[int] = Query(None, description="Only tasks working on this form"),
+    kind: Optional[str] = Query(None, description="Only tasks running this function, e.g. run_recluster_job"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Queued and running background tasks and the most recent finished ones, with their stage, wait, duration and error"""
+    return {"tasks": background_manager.list_tasks(status=status, form_id=form_id, kind=kind, limit=limit)}
+
+@router.get("/tasks/stats", response_model=None)
+def task_stats():
+    """Counts and duration percentiles of the background tasks per kind, and the scheduler's queues and waits per lane"""
+    return background_manager.stats()
+
+@router.get("/password-hashing", response_model=None)
+def password_hashing_stats():
+    """Queue depth and counters of the password hashing pool"""
+    return password_hasher.stats()
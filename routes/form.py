@@ -1,16 +1,23 @@
 import os
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from collections import Counter, defaultdict
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload
 from models.form import Form
 from models.form_fields import FormField
 from models.form_response import FormResponse
 from models.form_response_field import FormResponseField
 from schemas.form import FormCreate, FormUpdate, FormOut
-from db import get_db
+from db import get_db, get_read_db, ReadSessionLocal, SessionLocal
 from middleware.auth import get_current_user
 from models.users import User
-from sqlalchemy import func, and_, text
+from sqlalchemy import func, and_, text, select
 from utils.b2 import get_download_authorization, generate_download_url
+from utils.export import stream_csv, stream_parquet, parquet_available
+from utils.form_cache import form_cache
+from utils.fast_json import FastJSONResponse, row_dicts
+from utils.archival import ARCHIVE_FORM_STATUSES, response_models, restore_form, voice_file_prefix
+from utils.question_analytics import question_analytics_cache
 
 
 router = APIRouter(prefix="/forms", tags=["forms"])
@@ -41,55 +48,57 @@ def create_form(form: FormCreate, db: Session = Depends(get_db), current_user: U
     return new_form
 
 @router.get("/", response_model=None)
-def get_forms(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    # Get all forms for the user, not deleted
-    forms = db.query(Form).filter(Form.user_id == current_user.id, Form.status != "deleted").all()
+def get_forms(db: Session = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    # Get all forms for the user, not deleted, as plain rows (no ORM objects to encode)
+    forms = row_dicts(db.execute(
+        select(*Form.__table__.columns).where(Form.user_id == current_user.id, Form.status != "deleted")
+    ))
     # Sort forms by status='active' first
-    forms_sorted = sorted(forms, key=lambda f: f.status != "active")
+    forms_sorted = sorted(forms, key=lambda f: f["status"] != "active")
     # Total forms
     total_forms = len(forms)
     # Active forms
-    active_forms = [f for f in forms if f.status == "active"]
-    
-    # Get all response fields for the user
-    form_ids = [f.id for f in forms]
-    all_response_fields = db.query(FormResponseField).filter(FormResponseField.user_id == current_user.id).all()
-    
-    # Query form_responses by user_id - get both total and completed counts
-    total_responses = db.query(FormResponse).filter(FormResponse.user_id == current_user.id).count()
-    completed_responses = db.query(FormResponse).filter(
-        FormResponse.user_id == current_user.id,
-        FormResponse.status == "completed"
-    ).count()
-    print(total_responses, completed_responses)
+    active_forms = [f for f in forms if f["status"] == "active"]
+    
+    # Query form_responses by user_id - get both total and completed counts in one pass
+    total_responses, completed_responses = db.execute(
+        select(
+            func.count(FormResponse.responseId),
+            func.count(FormResponse.responseId).filter(FormResponse.status == "completed"),
+        ).where(FormResponse.user_id == current_user.id)
+    ).one()
     # Calculate completion rate
     completion_rate = round((completed_responses / total_responses * 100), 2) if total_responses > 0 else 0
     
-    # Calculate average response time
-    response_times = [field.response_time for field in all_response_fields if field.response_time is not None]
-    avg_response_time = round(sum(response_times) / len(response_times), 2) if response_times else 0
+    # Calculate average response time over all of the user's answers (AVG ignores NULLs)
+    avg_response_time = db.execute(
+        select(func.avg(FormResponseField.response_time)).where(FormResponseField.user_id == current_user.id)
+    ).scalar()
+    avg_response_time = round(avg_response_time, 2) if avg_response_time is not None else 0
     
-    return {
+    return FastJSONResponse({
         "forms": forms_sorted,
         "total_forms": total_forms,
         "total_responses": completed_responses,
         "active_forms": len(active_forms),
         "completion_rate": completion_rate,
         "avg_response_time": avg_response_time
-    }
+    })
 
 @router.get("/public/{form_unique_id}", response_model=FormOut)
-def get_form_by_unique_id(form_unique_id: str, db: Session = Depends(get_db)):
-    form = db.query(Form).filter(Form.form_unique_id == form_unique_id, Form.status != "deleted").first()
-    if not form:
+def get_form_by_unique_id(form_unique_id: str, request: Request, db: Session = Depends(get_db)):
+    # Served from the in-process cache, fields are already ordered by question_number
+    form = form_cache.get_by_unique_id(db, form_unique_id)
+    if not form or form.is_deleted:
         raise HTTPException(status_code=404, detail="Form not found")
-    # Order fields by question_number
-    form.fields.sort(key=lambda f: f.question_number)
-    return form
+    headers = {"ETag": form.etag, "Cache-Control": "no-cache"}
+    if form.etag_matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=form.payload, media_type="application/json", headers=headers)
 
 @router.get("/{form_id}", response_model=FormOut)
 def get_form(form_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    form = db.query(Form).filter(Form.id == form_id, Form.user_id == current_user.id, Form.status != "deleted").first()
+    form = db.query(Form).options(selectinload(Form.fields)).filter(Form.id == form_id, Form.user_id == current_user.id, Form.status != "deleted").first()
     if not form:
         raise HTTPException(status_code=404, detail="Form not found")
     return form
@@ -99,10 +108,18 @@ def update_form(form_id: int, form: FormUpdate, db: Session = Depends(get_db), c
     db_form = db.query(Form).filter(Form.id == form_id, Form.user_id == current_user.id).first()
     if not db_form:
         raise HTTPException(status_code=404, detail="Form not found")
-    for key, value in form.dict(exclude_unset=True).items():
+    changes = form.dict(exclude_unset=True)
+    if db_form.archived_at is not None and changes.get("status", db_form.status) not in ARCHIVE_FORM_STATUSES:
+        # Reopening, the responses move back to the hot tables where new submissions go
+        try:
+            restore_form(db, db_form.id)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Restoring the archived responses failed: {str(e)}")
+    for key, value in changes.items():
         setattr(db_form, key, value)
     db.commit()
     db.refresh(db_form)
+    form_cache.invalidate(form_id=db_form.id, form_unique_id=db_form.form_unique_id)
     return db_form
 
 @router.delete("/{form_id}")
@@ -114,19 +131,23 @@ def delete_form(form_id: int, db: Session = Depends(get_db), current_user: User
     # Set status to deleted instead of actually deleting
     db_form.status = "deleted"
     db.commit()
+    form_cache.invalidate(form_id=db_form.id, form_unique_id=db_form.form_unique_id)
     return {"detail": "Form deleted"}
 
 @router.get("/{form_id}/results", response_model=None)
-def get_form_results(form_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_form_results(form_id: int, db: Session = Depends(get_read_db), current_user: User = Depends(get_current_user)):
     """Get form results and analytics for the results page"""
     # Verify form ownership
-    form = db.query(Form).filter(Form.id == form_id, Form.user_id == current_user.id, Form.status != "deleted").first()
+    form = db.query(Form).options(selectinload(Form.fields)).filter(Form.id == form_id, Form.user_id == current_user.id, Form.status != "deleted").first()
     if not form:
         raise HTTPException(status_code=404, detail="Form not found")
     
+    # Hot tables, or the archive tables once the form has been archived
+    Response, Answer = response_models(form)
+    
     # Get all responses for this form (both completed and in-progress)
-    all_responses = db.query(FormResponse).filter(
-        FormResponse.formId == form_id
+    all_responses = db.query(Response).filter(
+        Response.formId == form_id
     ).all()
     
     # Get completed responses only
@@ -134,8 +155,9 @@ def get_form_results(form_id: int, db: Session = Depends(get_db), current_user:
     
     # Get all response fields for completed responses
     response_ids = [r.responseId for r in completed_responses]
-    all_response_fields = db.query(FormResponseField).filter(
-        FormResponseField.formResponseId.in_(response_ids)
+    all_response_fields = db.query(Answer).filter(
+        Answer.formId == form_id,
+        Answer.formResponseId.in_(response_ids)
     ).all()
     
     # Calculate analytics
@@ -149,16 +171,20 @@ def get_form_results(form_id: int, db: Session = Depends(get_db), current_user:
     # Calculate completion rate (completed responses / total responses)
     completion_rate = round((completed_count / total_responses * 100), 2) if total_responses > 0 else 0
     
+    # Answer counts per question and per response, built in one pass over the answers
+    answers_per_question = Counter(f.formfeildId for f in all_response_fields)
+    answers_per_response = Counter(f.formResponseId for f in all_response_fields)
+    
     # Get question-wise breakdown
     question_breakdown = []
     if form.fields:
         for field in form.fields:
-            field_responses = [f for f in all_response_fields if f.formfeildId == field.id]
+            response_count = answers_per_question[field.id]
             question_breakdown.append({
                 "question_id": field.id,
                 "question_text": field.question,
-                "response_count": len(field_responses),
-                "percentage": round((len(field_responses) / completed_count * 100), 2) if completed_count > 0 else 0
+                "response_count": response_count,
+                "percentage": round((response_count / completed_count * 100), 2) if completed_count > 0 else 0
             })
     
     # Get completion funnel
@@ -167,11 +193,10 @@ def get_form_results(form_id: int, db: Session = Depends(get_db), current_user:
         total_questions = len(form.fields)
         for i in range(total_questions):
             question_num = i + 1
-            responses_at_question = 0
-            for response in completed_responses:
-                response_fields = [f for f in all_response_fields if f.formResponseId == response.responseId]
-                if len(response_fields) >= question_num:
-                    responses_at_question += 1
+            responses_at_question = sum(
+                1 for response in completed_responses
+                if answers_per_response[response.responseId] >= question_num
+            )
             
             completion_funnel.append({
                 "question": f"Q{question_num}",
@@ -226,6 +251,14 @@ def get_form_results(form_id: int, db: Session = Depends(get_db), current_user:
         "analytics": analytics_data
     }
 
+@router.get("/{form_id}/question-analytics", response_model=None)
+def get_question_analytics(form_id: int, db: Session = Depends(get_read_db), current_user: User = Depends(get_current_user)):
+    """Per-question sentiment, language mix and response-time percentiles, cached until the next submission"""
+    form = db.query(Form).options(selectinload(Form.fields)).filter(Form.id == form_id, Form.user_id == current_user.id, Form.status != "deleted").first()
+    if not form:
+        raise HTTPException(status_code=404, detail="Form not found")
+    return FastJSONResponse(question_analytics_cache.get(form, SessionLocal))
+
 @router.get("/{form_id}/responses", response_model=None)
 def get_form_responses_paginated(
     form_id: int, 
@@ -233,49 +266,75 @@ def get_form_responses_paginated(
     limit: int = 10,
     question_filter: str = None,
     search: str = None,
-    db: Session = Depends(get_db), 
+    db: Session = Depends(get_read_db), 
     current_user: User = Depends(get_current_user)
 ):
     
     # Verify form ownership
-    form = db.query(Form).filter(Form.id == form_id, Form.user_id == current_user.id, Form.status != "deleted").first()
+    form = db.query(Form).options(selectinload(Form.fields)).filter(Form.id == form_id, Form.user_id == current_user.id, Form.status != "deleted").first()
     if not form:
         raise HTTPException(status_code=404, detail="Form not found")
     
+    # Hot tables, or the archive tables once the form has been archived
+    Response, Answer = response_models(form)
+    
+    # Question text by field id
+    questions = {f.id: f.question for f in form.fields}
+    
     # Get completed responses with pagination
     offset = (page - 1) * limit
     
     # Base query for completed responses
-    base_query = db.query(FormResponse).filter(
-        FormResponse.formId == form_id,
+    base_query = db.query(Response).filter(
+        Response.formId == form_id,
     )
     
     # Apply search filter if provided
     if search:
         # Search in response fields text
         search_query = f"%{search}%"
-        response_ids_with_search = db.query(FormResponseField.formResponseId).filter(
-            FormResponseField.formId == form_id,
-            FormResponseField.responseText.ilike(search_query)
+        response_ids_with_search = db.query(Answer.formResponseId).filter(
+            Answer.formId == form_id,
+            Answer.responseText.ilike(search_query)
         ).distinct()
-        base_query = base_query.filter(FormResponse.responseId.in_(response_ids_with_search))
+        base_query = base_query.filter(Response.responseId.in_(response_ids_with_search))
     
     # Get total count for pagination
     total_count = base_query.count()
     
-    # Get paginated responses
-    responses = base_query.offset(offset).limit(limit).all()
+    # Get paginated responses as plain rows
+    responses = base_query.with_entities(
+        Response.responseId,
+        Response.created_at,
+        Response.language,
+    ).offset(offset).limit(limit).all()
     
-    # Get response fields for these responses
+    # Get response fields for these responses, only the columns the page shows
     response_ids = [r.responseId for r in responses]
-    response_fields = db.query(FormResponseField).filter(
-        FormResponseField.formResponseId.in_(response_ids)
+    response_fields = db.execute(
+        select(
+            Answer.formResponseId,
+            Answer.formfeildId,
+            Answer.responseText,
+            Answer.transcribed_text,
+            Answer.translated_text,
+            Answer.categories,
+            Answer.response_time,
+            Answer.voiceFileLink,
+            Answer.sentiment,
+            Answer.language,
+        ).where(Answer.formId == form_id, Answer.formResponseId.in_(response_ids))
     ).all()
     
+    # Answers by response id
+    fields_by_response = defaultdict(list)
+    for field in response_fields:
+        fields_by_response[field.formResponseId].append(field)
+    
     # Group responses by user/response
     formatted_responses = []
     for response in responses:
-        user_response_fields = [f for f in response_fields if f.formResponseId == response.responseId]
+        user_response_fields = fields_by_response[response.responseId]
         
         # Apply question filter if provided
         if question_filter and question_filter != "all":
@@ -283,7 +342,7 @@ def get_form_responses_paginated(
         
         if user_response_fields:  # Only include if there are fields to show
             # Generate download URLs for voice files
-            file_prefix = f"{form.user_id}/{form.id}/responses/{response.responseId}/"
+            file_prefix = voice_file_prefix(form, response.responseId)
             auth_token = get_download_authorization(file_prefix, 86400)
             
             formatted_responses.append({
@@ -294,7 +353,7 @@ def get_form_responses_paginated(
                 "responses": [
                     {
                         "question_id": field.formfeildId,
-                        "question_text": next((f.question for f in form.fields if f.id == field.formfeildId), "Unknown Question"),
+                        "question_text": questions.get(field.formfeildId, "Unknown Question"),
                         "transcript": field.responseText or "No text response",
                         "transcribed_text": field.transcribed_text or "No AI transcription available",
                         "translated_text": field.translated_text,
@@ -302,14 +361,14 @@ def get_form_responses_paginated(
                         "response_time": field.response_time,  # Raw response time for duration calculation
                         "duration": f"{field.response_time:.1f}s" if field.response_time else "0s",
                         "voice_file": generate_download_url(field.voiceFileLink, auth_token) if field.voiceFileLink else None,
-                        "sentiment": getattr(field, 'sentiment', 'neutral') or "neutral",
-                        "language": getattr(field, 'language', 'en') or "en"
+                        "sentiment": field.sentiment or "neutral",
+                        "language": field.language or "en"
                     }
                     for field in user_response_fields
                 ]
             })
     
-    return {
+    return FastJSONResponse({
         "responses": formatted_responses,
         "pagination": {
             "page": page,
@@ -317,4 +376,35 @@ def get_form_responses_paginated(
             "total": total_count,
             "pages": (total_count + limit - 1) // limit
         }
-    }
\ No newline at end of file
+    })
+
+@router.get("/{form_id}/export", response_model=None)
+def export_form_responses(
+    form_id: int,
+    format: str = "csv",
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream all answers of a form as CSV or Parquet with constant memory use"""
+    # Verify form ownership
+    form = db.query(Form).filter(Form.id == form_id, Form.user_id == current_user.id, Form.status != "deleted").first()
+    if not form:
+        raise HTTPException(status_code=404, detail="Form not found")
+    
+    if format == "csv":
+        body = stream_csv(form_id, ReadSessionLocal, archived=form.archived_at is not None)
+        media_type = "text/csv; charset=utf-8"
+    elif format == "parquet":
+        if not parquet_available():
+            raise HTTPException(status_code=400, detail="Parquet export requires pyarrow to be installed")
+        body = stream_parquet(form_id, ReadSessionLocal, archived=form.archived_at is not None)
+        media_type = "application/vnd.apache.parquet"
+    else:
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'parquet'")
+    
+    filename = f"form_{form.form_unique_id}_responses.{format}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
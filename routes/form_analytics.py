@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from models.form_analytics import FormAnalytics
+from models.users import User
+from middleware.auth import get_current_user
 from schemas.form_analytics import FormAnalyticsOut, FormAnalyticsCreate, FormAnalyticsUpdate
-from db import get_db
+from db import get_db, get_read_db, SessionLocal
 from typing import List, Optional
 from datetime import datetime
+from utils.background_tasks import background_manager
+from utils.fast_json import FastJSONResponse
+from utils.form_cache import form_cache
+from utils.rollups import load_trends
+from utils.scheduler import LANE_BACKFILL
 
 router = APIRouter(prefix="/form-analytics", tags=["form-analytics"])
 
@@ -25,12 +32,12 @@ def create_form_analytics(
     return new_analytics
 
 @router.get("/", response_model=List[FormAnalyticsOut])
-def get_all_form_analytics(db: Session = Depends(get_db)):
+def get_all_form_analytics(db: Session = Depends(get_read_db)):
     """Get all form analytics"""
     return db.query(FormAnalytics).all()
 
 @router.get("/form/{form_id}", response_model=Optional[FormAnalyticsOut])
-def get_form_analytics(form_id: int, db: Session = Depends(get_db)):
+def get_form_analytics(form_id: int, db: Session = Depends(get_read_db)):
     """Get analytics for a specific form"""
     analytics = db.query(FormAnalytics).filter(
         FormAnalytics.formId == form_id,
@@ -90,7 +97,7 @@ def delete_form_analytics(analytics_id: int, db: Session = Depends(get_db)):
     return {"detail": "Form analytics deleted successfully"}
 
 @router.get("/form/{form_id}/summary", response_model=dict)
-def get_form_analytics_summary(form_id: int, db: Session = Depends(get_db)):
+def get_form_analytics_summary(form_id: int, db: Session = Depends(get_read_db)):
     """Get analytics summary for a specific form"""
     analytics = db.query(FormAnalytics).filter(
         FormAnalytics.formId == form_id,
@@ -128,3 +135,47 @@ def get_form_analytics_summary(form_id: int, db: Session = Depends(get_db)):
         "categories": categories,
         "last_updated": analytics.update_timestamp
     }
+
+@router.get("/form/{form_id}/trends", response_model=dict)
+def get_form_trends(
+    form_id: int,
+    interval: str = Query("day", pattern="^(hour|day)$", description="Bucket size"),
+    since: Optional[datetime] = Query(None, description="Start of the range, default 48 hours or 90 days back"),
+    until: Optional[datetime] = Query(None, description="End of the range (exclusive), default now"),
+    db: Session = Depends(get_read_db)
+):
+    """Responses, completions, response time, sentiment and language per hour or day, read from the rollups"""
+    if not form_cache.get_by_id(db, form_id):
+        raise HTTPException(status_code=404, detail="Form not found")
+    try:
+        trends = load_trends(db, form_id, interval, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(trends)
+
+@router.post("/form/{form_id}/recluster", status_code=status.HTTP_202_ACCEPTED)
+def recluster_form_analytics(form_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Rebuild a form's categories by batch clustering its responses in the background"""
+    # Reclustering makes embedding and LLM calls for the whole form, only its owner may start it
+    form = form_cache.get_by_id(db, form_id)
+    if not form or form.is_deleted or form.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Form not found")
+
+    analytics = db.query(FormAnalytics).filter(FormAnalytics.formId == form_id).first()
+    if not analytics:
+        raise HTTPException(
+            status_code=404, 
+            detail=f"Analytics not found for form ID {form_id}"
+        )
+    
+    # Imported here, numpy and the clustering code are only needed once a job runs
+    from utils.reclustering import run_recluster_job
+
+    task_id = f"recluster_form_{form_id}"
+    queued = background_manager.submit(
+        task_id, run_recluster_job, form_id, SessionLocal,
+        tenant=form.owner_id, lane=LANE_BACKFILL, form_id=form_id
+    )
+    if not queued:
+        raise HTTPException(status_code=503, detail="Server is shutting down, retry shortly")
+    return {"detail": "Reclustering started", "task_id": task_id}
@@ -1,30 +1,154 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form as FastAPIForm
+from pydantic import ValidationError
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from models.form_response import FormResponse
-from schemas.form_response import FormResponseCreate, FormResponseUpdate, FormResponseOut
-from db import get_db
+from models.form_response_field import FormResponseField
+from schemas.form_response import FormResponseCreate, FormResponseUpdate, FormResponseOut, FormResponseSubmit, FormResponseSubmitOut
+from db import get_db, SessionLocal
+from datetime import datetime
+from typing import List
 from models.form import Form
 from middleware.auth import get_current_user
+from middleware.rate_limit import enforce_form_rate_limit
 from models.users import User
+from utils.background_tasks import start_batch_background_processing
+from utils.processing_status import QUEUED, DONE, lease_expiry
+from utils.form_cache import form_cache
+from utils.question_analytics import question_analytics_cache
+from utils.rollups import record_responses
 
 router = APIRouter(prefix="/form-responses", tags=["form-responses"])
 
 @router.post("/", response_model=FormResponseOut)
 def create_form_response(form_response: FormResponseCreate, db: Session = Depends(get_db)):
     # Get the form to determine the user_id
-    form = db.query(Form).filter(Form.id == form_response.formId).first()
+    form = form_cache.get_by_id(db, form_response.formId)
     if not form:
         raise HTTPException(status_code=404, detail="Form not found")
+    if form.is_archived:
+        raise HTTPException(status_code=410, detail="Form is archived and no longer accepts responses")
+    enforce_form_rate_limit(form.form_id)
     
     new_response = FormResponse(
         **form_response.dict(),
-        user_id=form.user_id  # Use the form owner's user_id
+        user_id=form.owner_id  # Use the form owner's user_id
     )
     db.add(new_response)
+    db.flush()
+    db.refresh(new_response)  # created_at selects the rollup bucket
+    record_responses(db, form.form_id, new_response.created_at, submitted=1)
     db.commit()
     db.refresh(new_response)
     return new_response
 
+@router.post("/submit", response_model=FormResponseSubmitOut)
+def submit_form_response(
+    payload: str = FastAPIForm(..., description="JSON encoded FormResponseSubmit"),
+    files: List[UploadFile] = File([]),
+    db: Session = Depends(get_db)
+):
+    """Submit a complete response (all answers plus optional audio) in one request and one transaction"""
+    try:
+        submission = FormResponseSubmit(**json.loads(payload))
+    except (json.JSONDecodeError, TypeError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid payload: {str(e)}")
+
+    form = form_cache.get_by_id(db, submission.formId)
+    if not form or form.is_deleted:
+        raise HTTPException(status_code=404, detail="Form not found")
+    if form.is_archived:
+        raise HTTPException(status_code=410, detail="Form is archived and no longer accepts responses")
+    enforce_form_rate_limit(form.form_id)
+
+    # Validate all answers against the form's fields at once
+    answered = set()
+    for answer in submission.answers:
+        if answer.formfeildId not in form.field_ids:
+            raise HTTPException(status_code=400, detail=f"Field {answer.formfeildId} does not belong to this form")
+        if answer.formfeildId in answered:
+            raise HTTPException(status_code=400, detail=f"Field {answer.formfeildId} is answered more than once")
+        if answer.fileIndex is not None and not 0 <= answer.fileIndex < len(files):
+            raise HTTPException(status_code=400, detail=f"fileIndex {answer.fileIndex} does not match an uploaded file")
+        if answer.fileIndex is not None or (answer.responseText and answer.responseText.strip()):
+            answered.add(answer.formfeildId)
+    missing = sorted(form.required_field_ids - answered)
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Required fields are missing answers: {missing}")
+
+    owner_id = form.owner_id
+    form_id = form.form_id
+    new_response = FormResponse(
+        formId=form_id,
+        user_id=owner_id,  # Use the form owner's user_id
+        status="completed",
+        submitTimestamp=datetime.utcnow(),
+        language=submission.language
+    )
+    db.add(new_response)
+    db.flush()
+
+    # One multi-row INSERT for every answer
+    leased_until = lease_expiry()
+    rows = [
+        {
+            "formResponseId": new_response.responseId,
+            "formId": form_id,
+            "formfeildId": answer.formfeildId,
+            "user_id": owner_id,
+            "responseText": answer.responseText,
+            "response_time": answer.responseTime,
+            "sentiment": "neutral",  # Will be updated by background task
+            "language": "en",  # Will be updated by background task
+            "processing_status": QUEUED if answer.fileIndex is not None or answer.responseText else DONE,
+            "processing_progress": 0 if answer.fileIndex is not None or answer.responseText else 100,
+            "processing_lease_expires_at": leased_until if answer.fileIndex is not None or answer.responseText else None,
+        }
+        for answer in submission.answers
+    ]
+    new_fields = db.scalars(insert(FormResponseField).returning(FormResponseField), rows).all() if rows else []
+    db.refresh(new_response)
+    record_responses(
+        db, form_id, new_response.created_at,
+        submitted=1, response_times=[answer.responseTime for answer in submission.answers]
+    )
+    record_responses(db, form_id, new_response.submitTimestamp, completed=1)
+    # Serialize before commit so expired attributes are not reloaded row by row
+    result = FormResponseSubmitOut(response=new_response, fields=new_fields)
+    response_id = new_response.responseId
+    db.commit()
+    question_analytics_cache.invalidate(form_id)
+
+    # Queue the heavy processing of all answers as one batch
+    items = []
+    for answer in submission.answers:
+        file_content = None
+        file_name = None
+        file_content_type = None
+        if answer.fileIndex is not None:
+            upload = files[answer.fileIndex]
+            file_ext = upload.filename.split('.')[-1]
+            file_name = f"{owner_id}/{form_id}/responses/{response_id}/{answer.question_number}.{file_ext}"
+            file_content = upload.file.read()
+            file_content_type = upload.content_type
+        if file_content or answer.responseText:
+            items.append({
+                "formResponseId": response_id,
+                "formId": form_id,
+                "formfeildId": answer.formfeildId,
+                "responseText": answer.responseText,
+                "file_content": file_content,
+                "file_name": file_name,
+                "file_content_type": file_content_type,
+                "question_number": answer.question_number,
+                "responseTime": answer.responseTime,
+                "user_id": owner_id,
+            })
+    start_batch_background_processing(response_id, items, SessionLocal)
+
+    return result
+
 @router.get("/", response_model=list[FormResponseOut])
 def get_form_responses(db: Session = Depends(get_db)):
     return db.query(FormResponse).all()
@@ -56,9 +180,15 @@ def update_form_response(response_id: int, form_response: FormResponseUpdate, db
     db_response = db.query(FormResponse).filter(FormResponse.responseId == response_id).first()
     if not db_response:
         raise HTTPException(status_code=404, detail="FormResponse not found")
+    was_completed = db_response.status == "completed"
     for key, value in form_response.dict(exclude_unset=True).items():
         setattr(db_response, key, value)
+    completed = not was_completed and db_response.status == "completed"
+    if completed and db_response.submitTimestamp:
+        record_responses(db, db_response.formId, db_response.submitTimestamp, completed=1)
     db.commit()
+    if completed:
+        question_analytics_cache.invalidate(db_response.formId)
     db.refresh(db_response)
     return db_response
 
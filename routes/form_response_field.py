@@ -1,4 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form as FastAPIForm
+import asyncio
+import json
+import os
+import time
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Form as FastAPIForm, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from models.form_response_field import FormResponseField
 from models.form_response import FormResponse
@@ -9,11 +17,37 @@ from utils.b2 import get_download_authorization, generate_download_url
 from utils.background_tasks import start_background_processing
 from typing import Optional
 from models.form import Form
+from utils.form_cache import form_cache
+from middleware.rate_limit import enforce_form_rate_limit
+from utils.fast_json import FastJSONResponse, row_dicts
+from utils.question_analytics import question_analytics_cache
+from utils.rollups import record_responses
+from utils.processing_status import (
+    processing_events,
+    field_status_event,
+    status_snapshot,
+    QUEUED,
+    DONE,
+    TERMINAL_STATUSES,
+    lease_expiry,
+)
 
 router = APIRouter(prefix="/form-response-fields", tags=["form-response-fields"])
 
+# Idle interval after which the SSE feed re-reads statuses (changes made by other workers) and sends a keep-alive
+SSE_REFRESH_SECONDS = float(os.getenv("SSE_REFRESH_SECONDS", "10"))
+# Upper bound on how long one SSE connection is kept open, clients reconnect after it
+SSE_MAX_SECONDS = float(os.getenv("SSE_MAX_SECONDS", "600"))
+
+def _find_answer(db: Session, formId: int, formResponseId: int, formfeildId: int) -> Optional[FormResponseField]:
+    return db.query(FormResponseField).filter(
+        FormResponseField.formId == formId,
+        FormResponseField.formResponseId == formResponseId,
+        FormResponseField.formfeildId == formfeildId
+    ).first()
+
 @router.post("/", response_model=FormResponseFieldOut)
-async def create_form_response_field(
+def create_form_response_field(
     formResponseId: int = FastAPIForm(...),
     formId: int = FastAPIForm(...),
     formfeildId: int = FastAPIForm(...),
@@ -28,15 +62,27 @@ async def create_form_response_field(
         raise HTTPException(status_code=400, detail="formResponseId and formfeildId are required.")
 
     # Get the form to determine the user_id
-    form = db.query(Form).filter(Form.id == formId).first()
+    form = form_cache.get_by_id(db, formId)
     if not form:
         raise HTTPException(status_code=404, detail="Form not found")
+    if form.is_archived:
+        raise HTTPException(status_code=410, detail="Form is archived and no longer accepts responses")
+    enforce_form_rate_limit(form.form_id)
 
-    form_response_obj = db.query(FormResponse).filter(FormResponse.responseId == formResponseId).first()
+    # formId prunes the lookup to one partition, and a response of another form is not found
+    form_response_obj = db.query(FormResponse).filter(
+        FormResponse.responseId == formResponseId,
+        FormResponse.formId == formId
+    ).first()
 
     if not form_response_obj:
         raise HTTPException(status_code=404, detail="FormResponse not found")
 
+    # A retried submission returns the answer that is already stored, without processing it again
+    existing_field = _find_answer(db, formId, formResponseId, formfeildId)
+    if existing_field:
+        return existing_field
+
     if form_response_obj.status == "completed":
         raise HTTPException(status_code=400, detail="FormResponse is already completed")
 
@@ -46,37 +92,54 @@ async def create_form_response_field(
     file_content_type = None
     
     if file:
-        user_id = form.user_id if form else "unknown"
+        user_id = form.owner_id
         file_ext = file.filename.split('.')[-1]
         file_name = f"{user_id}/{formId}/responses/{formResponseId}/{question_number}.{file_ext}"
-        file_content = await file.read()
+        file_content = file.file.read()
         file_content_type = file.content_type
 
-    # Create the initial database record immediately (without processed data)
-    new_field = FormResponseField(
-        formResponseId=formResponseId,
-        formId=formId,
-        formfeildId=formfeildId,
-        responseText=responseText,
-        voiceFileLink=None,  # Will be updated by background task
-        response_time=responseTime,
-        transcribed_text=None,  # Will be updated by background task
-        translated_text=None,  # Will be updated by background task
-        categories=None,  # Will be updated by background task
-        sentiment="neutral",  # Will be updated by background task
-        language="en",  # Will be updated by background task
-        user_id=form.user_id
-    )
-    db.add(new_field)
+    # Create the initial database record immediately (without processed data); a concurrent
+    # retry that got here first wins the unique key and this insert returns nothing
+    new_field = db.scalars(
+        pg_insert(FormResponseField)
+        .values(
+            formResponseId=formResponseId,
+            formId=formId,
+            formfeildId=formfeildId,
+            responseText=responseText,
+            voiceFileLink=None,  # Will be updated by background task
+            response_time=responseTime,
+            transcribed_text=None,  # Will be updated by background task
+            translated_text=None,  # Will be updated by background task
+            categories=None,  # Will be updated by background task
+            sentiment="neutral",  # Will be updated by background task
+            language="en",  # Will be updated by background task
+            processing_status=QUEUED if file_content or responseText else DONE,
+            processing_progress=0 if file_content or responseText else 100,
+            processing_lease_expires_at=lease_expiry() if file_content or responseText else None,
+            user_id=form.owner_id
+        )
+        .on_conflict_do_nothing(index_elements=["formId", "formResponseId", "formfeildId"])
+        .returning(FormResponseField)
+    ).first()
+    if new_field is None:
+        db.rollback()
+        return _find_answer(db, formId, formResponseId, formfeildId)
+
+    record_responses(db, formId, form_response_obj.created_at, response_times=[responseTime])
 
     # Mark form as completed if this is the last question
     if isLastQuestion:
         form_response_obj.status = "completed"
         form_response_obj.submitTimestamp = datetime.utcnow()
+        record_responses(db, formId, form_response_obj.submitTimestamp, completed=1)
 
     # Commit the initial record immediately
     db.commit()
+    if isLastQuestion:
+        question_analytics_cache.invalidate(formId)
     db.refresh(new_field)
+    processing_events.publish(formResponseId, field_status_event(new_field))
 
     # Start background processing for heavy operations
     if file_content or responseText:
@@ -90,7 +153,7 @@ async def create_form_response_field(
             file_content_type=file_content_type,
             question_number=question_number,
             responseTime=responseTime,
-            user_id=form.user_id,
+            user_id=form.owner_id,
             db_session_factory=SessionLocal
         )
 
@@ -103,25 +166,95 @@ def get_form_response_fields(db: Session = Depends(get_db)):
 
 @router.get("/by-response/{form_response_id}", response_model=list[FormResponseFieldOut])
 def get_form_response_fields_by_response_id(form_response_id: int, db: Session = Depends(get_db)):
-    fields = db.query(FormResponseField).filter(FormResponseField.formResponseId == form_response_id).all()
+    # Plain rows with exactly the FormResponseFieldOut columns, returned without per-row model validation
+    fields = row_dicts(db.execute(
+        select(*(FormResponseField.__table__.c[name] for name in FormResponseFieldOut.model_fields))
+        .where(FormResponseField.formResponseId == form_response_id)
+    ))
     if not fields:
-        return []
+        return FastJSONResponse([])
 
-    form_response_obj = db.query(FormResponse).filter(FormResponse.responseId == form_response_id).first()
-    form_id = form_response_obj.formId
-    form_obj = db.query(Form).filter(Form.id == form_id).first()
+    owner_id, form_id = db.execute(
+        select(Form.user_id, Form.id)
+        .join(FormResponse, FormResponse.formId == Form.id)
+        .where(FormResponse.responseId == form_response_id)
+    ).one()
     
-    file_prefix = f"{form_obj.user_id}/{form_id}/responses/{form_response_id}/"
+    file_prefix = f"{owner_id}/{form_id}/responses/{form_response_id}/"
     
     auth_token = get_download_authorization(file_prefix, 86400)
-    print(f"Authorization Token: {auth_token}")
     
     # Process each field to get fresh download URLs for voice files
     for field in fields:
-        if field.voiceFileLink:
-            field.voiceFileLink = generate_download_url(field.voiceFileLink, auth_token)
+        if field["voiceFileLink"]:
+            field["voiceFileLink"] = generate_download_url(field["voiceFileLink"], auth_token)
     
-    return fields
+    return FastJSONResponse(fields)
+
+def _load_processing_snapshot(form_response_id: int) -> dict:
+    """Current processing status of every field of a response, read with a short-lived session"""
+    db = SessionLocal()
+    try:
+        response = db.query(FormResponse.status).filter(FormResponse.responseId == form_response_id).first()
+        fields = db.query(FormResponseField).filter(FormResponseField.formResponseId == form_response_id).all()
+        return {
+            "formResponseId": form_response_id,
+            "response_status": response.status if response else None,
+            "fields": status_snapshot(fields),
+        }
+    finally:
+        db.close()
+
+def _processing_finished(snapshot: dict) -> bool:
+    """No more status changes are expected once the response is submitted and every field is done or failed"""
+    return snapshot["response_status"] == "completed" and all(
+        field["processing_status"] in TERMINAL_STATUSES for field in snapshot["fields"]
+    )
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.get("/by-response/{form_response_id}/events")
+async def stream_form_response_field_status(form_response_id: int, request: Request):
+    """Server-Sent Events feed of processing status changes for the fields of a response"""
+    snapshot = await run_in_threadpool(_load_processing_snapshot, form_response_id)
+    if snapshot["response_status"] is None:
+        raise HTTPException(status_code=404, detail="FormResponse not found")
+
+    async def event_stream():
+        queue = processing_events.subscribe(form_response_id)
+        try:
+            current = snapshot
+            yield _sse_event("snapshot", current)
+            statuses = {field["responsefieldId"]: field for field in current["fields"]}
+            deadline = time.monotonic() + SSE_MAX_SECONDS
+            while not _processing_finished(current) and time.monotonic() < deadline:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_REFRESH_SECONDS)
+                    statuses[event["responsefieldId"]] = event
+                    current = {**current, "fields": list(statuses.values())}
+                    yield _sse_event("status", event)
+                except asyncio.TimeoutError:
+                    # Changes made by other worker processes do not reach this queue, re-read them
+                    refreshed = await run_in_threadpool(_load_processing_snapshot, form_response_id)
+                    if refreshed != current:
+                        current = refreshed
+                        statuses = {field["responsefieldId"]: field for field in current["fields"]}
+                        yield _sse_event("snapshot", current)
+                    else:
+                        yield ": keep-alive\n\n"
+            if _processing_finished(current):
+                yield _sse_event("done", {"formResponseId": form_response_id})
+        finally:
+            processing_events.unsubscribe(form_response_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/{responsefield_id}", response_model=FormResponseFieldOut)
 def get_form_response_field(responsefield_id: int, db: Session = Depends(get_db)):
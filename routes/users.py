@@ -4,76 +4,71 @@ from models.users import User
 from models import Base
 from schemas.users import UserCreate, UserUpdate, UserOut
 from db import get_db
-from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
 from datetime import datetime, timedelta
 from middleware.auth import get_current_user
-from authlib.integrations.starlette_client import OAuth
 from fastapi import Request, Response
 import os
 from validators.users import validate_user_create
 from utils.users import create_access_token
+from utils.oauth import google_client
+from utils.passwords import password_hasher
 
 router = APIRouter(prefix="/users", tags=["users"])
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# Google OAuth config
-GOOGLE_CLIENT_ID = os.getenv("GOOGLE_OAUTH_CLIENT_ID")
-GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_OAUTH_CLIENT_SECRET")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
-oauth = OAuth()
-oauth.register(
-    name='google',
-    client_id=GOOGLE_CLIENT_ID,
-    client_secret=GOOGLE_CLIENT_SECRET,
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={
-        'scope': 'openid email profile',
-    },
-)
-
 @router.post("/", response_model=UserOut)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    validate_user_create(user, db)
-    hashed_password = pwd_context.hash(user.password)
+async def create_user(user: UserCreate, db: Session = Depends(get_db)):
+    # Async so bcrypt runs on the password hashing pool, not on the threadpool shared by sync routes
+    await run_in_threadpool(validate_user_create, user, db)
+    hashed_password = await password_hasher.hash(user.password)
     new_user = User(
         name=user.name,
         username=user.username,
         email=user.email,
         password=hashed_password,
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+
+    def save():
+        db.add(new_user)
+        db.commit()
+        db.refresh(new_user)
+
+    await run_in_threadpool(save)
     return new_user
 
 @router.post("/login")
-def login_user(form_data: dict, db: Session = Depends(get_db)):
+async def login_user(form_data: dict, db: Session = Depends(get_db)):
     username = form_data.get("username")
     password = form_data.get("password")
-    user = db.query(User).filter(User.username == username).first()
+    user = await run_in_threadpool(lambda: db.query(User).filter(User.username == username).first())
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    if not pwd_context.verify(password, user.password):
+    valid, new_hash = await password_hasher.verify_and_update(password, user.password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
+    if new_hash:
+        # Stored with an outdated work factor, upgrade it while the plain password is at hand
+        user.password = new_hash
+        await run_in_threadpool(db.commit)
     access_token = create_access_token({"sub": str(user.id)}, expires_delta=timedelta(minutes=60))
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/auth/google/login")
 async def google_login(request: Request):
     redirect_uri = request.url_for('google_callback')
-    return await oauth.google.authorize_redirect(request, redirect_uri)
+    return await google_client().authorize_redirect(request, redirect_uri)
 
 @router.get("/auth/google/callback")
 async def google_callback(request: Request, db: Session = Depends(get_db)):
-    token = await oauth.google.authorize_access_token(request)
+    token = await google_client().authorize_access_token(request)
     userinfo = token.get("userinfo")
     if userinfo:
         email = userinfo.get("email")
         name = userinfo.get("name")
     else:
-        user_info = await oauth.google.parse_id_token(token)
+        user_info = await google_client().parse_id_token(token)
         email = user_info.get("email")
         name = user_info.get("name")
     # Find or create user
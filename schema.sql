@@ -34,6 +34,7 @@ CREATE TABLE "public"."forms" (
     "status" varchar(20) NOT NULL,
     "created_at" timestamp DEFAULT now(),
     "updated_at" timestamp DEFAULT now(),
+    "archived_at" timestamp,
     "is_public" int4,
     "form_unique_id" varchar(36) NOT NULL,
     CONSTRAINT "forms_user_id_fkey" FOREIGN KEY ("user_id") REFERENCES "public"."users"("id"),
@@ -84,8 +85,11 @@ CREATE TABLE "public"."form_responses" (
     "user_id" int4,
     CONSTRAINT "fk_form_responses_user_id" FOREIGN KEY ("user_id") REFERENCES "public"."users"("id"),
     CONSTRAINT "form_responses_formId_fkey" FOREIGN KEY ("formId") REFERENCES "public"."forms"("id"),
-    PRIMARY KEY ("responseId")
-);
+    PRIMARY KEY ("responseId", "formId")
+) PARTITION BY RANGE ("formId");
+
+-- Partitions (range partitions per 1000 forms are created by manage_partitions.py)
+CREATE TABLE "public"."form_responses_default" PARTITION OF "public"."form_responses" DEFAULT;
 
 
 -- Indices
@@ -108,15 +112,71 @@ CREATE TABLE "public"."form_response_fields" (
     "categories" json,
     "sentiment" varchar(20) DEFAULT 'neutral',
     "user_id" int4,
+    "processing_status" varchar(20) NOT NULL DEFAULT 'queued',
+    "processing_stage" varchar(32),
+    "processing_progress" int4 NOT NULL DEFAULT 0,
+    "processing_error" text,
+    "processing_lease_expires_at" timestamp,
     CONSTRAINT "form_response_fields_formfeildId_fkey" FOREIGN KEY ("formfeildId") REFERENCES "public"."form_fields"("id") ON DELETE CASCADE,
-    CONSTRAINT "form_response_fields_formResponseId_fkey" FOREIGN KEY ("formResponseId") REFERENCES "public"."form_responses"("responseId") ON DELETE CASCADE,
+    CONSTRAINT "form_response_fields_formResponseId_formId_fkey" FOREIGN KEY ("formResponseId", "formId") REFERENCES "public"."form_responses"("responseId", "formId") ON DELETE CASCADE,
     CONSTRAINT "fk_form_response_fields_user_id" FOREIGN KEY ("user_id") REFERENCES "public"."users"("id"),
     CONSTRAINT "form_response_fields_formId_fkey" FOREIGN KEY ("formId") REFERENCES "public"."forms"("id") ON DELETE CASCADE,
+    CONSTRAINT "uq_form_response_fields_answer" UNIQUE ("formId", "formResponseId", "formfeildId"),
+    PRIMARY KEY ("responsefieldId", "formId")
+) PARTITION BY RANGE ("formId");
+
+-- Partitions (range partitions per 1000 forms are created by manage_partitions.py)
+CREATE TABLE "public"."form_response_fields_default" PARTITION OF "public"."form_response_fields" DEFAULT;
+
+-- Indices
+CREATE INDEX "ix_form_response_fields_responsefieldId" ON public.form_response_fields USING btree ("responsefieldId");
+CREATE INDEX "ix_form_response_fields_formResponseId" ON public.form_response_fields USING btree ("formResponseId");
+CREATE INDEX ix_form_response_fields_lease ON public.form_response_fields USING btree (processing_lease_expires_at) WHERE processing_status IN ('queued', 'running');
+
+-- Table Definition
+CREATE TABLE "public"."archived_form_responses" (
+    "responseId" int4 NOT NULL,
+    "formId" int4 NOT NULL,
+    "user_id" int4 NOT NULL,
+    "created_at" timestamp NOT NULL,
+    "updated_at" timestamp NOT NULL,
+    "status" varchar(32) NOT NULL,
+    "submitTimestamp" timestamp,
+    "language" varchar(10),
+    "archived_at" timestamp NOT NULL DEFAULT now(),
+    CONSTRAINT "archived_form_responses_formId_fkey" FOREIGN KEY ("formId") REFERENCES "public"."forms"("id"),
+    CONSTRAINT "archived_form_responses_user_id_fkey" FOREIGN KEY ("user_id") REFERENCES "public"."users"("id"),
+    PRIMARY KEY ("responseId")
+);
+
+-- Indices
+CREATE INDEX "ix_archived_form_responses_formId" ON public.archived_form_responses USING btree ("formId");
+
+-- Table Definition
+CREATE TABLE "public"."archived_form_response_fields" (
+    "responsefieldId" int4 NOT NULL,
+    "formResponseId" int4 NOT NULL,
+    "formId" int4 NOT NULL,
+    "formfeildId" int4 NOT NULL,
+    "user_id" int4 NOT NULL,
+    "responseText" text,
+    "voiceFileLink" varchar(255),
+    "response_time" float8,
+    "transcribed_text" text,
+    "translated_text" text,
+    "categories" json,
+    "sentiment" varchar(20),
+    "language" varchar(10),
+    CONSTRAINT "archived_form_response_fields_formResponseId_fkey" FOREIGN KEY ("formResponseId") REFERENCES "public"."archived_form_responses"("responseId") ON DELETE CASCADE,
+    CONSTRAINT "archived_form_response_fields_formId_fkey" FOREIGN KEY ("formId") REFERENCES "public"."forms"("id"),
+    CONSTRAINT "archived_form_response_fields_formfeildId_fkey" FOREIGN KEY ("formfeildId") REFERENCES "public"."form_fields"("id"),
+    CONSTRAINT "archived_form_response_fields_user_id_fkey" FOREIGN KEY ("user_id") REFERENCES "public"."users"("id"),
     PRIMARY KEY ("responsefieldId")
 );
 
 -- Indices
-CREATE INDEX "ix_form_response_fields_responsefieldId" ON public.form_response_fields USING btree ("responsefieldId");
+CREATE INDEX "ix_archived_form_response_fields_formResponseId" ON public.archived_form_response_fields USING btree ("formResponseId");
+CREATE INDEX "ix_archived_form_response_fields_formId" ON public.archived_form_response_fields USING btree ("formId");
 
 -- Sequence and defined type
 CREATE SEQUENCE IF NOT EXISTS "form_analytics_analyticsId_seq";
@@ -138,3 +198,45 @@ CREATE TABLE "public"."form_analytics" (
 CREATE INDEX "ix_form_analytics_analyticsId" ON public.form_analytics USING btree ("analyticsId");
 CREATE INDEX "ix_form_analytics_formId" ON public.form_analytics USING btree ("formId");
 
+
+-- Sequence and defined type
+CREATE SEQUENCE IF NOT EXISTS "form_rollups_rollupId_seq";
+
+-- Table Definition
+CREATE TABLE "public"."form_rollups" (
+    "rollupId" int4 NOT NULL DEFAULT nextval('"form_rollups_rollupId_seq"'::regclass),
+    "formId" int4 NOT NULL,
+    "granularity" varchar(8) NOT NULL,
+    "bucket_start" timestamp NOT NULL,
+    "submitted" int4 NOT NULL DEFAULT 0,
+    "completed" int4 NOT NULL DEFAULT 0,
+    "answers" int4 NOT NULL DEFAULT 0,
+    "response_time_sum" float8 NOT NULL DEFAULT 0,
+    "response_time_count" int4 NOT NULL DEFAULT 0,
+    CONSTRAINT "form_rollups_formId_fkey" FOREIGN KEY ("formId") REFERENCES "public"."forms"("id") ON DELETE CASCADE,
+    CONSTRAINT "uq_form_rollups_bucket" UNIQUE ("formId", "granularity", "bucket_start"),
+    PRIMARY KEY ("rollupId")
+);
+
+-- Indices
+CREATE INDEX "ix_form_rollups_rollupId" ON public.form_rollups USING btree ("rollupId");
+
+-- Sequence and defined type
+CREATE SEQUENCE IF NOT EXISTS "form_rollup_counts_rollupCountId_seq";
+
+-- Table Definition
+CREATE TABLE "public"."form_rollup_counts" (
+    "rollupCountId" int4 NOT NULL DEFAULT nextval('"form_rollup_counts_rollupCountId_seq"'::regclass),
+    "formId" int4 NOT NULL,
+    "granularity" varchar(8) NOT NULL,
+    "bucket_start" timestamp NOT NULL,
+    "dimension" varchar(16) NOT NULL,
+    "value" varchar(20) NOT NULL,
+    "count" int4 NOT NULL DEFAULT 0,
+    CONSTRAINT "form_rollup_counts_formId_fkey" FOREIGN KEY ("formId") REFERENCES "public"."forms"("id") ON DELETE CASCADE,
+    CONSTRAINT "uq_form_rollup_counts_bucket" UNIQUE ("formId", "granularity", "bucket_start", "dimension", "value"),
+    PRIMARY KEY ("rollupCountId")
+);
+
+-- Indices
+CREATE INDEX "ix_form_rollup_counts_rollupCountId" ON public.form_rollup_counts USING btree ("rollupCountId");
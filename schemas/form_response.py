@@ -1,6 +1,7 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Optional, List
 from datetime import datetime
+from .form_response_field import FormResponseFieldOut
 
 class FormResponseBase(BaseModel):
     formId: int
@@ -22,4 +23,20 @@ class FormResponseOut(FormResponseBase):
     updated_at: datetime
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True 
+
+class FormResponseAnswer(BaseModel):
+    formfeildId: int = Field(..., description="ID of the form field being answered")
+    question_number: int = Field(..., description="Question number, used for file naming")
+    responseText: Optional[str] = Field(None, description="Text response")
+    responseTime: Optional[float] = Field(None, description="Response time in seconds")
+    fileIndex: Optional[int] = Field(None, description="Index of this answer's audio in the uploaded files")
+
+class FormResponseSubmit(BaseModel):
+    formId: int
+    language: Optional[str] = "en"
+    answers: List[FormResponseAnswer]
+
+class FormResponseSubmitOut(BaseModel):
+    response: FormResponseOut
+    fields: List[FormResponseFieldOut]
@@ -29,6 +29,10 @@ class FormResponseFieldUpdate(BaseModel):
 
 class FormResponseFieldOut(FormResponseFieldBase):
     responsefieldId: int
+    processing_status: Optional[str] = Field(None, description="Background processing status: queued, running, done, or failed")
+    processing_stage: Optional[str] = Field(None, description="Pipeline stage currently running")
+    processing_progress: Optional[int] = Field(None, description="Share of pipeline stages finished, 0-100")
+    processing_error: Optional[str] = Field(None, description="Error description when processing failed")
 
     class Config:
         from_attributes = True 
\ No newline at end of file
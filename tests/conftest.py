@@ -0,0 +1,164 @@
+import os
+import json
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Tests run on a throwaway SQLite database, never on the one configured in .env
+_DB_DIR = tempfile.mkdtemp(prefix="echoforms-tests-")
+os.environ["DB_CONNECTION_STRING"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.sqlite')}"
+
+import pytest
+from sqlalchemy import MetaData
+
+import db as database
+from models import Base
+from models.users import User
+from models.form import Form
+from models.form_fields import FormField
+from models.form_response import FormResponse
+from models.form_response_field import FormResponseField
+from utils.gemini_batch import SUCCEEDED, FAILED
+from utils.processing_status import INTERRUPTED, TERMINAL_STATUSES
+from utils.rollups import record_answer_analysis
+
+database.engine.echo = False
+
+
+# Range-partitioned on PostgreSQL, where the partition key has to be part of the primary key
+PARTITIONED_TABLES = ["form_responses", "form_response_fields"]
+
+
+def _create_tables(engine):
+    """
+    Create the tables on SQLite
+
+    SQLite only generates ids for a single-column integer primary key, so the
+    partitioned tables are created keyed by their id alone, which is what the
+    ORM identifies their rows by anyway.
+    """
+    Base.metadata.create_all(engine, tables=[
+        table for table in Base.metadata.sorted_tables if table.name not in PARTITIONED_TABLES
+    ])
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(metadata)
+    for name in PARTITIONED_TABLES:
+        table = metadata.tables[name]
+        table.c.formId.primary_key = False
+        table.primary_key._columns.remove(table.c.formId)
+        table.create(engine)
+
+
+@pytest.fixture
+def session_factory():
+    """Session factory on freshly created tables"""
+    Base.metadata.drop_all(database.engine)
+    _create_tables(database.engine)
+    yield database.SessionLocal
+    database.engine.dispose()
+
+
+@pytest.fixture
+def make_answers(session_factory):
+    """
+    Create a form with one response and an answer per given column values
+
+    Answers default to done, the rollups count the answers the pipeline counts.
+
+    Returns:
+        Function (list of FormResponseField column values) -> list of answer ids
+    """
+    def make(answers):
+        db = session_factory()
+        try:
+            user = User(username="owner", email="owner@example.com", password="x")
+            db.add(user)
+            db.flush()
+            form = Form(title="Feedback", user_id=user.id, status="active")
+            db.add(form)
+            db.flush()
+            response = FormResponse(formId=form.id, user_id=user.id, status="completed", created_at=datetime(2026, 1, 5, 10, 30))
+            db.add(response)
+            db.flush()
+            fields = []
+            for number, values in enumerate(answers, start=1):
+                question = FormField(question=f"Q{number}", form_id=form.id, user_id=user.id, question_number=number)
+                db.add(question)
+                db.flush()
+                field = FormResponseField(
+                    formResponseId=response.responseId, formId=form.id, formfeildId=question.id, user_id=user.id,
+                    **{"processing_status": "done", **values},
+                )
+                db.add(field)
+                db.flush()
+                fields.append(field)
+                # Counted in the rollups like the pipeline would have
+                if field.processing_status in TERMINAL_STATUSES or (
+                    field.processing_status == INTERRUPTED and field.processing_stage == "analytics"
+                ):
+                    record_answer_analysis(db, form.id, response.responseId, field.sentiment, field.language)
+            db.commit()
+            return [field.responsefieldId for field in fields]
+        finally:
+            db.close()
+
+    return make
+
+
+def _canned_response(key: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Neutral answer per stage, the stage is the prefix of the request key"""
+    stage = key.split(":", 1)[0]
+    text = {
+        "translation": '{"is_english": true, "translated_text": null, "language_code": "en"}',
+        "sentiment": '{"sentiment": "neutral"}',
+        "categories": "[]",
+    }.get(stage, "")
+    return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+
+class LocalBatchProvider:
+    """
+    Stand-in batch provider answering in process, without calling any API
+
+    A batch is answered when it is submitted, by responder(key, request) returning a
+    generateContent response (raise to simulate a failed request). fail_batches makes
+    the provider report every batch as failed.
+    """
+
+    name = "local"
+
+    def __init__(self, responder: Callable[[str, Dict[str, Any]], Dict[str, Any]] = _canned_response):
+        self.responder = responder
+        self.fail_batches = False
+        self.submitted = []
+
+    def submit(self, input_path: str, display_name: str) -> str:
+        output_path = f"{input_path}.local-output"
+        with open(input_path, encoding="utf-8") as source, open(output_path, "w", encoding="utf-8") as output:
+            for line in source:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                try:
+                    result = {"key": entry["key"], "response": self.responder(entry["key"], entry["request"])}
+                except Exception as e:
+                    result = {"key": entry["key"], "error": {"message": str(e)}}
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.submitted.append(display_name)
+        return f"local/{output_path}"
+
+    def status(self, batch_name: str) -> Tuple[str, Optional[str]]:
+        if self.fail_batches:
+            return FAILED, "rejected by the test"
+        exists = os.path.exists(batch_name.removeprefix("local/"))
+        return (SUCCEEDED, None) if exists else (FAILED, "output file missing")
+
+    def download(self, batch_name: str, output_path: str):
+        shutil.copyfile(batch_name.removeprefix("local/"), output_path)
+
+
+@pytest.fixture
+def batch_provider():
+    return LocalBatchProvider()
@@ -0,0 +1,164 @@
+import json
+
+import pytest
+
+from sqlalchemy import select
+
+from models.form_response_field import FormResponseField
+from models.form_rollup import FormRollupCount
+from utils.batch_pipeline import (
+    BatchFailedError, apply_results, claim_fields, fail_fields, load_fields, process_batch, run_round
+)
+from utils.processing_status import BATCH_STAGE, DONE, FAILED, INTERRUPTED, QUEUED, RUNNING
+
+
+def _rows(session_factory, ids):
+    db = session_factory()
+    try:
+        rows = db.execute(
+            select(FormResponseField).where(FormResponseField.responsefieldId.in_(ids)).order_by(FormResponseField.responsefieldId)
+        ).scalars().all()
+        return [
+            (row.processing_status, row.processing_stage, row.processing_error, row.processing_lease_expires_at is not None)
+            for row in rows
+        ]
+    finally:
+        db.close()
+
+
+def _sentiment_counts(session_factory):
+    db = session_factory()
+    try:
+        rows = db.execute(
+            select(FormRollupCount.value, FormRollupCount.count)
+            .where(FormRollupCount.granularity == "day", FormRollupCount.dimension == "sentiment")
+        ).all()
+        return {value: count for value, count in rows if count}
+    finally:
+        db.close()
+
+
+def _claim(session_factory, ids):
+    db = session_factory()
+    try:
+        return claim_fields(db, load_fields(db, ids))
+    finally:
+        db.close()
+
+
+def test_claim_fields_queues_requeueable_answers(session_factory, make_answers):
+    ids = make_answers([
+        {"responseText": "done", "sentiment": "positive", "language": "en"},
+        {"responseText": "failed", "processing_status": FAILED, "processing_error": "boom", "sentiment": "negative"},
+        {"responseText": "cut", "processing_status": INTERRUPTED, "processing_stage": "translation", "processing_error": "Interrupted"},
+        {"responseText": "late", "processing_status": INTERRUPTED, "processing_stage": "analytics", "processing_error": "Interrupted",
+         "sentiment": "neutral", "language": "en"},
+        {"responseText": None},
+        {"responseText": "live", "processing_status": RUNNING, "processing_stage": "sentiment"},
+    ])
+
+    claimed, counted = _claim(session_factory, ids)
+
+    assert [field["id"] for field in claimed] == ids[:4]
+    assert counted == {ids[0]: ["positive", "en"], ids[1]: ["negative", "en"], ids[2]: None, ids[3]: ["neutral", "en"]}
+    assert _rows(session_factory, ids) == [
+        (QUEUED, BATCH_STAGE, None, True),
+        (QUEUED, BATCH_STAGE, None, True),
+        # Not counted yet, keeps the error it is resumed by
+        (QUEUED, BATCH_STAGE, "Interrupted", True),
+        (QUEUED, BATCH_STAGE, None, True),
+        (DONE, None, None, False),
+        (RUNNING, "sentiment", None, False),
+    ]
+
+
+def test_fail_fields_restores_uncounted_answers(session_factory, make_answers):
+    ids = make_answers([
+        {"responseText": "done", "sentiment": "positive"},
+        {"responseText": "cut", "processing_status": INTERRUPTED, "processing_stage": "translation", "processing_error": "Interrupted"},
+    ])
+    claimed, counted = _claim(session_factory, ids)
+
+    db = session_factory()
+    try:
+        assert fail_fields(db, claimed, counted, "Batch failed") == 1
+    finally:
+        db.close()
+
+    assert _rows(session_factory, ids) == [
+        (FAILED, None, "Batch failed", False),
+        (INTERRUPTED, None, "Interrupted", False),
+    ]
+
+
+def test_process_batch_applies_results(session_factory, make_answers, batch_provider, tmp_path):
+    ids = make_answers([
+        {"responseText": "The delivery was on the third day", "sentiment": "neutral", "language": "en"},
+        {"responseText": "Quiero un reembolso", "processing_status": INTERRUPTED, "processing_stage": "sentiment",
+         "processing_error": "Interrupted", "sentiment": None, "language": None},
+    ])
+
+    def responder(key, request):
+        stage, field_id = key.split(":")
+        text = {
+            "translation": json.dumps({"is_english": False, "translated_text": "I want a refund", "language_code": "es"}),
+            "sentiment": json.dumps({"sentiment": "negative"}),
+        }[stage]
+        if stage == "translation" and int(field_id) == ids[0]:
+            text = json.dumps({"is_english": True, "translated_text": None, "language_code": "en"})
+        return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}]}
+
+    batch_provider.responder = responder
+    claimed, counted = _claim(session_factory, ids)
+    rounds = {}
+    results, errors = process_batch(
+        batch_provider, str(tmp_path), "chunk", claimed, ["translation", "sentiment"], rounds, lambda: None, poll_seconds=0
+    )
+    db = session_factory()
+    try:
+        assert apply_results(db, claimed, counted, results, errors) == 0
+        stored = db.get(FormResponseField, ids[1])
+        assert (stored.translated_text, stored.language, stored.sentiment) == ("I want a refund", "es", "negative")
+    finally:
+        db.close()
+
+    assert batch_provider.submitted == ["chunk-1", "chunk-2"]
+    assert _rows(session_factory, ids) == [(DONE, None, None, False), (DONE, None, None, False)]
+    # The previously counted answer is replaced, the interrupted one is counted for the first time
+    assert _sentiment_counts(session_factory) == {"negative": 2}
+
+
+def test_process_batch_reports_failed_requests(session_factory, make_answers, batch_provider, tmp_path):
+    ids = make_answers([{"responseText": "The delivery was on the third day"}])
+
+    def responder(key, request):
+        raise RuntimeError("quota exceeded")
+
+    batch_provider.responder = responder
+    claimed, counted = _claim(session_factory, ids)
+    results, errors = process_batch(
+        batch_provider, str(tmp_path), "chunk", claimed, ["categories"], {}, lambda: None, poll_seconds=0
+    )
+    db = session_factory()
+    try:
+        assert apply_results(db, claimed, counted, results, errors) == 1
+    finally:
+        db.close()
+
+    assert _rows(session_factory, ids) == [(FAILED, None, "categories: quota exceeded", False)]
+
+
+def test_run_round_resumes_the_submitted_batch(batch_provider, tmp_path):
+    rounds = {}
+    requests = [("categories:1", {"contents": []})]
+    first = run_round(batch_provider, str(tmp_path), "chunk-1", requests, rounds, lambda: None, poll_seconds=0)
+    second = run_round(batch_provider, str(tmp_path), "chunk-1", requests, rounds, lambda: None, poll_seconds=0)
+
+    assert first == second
+    assert batch_provider.submitted == ["chunk-1"]
+
+
+def test_run_round_raises_when_the_batch_fails(batch_provider, tmp_path):
+    batch_provider.fail_batches = True
+    with pytest.raises(BatchFailedError):
+        run_round(batch_provider, str(tmp_path), "chunk-1", [("categories:1", {"contents": []})], {}, lambda: None, poll_seconds=0)
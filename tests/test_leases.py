@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import utils.pipeline as pipeline
+from models.form_response_field import FormResponseField
+from utils.pipeline import (
+    ABANDONED_INTERRUPTED, AUDIO_SPOOLED, BATCH_ABANDONED, SHUTDOWN_INTERRUPTED, reclaim_abandoned, resume_interrupted
+)
+from utils.processing_status import BATCH_STAGE, FAILED, INTERRUPTED, QUEUED, RUNNING, FieldLeases
+
+EXPIRED = datetime.utcnow() - timedelta(minutes=1)
+LEASED = datetime.utcnow() + timedelta(minutes=5)
+
+
+def _fields(session_factory, ids):
+    db = session_factory()
+    try:
+        return [db.get(FormResponseField, field_id) for field_id in ids]
+    finally:
+        db.close()
+
+
+def test_reclaim_abandoned_releases_expired_fields(session_factory, make_answers):
+    ids = make_answers([
+        {"responseText": "killed", "processing_status": RUNNING, "processing_stage": "sentiment",
+         "processing_lease_expires_at": EXPIRED},
+        {"responseText": "alive", "processing_status": RUNNING, "processing_stage": "sentiment",
+         "processing_lease_expires_at": LEASED},
+        {"responseText": "resumed", "processing_status": QUEUED, "processing_error": SHUTDOWN_INTERRUPTED,
+         "processing_lease_expires_at": EXPIRED},
+        {"responseText": "counted", "processing_status": QUEUED, "processing_stage": BATCH_STAGE,
+         "processing_lease_expires_at": EXPIRED},
+        {"responseText": "uncounted", "processing_status": QUEUED, "processing_stage": BATCH_STAGE,
+         "processing_error": SHUTDOWN_INTERRUPTED, "processing_lease_expires_at": EXPIRED},
+    ])
+
+    assert reclaim_abandoned(session_factory) == 4
+
+    assert [
+        (field.processing_status, field.processing_stage, field.processing_error, field.processing_lease_expires_at)
+        for field in _fields(session_factory, ids)
+    ] == [
+        (INTERRUPTED, "sentiment", ABANDONED_INTERRUPTED, None),
+        (RUNNING, "sentiment", None, LEASED),
+        (INTERRUPTED, None, SHUTDOWN_INTERRUPTED, None),
+        # A batch answer counted in the rollups fails like when its batch fails
+        (FAILED, None, BATCH_ABANDONED, None),
+        (INTERRUPTED, None, SHUTDOWN_INTERRUPTED, None),
+    ]
+
+
+def test_renew_extends_the_held_leases(session_factory, make_answers):
+    ids = make_answers([
+        {"responseText": "held", "processing_status": RUNNING, "processing_lease_expires_at": EXPIRED},
+        {"responseText": "other process", "processing_status": RUNNING, "processing_lease_expires_at": EXPIRED},
+        {"responseText": "finished", "processing_lease_expires_at": None},
+    ])
+    fields = _fields(session_factory, ids)
+    held_leases = FieldLeases()
+    held_leases.hold(*[(field.formId, field.formResponseId, field.formfeildId) for field in (fields[0], fields[2])])
+
+    assert held_leases.renew(session_factory) == 1
+
+    held, other, finished = _fields(session_factory, ids)
+    assert held.processing_lease_expires_at > datetime.utcnow()
+    assert other.processing_lease_expires_at == EXPIRED
+    assert finished.processing_lease_expires_at is None
+
+
+@pytest.fixture
+def leases(monkeypatch):
+    """Leases the pipeline holds, in place of the process-wide ones"""
+    leases = FieldLeases()
+    monkeypatch.setattr(pipeline, "field_leases", leases)
+    return leases
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    """Jobs resume_interrupted hands to the scheduler, as (field id, stages)"""
+    jobs = []
+
+    def submit(task_id, task_func, field_id, db_session_factory, stages, **kwargs):
+        jobs.append((field_id, stages))
+        return True
+
+    monkeypatch.setattr(pipeline.background_manager, "submit", submit)
+    monkeypatch.setattr(pipeline, "spooled_field_ids", lambda: [])
+    return jobs
+
+
+def test_resume_interrupted_claims_and_queues_fields(session_factory, make_answers, leases, submitted):
+    ids = make_answers([
+        {"responseText": "shutdown", "processing_status": INTERRUPTED, "processing_error": SHUTDOWN_INTERRUPTED},
+        {"responseText": "abandoned", "transcribed_text": "abandoned", "processing_status": INTERRUPTED,
+         "processing_error": ABANDONED_INTERRUPTED},
+        {"responseText": None, "processing_status": INTERRUPTED, "processing_error": AUDIO_SPOOLED},
+    ])
+    stages = ["transcription", "sentiment", "analytics"]
+
+    assert resume_interrupted(session_factory, stages) == 2
+
+    # The abandoned answer's transcript was saved, so it may already be in the analytics
+    assert submitted == [(ids[0], stages), (ids[1], ["transcription", "sentiment"])]
+    assert leases.held() == 2
+    queued, abandoned, spooled = _fields(session_factory, ids)
+    assert (queued.processing_status, abandoned.processing_status) == (QUEUED, QUEUED)
+    assert queued.processing_lease_expires_at is not None
+    # Its voice file is in another instance's spool
+    assert spooled.processing_status == INTERRUPTED
@@ -0,0 +1,163 @@
+import json
+from argparse import Namespace
+
+import pytest
+from sqlalchemy import select
+
+import reprocess as reprocess_cli
+import utils.pipeline as pipeline
+from models.form_response_field import FormResponseField
+from models.form_rollup import FormRollupCount
+from utils.batch_pipeline import claim_fields, first_round, load_fields, run_round
+from utils.processing_status import DONE, FAILED, INTERRUPTED
+
+
+def _sentiment_counts(session_factory):
+    db = session_factory()
+    try:
+        rows = db.execute(
+            select(FormRollupCount.value, FormRollupCount.count)
+            .where(FormRollupCount.granularity == "day", FormRollupCount.dimension == "sentiment")
+        ).all()
+        return {value: count for value, count in rows if count}
+    finally:
+        db.close()
+
+
+def _field(session_factory, field_id):
+    db = session_factory()
+    try:
+        return db.get(FormResponseField, field_id)
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def sentiment_of(monkeypatch):
+    """Make the sentiment stage answer from a dict of text -> sentiment, a missing text fails the stage"""
+    answers = {}
+    monkeypatch.setattr(pipeline, "analyze_sentiment", lambda text: answers[text])
+    return answers
+
+
+def test_reprocess_replaces_the_counted_sentiment(session_factory, make_answers, sentiment_of):
+    ids = make_answers([
+        {"responseText": "first", "sentiment": "neutral"},
+        {"responseText": "second", "sentiment": "neutral"},
+    ])
+    sentiment_of["first"] = "negative"
+
+    assert pipeline.reprocess_field(ids[0], session_factory, ["sentiment"]) is True
+
+    assert _field(session_factory, ids[0]).sentiment == "negative"
+    assert _sentiment_counts(session_factory) == {"negative": 1, "neutral": 1}
+
+
+def test_reprocess_counts_an_interrupted_answer_once(session_factory, make_answers, sentiment_of):
+    ids = make_answers([
+        {"responseText": "cut", "processing_status": INTERRUPTED, "processing_stage": "sentiment", "sentiment": None},
+    ])
+    sentiment_of["cut"] = "positive"
+
+    assert pipeline.reprocess_field(ids[0], session_factory, ["sentiment"]) is True
+    assert pipeline.reprocess_field(ids[0], session_factory, ["sentiment"]) is True
+
+    assert _sentiment_counts(session_factory) == {"positive": 1}
+
+
+def test_failed_reprocess_keeps_the_answer_counted(session_factory, make_answers, sentiment_of):
+    ids = make_answers([{"responseText": "unknown", "sentiment": "positive"}])
+
+    assert pipeline.reprocess_field(ids[0], session_factory, ["sentiment"]) is False
+
+    field = _field(session_factory, ids[0])
+    assert (field.processing_status, field.sentiment) == (FAILED, "positive")
+    assert _sentiment_counts(session_factory) == {"positive": 1}
+
+
+def _args(tmp_path, **overrides):
+    args = {
+        "form_ids": None, "since": None, "until": None, "missing": None, "status": None,
+        "stages": ["sentiment"], "workers": 2, "chunk_size": 2, "checkpoint": str(tmp_path / "run.checkpoint.json"),
+        "restart": False, "recluster": False, "dry_run": False, "batch": False, "provider": None,
+        "job_dir": str(tmp_path / "jobs"), "poll_interval": 0,
+    }
+    args.update(overrides)
+    return Namespace(**args)
+
+
+@pytest.fixture
+def no_lease_renewal(monkeypatch):
+    monkeypatch.setattr(reprocess_cli.background_manager, "add_periodic_task", lambda *args, **kwargs: None)
+
+
+def test_reprocess_resumes_after_the_checkpoint(session_factory, make_answers, monkeypatch, tmp_path, no_lease_renewal):
+    ids = make_answers([{"responseText": f"answer {number}"} for number in range(5)])
+    processed = []
+    monkeypatch.setattr(reprocess_cli, "reprocess_field", lambda field_id, factory, stages: processed.append(field_id) or True)
+    args = _args(tmp_path)
+    # A previous run got through the first chunk before it stopped
+    with open(args.checkpoint, "w") as f:
+        json.dump({
+            "signature": reprocess_cli.selection_signature(args), "max_id": ids[-1], "last_id": ids[1],
+            "processed": 2, "failed": 0, "failed_ids": [], "started_at": "2026-01-05T10:00:00",
+        }, f)
+
+    assert reprocess_cli.reprocess(args) is True
+
+    assert sorted(processed) == ids[2:]
+    assert not (tmp_path / "run.checkpoint.json").exists()
+
+
+def test_reprocess_ignores_the_checkpoint_of_another_selection(session_factory, make_answers, monkeypatch, tmp_path, no_lease_renewal):
+    ids = make_answers([{"responseText": f"answer {number}"} for number in range(3)])
+    processed = []
+    monkeypatch.setattr(reprocess_cli, "reprocess_field", lambda field_id, factory, stages: processed.append(field_id) or True)
+    args = _args(tmp_path)
+    with open(args.checkpoint, "w") as f:
+        json.dump({"signature": "other", "max_id": ids[-1], "last_id": ids[-1], "processed": 3,
+                   "failed": 0, "failed_ids": [], "started_at": "2026-01-05T10:00:00"}, f)
+
+    assert reprocess_cli.reprocess(args) is True
+
+    assert sorted(processed) == ids
+
+
+def test_batch_resume_waits_for_the_submitted_batch(session_factory, make_answers, batch_provider, tmp_path, no_lease_renewal):
+    ids = make_answers([
+        {"responseText": "The delivery was on the third day", "sentiment": "positive"},
+        {"responseText": "The parcel came on a Monday", "sentiment": "positive"},
+    ])
+    args = _args(tmp_path, batch=True, stages=["categories"], provider=batch_provider)
+    checkpoint = {"signature": reprocess_cli.selection_signature(args), "max_id": ids[-1], "last_id": 0,
+                  "processed": 0, "failed": 0, "failed_ids": [], "started_at": "2026-01-05T10:00:00"}
+    # The previous run claimed the chunk and submitted its batch, then stopped
+    db = session_factory()
+    try:
+        claimed, counted = claim_fields(db, load_fields(db, ids))
+    finally:
+        db.close()
+    job_dir = tmp_path / "jobs"
+    job_dir.mkdir()
+    name = f"reprocess-{checkpoint['signature']}-{ids[0]}"
+    rounds = {}
+    run_round(batch_provider, str(job_dir), f"{name}-1", list(first_round(claimed, args.stages, {})), rounds, lambda: None, 0)
+    checkpoint["batch_chunk"] = {
+        "ids": ids, "claimed": ids, "counted": {str(key): value for key, value in counted.items()}, "rounds": rounds,
+    }
+    with open(args.checkpoint, "w") as f:
+        json.dump(checkpoint, f)
+    # A server reclaimed the second answer while the run was stopped
+    db = session_factory()
+    try:
+        db.get(FormResponseField, ids[1]).processing_status = FAILED
+        db.commit()
+    finally:
+        db.close()
+
+    assert reprocess_cli.reprocess(args) is True
+
+    assert batch_provider.submitted == [f"{name}-1"]
+    first, second = _field(session_factory, ids[0]), _field(session_factory, ids[1])
+    assert (first.processing_status, first.categories) == (DONE, [])
+    assert second.processing_status == FAILED
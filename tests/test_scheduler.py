@@ -0,0 +1,101 @@
+from utils.scheduler import LANE_BACKFILL, LANE_LIVE_AUDIO, LANE_LIVE_TEXT, FairScheduler, parse_lane_weights
+
+
+def _scheduler(**kwargs):
+    # No worker threads, the tests dispatch with _next_job themselves
+    options = {"workers": 0, "tenant_max_running": 1, "tenant_weights": {},
+               "lane_weights": {LANE_LIVE_TEXT: 8, LANE_LIVE_AUDIO: 4, LANE_BACKFILL: 1}}
+    options.update(kwargs)
+    return FairScheduler(**options)
+
+
+def _submit(scheduler, tenant, lane, count):
+    """Queue jobs returning their name, the tenant followed by a number"""
+    for number in range(count):
+        scheduler.submit(tenant, lane, lambda name=f"{tenant}{number}": name)
+
+
+def _dispatch(scheduler, count):
+    """Run the next jobs one after the other and return their names"""
+    names = []
+    for _ in range(count):
+        job = scheduler._next_job()
+        if job is None:
+            break
+        names.append(job.run())
+    return names
+
+
+def test_a_small_tenant_is_not_stuck_behind_a_backlog():
+    scheduler = _scheduler()
+    _submit(scheduler, "big", LANE_LIVE_TEXT, 20)
+    _dispatch(scheduler, 5)
+    _submit(scheduler, "small", LANE_LIVE_TEXT, 2)
+
+    assert _dispatch(scheduler, 4) == ["small0", "big5", "small1", "big6"]
+
+
+def test_tenant_weights_set_the_share():
+    scheduler = _scheduler(tenant_weights={"vip": 3})
+    _submit(scheduler, "vip", LANE_LIVE_TEXT, 10)
+    _submit(scheduler, "other", LANE_LIVE_TEXT, 10)
+
+    names = _dispatch(scheduler, 8)
+    assert sum(name.startswith("vip") for name in names) == 6
+
+
+def test_tenants_at_their_cap_are_skipped_while_others_wait():
+    scheduler = _scheduler()
+    _submit(scheduler, "big", LANE_LIVE_TEXT, 3)
+    _submit(scheduler, "small", LANE_LIVE_TEXT, 1)
+    scheduler._running["big"] = 1
+
+    assert _dispatch(scheduler, 1) == ["small0"]
+    # Nobody else is waiting, the idle workers are lent to the tenant at its cap
+    assert _dispatch(scheduler, 1) == ["big0"]
+
+
+def test_a_backlog_in_a_live_lane_does_not_starve_backfills():
+    scheduler = _scheduler()
+    _submit(scheduler, "live", LANE_LIVE_TEXT, 40)
+    _submit(scheduler, "backfill", LANE_BACKFILL, 3)
+
+    names = _dispatch(scheduler, 27)
+    assert [name for name in names if name.startswith("backfill")] == ["backfill0", "backfill1", "backfill2"]
+    assert sum(name.startswith("live") for name in names) == 24
+
+
+def test_a_live_answer_runs_next_during_a_backfill():
+    scheduler = _scheduler()
+    _submit(scheduler, "backfill", LANE_BACKFILL, 20)
+    _dispatch(scheduler, 5)
+    _submit(scheduler, "respondent", LANE_LIVE_AUDIO, 1)
+
+    assert _dispatch(scheduler, 2) == ["respondent0", "backfill5"]
+
+
+def test_an_idle_lane_does_not_save_up_its_share():
+    scheduler = _scheduler()
+    _submit(scheduler, "live", LANE_LIVE_TEXT, 40)
+    _dispatch(scheduler, 30)
+    _submit(scheduler, "backfill", LANE_BACKFILL, 5)
+
+    names = _dispatch(scheduler, 9)
+    assert sum(name.startswith("backfill") for name in names) == 1
+
+
+def test_stop_drops_the_queued_jobs():
+    scheduler = _scheduler()
+    dropped = []
+    for number in range(3):
+        scheduler.submit("tenant", LANE_BACKFILL, lambda: None, on_drop=lambda: dropped.append(number))
+
+    assert scheduler.stop() == 3
+    assert len(dropped) == 3
+    assert scheduler.submit("tenant", LANE_LIVE_TEXT, lambda: None) is False
+
+
+def test_parse_lane_weights_skips_invalid_entries():
+    assert parse_lane_weights("live_text:6, backfill:0, audio:2, live_audio:x, backfill:0.5") == {
+        LANE_LIVE_TEXT: 6.0, LANE_BACKFILL: 0.5
+    }
@@ -0,0 +1,35 @@
+import pytest
+
+from utils.sentiment import classify_sentiment_locally
+
+
+@pytest.mark.parametrize("text, label", [
+    ("I love it", "positive"),
+    ("I hate it", "negative"),
+    ("It was fine", "neutral"),
+    ("good", "positive"),
+    ("Great service", "positive"),
+    ("Terrible", "negative"),
+    ("Love it!", "positive"),
+    ("Awful experience", "negative"),
+])
+def test_short_english_answers_are_labelled_locally(text, label):
+    assert classify_sentiment_locally(text) == label
+
+
+@pytest.mark.parametrize("text", ["Muy malo", "sehr gut", "Muito bom", "Très bien"])
+def test_short_foreign_answers_are_escalated(text):
+    assert classify_sentiment_locally(text) is None
+
+
+@pytest.mark.parametrize("text", ["good at best", "not terrible", "meh", "I want my money back"])
+def test_hedged_and_unscored_answers_are_escalated(text):
+    assert classify_sentiment_locally(text) is None
+
+
+def test_long_mixed_answer_is_escalated():
+    assert classify_sentiment_locally("The product is good, but the service is bad.") is None
+
+
+def test_explicit_threshold_applies_to_short_answers():
+    assert classify_sentiment_locally("good", min_confidence=0.75) is None
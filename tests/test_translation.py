@@ -0,0 +1,14 @@
+from utils.translation import prefilter_translation
+
+
+def test_confident_english_is_settled_locally():
+    assert prefilter_translation("The staff were friendly and the room was clean, I would recommend it.") == (
+        (None, False, "en"), ""
+    )
+
+
+def test_other_languages_go_to_gemini_with_a_hint():
+    result, hint = prefilter_translation("El servicio fue muy malo y el personal grosero.")
+
+    assert result is None
+    assert '"es"' in hint
@@ -3,6 +3,10 @@ import os
 import json
 from typing import List, Dict, Any, Optional
 import logging
+import numpy as np
+from utils.sentiment import classify_sentiment_locally
+from utils.embeddings import embed_text
+from utils.category_index import get_category_index
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -10,7 +14,8 @@ logger = logging.getLogger(__name__)
 
 def analyze_sentiment(text: str) -> str:
     """
-    Analyze sentiment of text using Gemini API
+    Analyze sentiment of text, using the local classifier first and Gemini API
+    for low-confidence or non-English text
     
     Args:
         text: Text to analyze
@@ -18,6 +23,10 @@ def analyze_sentiment(text: str) -> str:
     Returns:
         Sentiment: "positive", "negative", or "neutral"
     """
+    local_sentiment = classify_sentiment_locally(text)
+    if local_sentiment:
+        return local_sentiment
+    
     try:
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
@@ -265,6 +274,175 @@ Rules:
             'new_categories': []
         }
 
+def name_category_cluster(sample_texts: List[str], existing_names: List[str] = None) -> Optional[Dict[str, str]]:
+    """
+    Name and summarize a cluster of similar responses with one Gemini call
+    
+    Args:
+        sample_texts: Representative responses from the cluster, most typical first
+        existing_names: Names already given to other clusters of the same form, to keep names distinct
+    
+    Returns:
+        Dictionary with 'category_name', 'summary_text' and 'sentiment', or None if the call fails
+    """
+    try:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            logger.error("GEMINI_API_KEY environment variable is not set")
+            return None
+        
+        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={api_key}"
+        
+        headers = {
+            "Content-Type": "application/json"
+        }
+        
+        samples = "\n".join(f"- {text}" for text in sample_texts)
+        taken = ""
+        if existing_names:
+            taken = "Names already used for other groups (do not reuse them):\n" + "\n".join(f"- {name}" for name in existing_names) + "\n"
+        
+        payload = {
+            "contents": [
+                {
+                    "parts": [
+                        {
+                            "text": f"""You are an AI assistant that names groups of similar form responses with SPECIFIC categories.
+
+Representative responses from one group:
+{samples}
+
+{taken}
+Respond with a JSON object in this exact format:
+{{
+    "category_name": "Specific Category Name",
+    "summary_text": "Brief specific summary under 80 chars",
+    "sentiment": "positive/negative/neutral"
+}}
+
+Rules:
+- Be granular: "Product Quality - Color Fading" not just "Product Quality"
+- Keep summary_text under 80 characters - be concise and specific
+- sentiment is the overall sentiment of the group
+"""
+                        }
+                    ]
+                }
+            ],
+            "generationConfig": {
+                "temperature": 0.3,
+                "maxOutputTokens": 1024,
+                "responseMimeType": "application/json"
+            }
+        }
+        
+        response = requests.post(url, headers=headers, json=payload, timeout=60)
+        
+        if response.status_code == 200:
+            result = response.json()
+            if "candidates" in result and len(result["candidates"]) > 0:
+                candidate = result["candidates"][0]
+                if "content" in candidate and "parts" in candidate["content"]:
+                    parts = candidate["content"]["parts"]
+                    if len(parts) > 0 and "text" in parts[0]:
+                        response_text = parts[0]["text"].strip()
+                        try:
+                            start_idx = response_text.find('{')
+                            end_idx = response_text.rfind('}') + 1
+                            if start_idx != -1 and end_idx != 0:
+                                ai_result = json.loads(response_text[start_idx:end_idx])
+                                summary = ai_result.get('summary_text', '')
+                                if len(summary) > 80:
+                                    summary = summary[:77] + "..."
+                                sentiment = (ai_result.get('sentiment') or 'neutral').strip().lower()
+                                if sentiment not in ["positive", "negative", "neutral"]:
+                                    sentiment = "neutral"
+                                if ai_result.get('category_name'):
+                                    return {
+                                        'category_name': ai_result['category_name'],
+                                        'summary_text': summary,
+                                        'sentiment': sentiment
+                                    }
+                        except json.JSONDecodeError as e:
+                            logger.error(f"Failed to parse JSON from Gemini response: {e}")
+            
+            try:
+                raw_snippet = json.dumps(result)[:2000]
+            except Exception:
+                raw_snippet = str(result)[:2000]
+            logger.error("Unexpected response format from Gemini API for cluster naming. Raw result (truncated): %s", raw_snippet)
+            return None
+        else:
+            logger.error(f"Gemini API error for cluster naming: {response.status_code} - {response.text}")
+            return None
+    
+    except Exception as e:
+        logger.error(f"Error naming category cluster: {str(e)}")
+        return None
+
+def assign_categories_by_similarity(form_id: int, existing_categories: List[Dict], response_vector: np.ndarray) -> Optional[Dict[str, Any]]:
+    """
+    Assign a response to existing categories by cosine similarity against the form's category centroids
+    
+    Args:
+        form_id: ID of the form
+        existing_categories: Existing categories for this form
+        response_vector: Unit-length embedding of the response text
+    
+    Returns:
+        Dictionary in the same shape as generate_categories, or None when no category
+        is similar enough and the LLM should decide (likely a new category)
+    """
+    index = get_category_index(form_id, existing_categories, len(response_vector))
+    if index is None:
+        return None
+    
+    with index.lock:
+        matches = index.match(response_vector)
+        if not matches:
+            return None
+        for name, _ in matches:
+            index.add(name, response_vector)
+    
+    assigned_to = [name for name, _ in matches]
+    categories = []
+    for cat in existing_categories:
+        if cat['category_name'] in assigned_to:
+            cat = {**cat, 'response_count': cat.get('response_count', 0) + 1}
+        categories.append(cat)
+    
+    logger.info(f"Similarity assigned to: {[f'{name} ({score:.2f})' for name, score in matches]}")
+    
+    return {
+        'categories': categories,
+        'assigned_to': assigned_to,
+        'new_categories': []
+    }
+
+def update_category_index(form_id: int, category_result: Dict[str, Any], response_vector: np.ndarray):
+    """
+    Fold an LLM category assignment into the form's category centroids
+    
+    Args:
+        form_id: ID of the form
+        category_result: Result of generate_categories
+        response_vector: Unit-length embedding of the response text
+    """
+    new_categories = set(category_result['new_categories'])
+    index = get_category_index(
+        form_id,
+        category_result['categories'],
+        len(response_vector),
+        seed_vectors={name: response_vector for name in new_categories}
+    )
+    if index is None:
+        return
+    
+    with index.lock:
+        for name in category_result['assigned_to']:
+            if name in index and name not in new_categories:
+                index.add(name, response_vector)
+
 def calculate_category_percentages(categories: List[Dict], total_responses: int) -> List[Dict]:
     """
     Calculate correct percentages for categories based on actual response counts
@@ -297,7 +475,7 @@ def calculate_category_percentages(categories: List[Dict], total_responses: int)
     
     return categories
 
-def process_response_for_analytics(transcribed_text: str, form_id: int, existing_categories: List[Dict] = None) -> Dict[str, Any]:
+def process_response_for_analytics(transcribed_text: str, form_id: int, existing_categories: List[Dict] = None, sentiment: Optional[str] = None) -> Dict[str, Any]:
     """
     Process a transcribed response for analytics
     
@@ -305,6 +483,7 @@ def process_response_for_analytics(transcribed_text: str, form_id: int, existing
         transcribed_text: Transcribed text from voice response
         form_id: ID of the form
         existing_categories: Existing categories for this form
+        sentiment: Sentiment already computed for this text, skips a second analysis
     
     Returns:
         Dictionary containing sentiment and updated categories
@@ -319,12 +498,21 @@ def process_response_for_analytics(transcribed_text: str, form_id: int, existing
                 "new_categories": []
             }
         
-        # Analyze sentiment
-        sentiment = analyze_sentiment(transcribed_text)
+        # Analyze sentiment unless the caller already did
+        if not sentiment:
+            sentiment = analyze_sentiment(transcribed_text)
         logger.info(f"Analyzed sentiment: {sentiment}")
         
-        # Generate/update categories
-        category_result = generate_categories(existing_categories or [], transcribed_text)
+        # Assign to existing categories by embedding similarity, only likely new categories need the LLM
+        response_vector = embed_text(transcribed_text)
+        category_result = None
+        if response_vector is not None and existing_categories:
+            category_result = assign_categories_by_similarity(form_id, existing_categories, response_vector)
+        
+        if category_result is None:
+            category_result = generate_categories(existing_categories or [], transcribed_text)
+            if response_vector is not None:
+                update_category_index(form_id, category_result, response_vector)
         categories = category_result['categories']
         assigned_to = category_result['assigned_to']
         new_categories = category_result['new_categories']
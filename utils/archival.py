@@ -0,0 +1,260 @@
+import io
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from models.form import Form
+from models.form_response import FormResponse
+from models.form_response_field import FormResponseField
+from models.archive import ArchivedFormResponse, ArchivedFormResponseField
+from utils.b2 import copy_file_in_b2, delete_file_from_b2, upload_file_to_b2
+from utils.export import parquet_available, stream_parquet
+from utils.form_cache import form_cache
+from utils.processing_status import DONE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Forms in one of these statuses, unchanged for ARCHIVE_AFTER_DAYS, are archived
+ARCHIVE_FORM_STATUSES = [s.strip() for s in os.getenv("ARCHIVE_FORM_STATUSES", "closed,inactive,deleted").split(",") if s.strip()]
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+# Voice files of archived forms are moved under this B2 prefix (lifecycle rules can target it)
+ARCHIVE_B2_PREFIX = os.getenv("ARCHIVE_B2_PREFIX", "archive/")
+
+ARCHIVED_FIELD_COLUMNS = [column.name for column in ArchivedFormResponseField.__table__.columns]
+ARCHIVED_RESPONSE_COLUMNS = [
+    column.name for column in ArchivedFormResponse.__table__.columns if column.name != "archived_at"
+]
+
+
+def response_models(form: Form) -> Tuple[type, type]:
+    """
+    (response model, answer model) holding a form's responses, the archive tier once it is archived
+
+    Archived forms reject submissions and are restored to the hot tier when reopened, so
+    a form's responses are always in exactly one tier.
+    """
+    if form.archived_at is not None:
+        return ArchivedFormResponse, ArchivedFormResponseField
+    return FormResponse, FormResponseField
+
+
+def voice_file_prefix(form: Form, response_id: int) -> str:
+    """B2 prefix of a response's voice files, used to authorize downloads"""
+    prefix = f"{form.user_id}/{form.id}/responses/{response_id}/"
+    if form.archived_at is not None:
+        return ARCHIVE_B2_PREFIX + prefix
+    return prefix
+
+
+def archive_path(file_name: str) -> str:
+    return file_name if file_name.startswith(ARCHIVE_B2_PREFIX) else ARCHIVE_B2_PREFIX + file_name
+
+
+def hot_path(file_name: str) -> str:
+    return file_name.removeprefix(ARCHIVE_B2_PREFIX)
+
+
+def archivable_forms(db: Session, now: Optional[datetime] = None, older_than_days: float = ARCHIVE_AFTER_DAYS) -> List[int]:
+    """Ids of closed forms past the policy window whose responses are still in the hot tables"""
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    return db.scalars(
+        select(Form.id)
+        .where(
+            Form.status.in_(ARCHIVE_FORM_STATUSES),
+            Form.updated_at < cutoff,
+            Form.archived_at.is_(None),
+        )
+        .order_by(Form.id)
+    ).all()
+
+
+def _copy_voice_files(db: Session, form_id: int) -> Dict[str, str]:
+    """Copy a form's voice files under the archive prefix, returns old name -> new name"""
+    links = db.scalars(
+        select(FormResponseField.voiceFileLink)
+        .where(FormResponseField.formId == form_id, FormResponseField.voiceFileLink.isnot(None))
+    ).all()
+    moved = {}
+    for link in links:
+        target = archive_path(link)
+        if target != link:
+            copy_file_in_b2(link, target)
+            moved[link] = target
+    return moved
+
+
+def _delete_voice_files(file_names: List[str]):
+    for file_name in file_names:
+        try:
+            delete_file_from_b2(file_name)
+        except Exception as e:
+            # Only leaves an orphaned hot copy behind, the archived rows point to the copy
+            logger.warning(f"Could not delete archived voice file {file_name}: {e}")
+
+
+def _upload_parquet_snapshot(form: Form, db_session_factory) -> Optional[str]:
+    """Write the archived answers as one Parquet file next to the archived audio"""
+    if not parquet_available():
+        logger.info(f"pyarrow not installed, skipping Parquet snapshot of form {form.id}")
+        return None
+    buffer = io.BytesIO()
+    for chunk in stream_parquet(form.id, db_session_factory, archived=True):
+        buffer.write(chunk)
+    file_name = f"{ARCHIVE_B2_PREFIX}{form.user_id}/{form.id}/responses.parquet"
+    return upload_file_to_b2(buffer.getvalue(), file_name, "application/vnd.apache.parquet")
+
+
+def archive_form(db: Session, form_id: int, db_session_factory=None) -> Dict[str, int]:
+    """
+    Move a form's responses to the archive tier
+
+    Voice files are copied under ARCHIVE_B2_PREFIX first, then the rows are moved
+    into the archive tables (pointing at the copies) in one transaction, and only
+    after that commit are the original voice files deleted. A failure before the
+    commit therefore leaves the hot data untouched. With pyarrow installed a
+    compacted Parquet snapshot of the archived answers is uploaded as well.
+
+    Args:
+        db: Database session
+        form_id: Form to archive
+        db_session_factory: Session factory for the Parquet snapshot, skipped when None
+
+    Returns:
+        Summary with the number of responses, answers and voice files moved
+    """
+    form = db.query(Form).filter(Form.id == form_id).first()
+    if not form:
+        raise ValueError(f"Form {form_id} not found")
+
+    moved_files = _copy_voice_files(db, form_id)
+
+    try:
+        # Lock the form so concurrent submissions see it as archived only after the move
+        db.query(Form).filter(Form.id == form_id).with_for_update().one()
+
+        for old_name, new_name in moved_files.items():
+            db.execute(
+                update(FormResponseField)
+                .where(FormResponseField.formId == form_id, FormResponseField.voiceFileLink == old_name)
+                .values(voiceFileLink=new_name)
+            )
+
+        responses = db.execute(
+            insert(ArchivedFormResponse).from_select(
+                ARCHIVED_RESPONSE_COLUMNS,
+                select(*(FormResponse.__table__.c[name] for name in ARCHIVED_RESPONSE_COLUMNS))
+                .where(FormResponse.formId == form_id)
+            )
+        ).rowcount
+        fields = db.execute(
+            insert(ArchivedFormResponseField).from_select(
+                ARCHIVED_FIELD_COLUMNS,
+                select(*(FormResponseField.__table__.c[name] for name in ARCHIVED_FIELD_COLUMNS))
+                .where(FormResponseField.formId == form_id)
+            )
+        ).rowcount
+
+        db.execute(delete(FormResponseField).where(FormResponseField.formId == form_id))
+        db.execute(delete(FormResponse).where(FormResponse.formId == form_id))
+        form.archived_at = datetime.utcnow()
+        db.commit()
+    except Exception:
+        db.rollback()
+        # The copies are unreferenced, the hot rows still point to the originals
+        _delete_voice_files(list(moved_files.values()))
+        raise
+
+    _delete_voice_files(list(moved_files.keys()))
+    logger.info(f"Archived form {form_id}: {responses} responses, {fields} answers, {len(moved_files)} voice files")
+
+    if db_session_factory is not None:
+        try:
+            _upload_parquet_snapshot(form, db_session_factory)
+        except Exception as e:
+            logger.error(f"Parquet snapshot of archived form {form_id} failed: {e}")
+
+    form_cache.invalidate(form_id=form_id)
+
+    return {"responses": responses, "fields": fields, "voice_files": len(moved_files)}
+
+
+def restore_form(db: Session, form_id: int) -> Dict[str, int]:
+    """
+    Move an archived form's responses back to the hot tables, used when the form is reopened
+
+    Mirrors archive_form: voice files are copied back out of ARCHIVE_B2_PREFIX, the
+    rows are moved in one transaction that also clears archived_at, and the archived
+    copies are deleted after the commit. Restored answers are marked processed.
+
+    Args:
+        db: Database session
+        form_id: Archived form to restore
+
+    Returns:
+        Summary with the number of responses, answers and voice files moved
+    """
+    form = db.query(Form).filter(Form.id == form_id).first()
+    if not form:
+        raise ValueError(f"Form {form_id} not found")
+    if form.archived_at is None:
+        return {"responses": 0, "fields": 0, "voice_files": 0}
+
+    links = db.scalars(
+        select(ArchivedFormResponseField.voiceFileLink)
+        .where(ArchivedFormResponseField.formId == form_id, ArchivedFormResponseField.voiceFileLink.isnot(None))
+    ).all()
+    moved_files = {}
+    for link in links:
+        target = hot_path(link)
+        if target != link:
+            copy_file_in_b2(link, target)
+            moved_files[link] = target
+
+    try:
+        db.query(Form).filter(Form.id == form_id).with_for_update().one()
+
+        for old_name, new_name in moved_files.items():
+            db.execute(
+                update(ArchivedFormResponseField)
+                .where(ArchivedFormResponseField.formId == form_id, ArchivedFormResponseField.voiceFileLink == old_name)
+                .values(voiceFileLink=new_name)
+            )
+
+        responses = db.execute(
+            insert(FormResponse).from_select(
+                ARCHIVED_RESPONSE_COLUMNS,
+                select(*(ArchivedFormResponse.__table__.c[name] for name in ARCHIVED_RESPONSE_COLUMNS))
+                .where(ArchivedFormResponse.formId == form_id)
+            )
+        ).rowcount
+        fields = db.execute(
+            insert(FormResponseField).from_select(
+                ARCHIVED_FIELD_COLUMNS + ["processing_status", "processing_progress"],
+                select(
+                    *(ArchivedFormResponseField.__table__.c[name] for name in ARCHIVED_FIELD_COLUMNS),
+                    literal(DONE),
+                    literal(100),
+                )
+                .where(ArchivedFormResponseField.formId == form_id)
+            )
+        ).rowcount
+
+        db.execute(delete(ArchivedFormResponseField).where(ArchivedFormResponseField.formId == form_id))
+        db.execute(delete(ArchivedFormResponse).where(ArchivedFormResponse.formId == form_id))
+        form.archived_at = None
+        db.commit()
+    except Exception:
+        db.rollback()
+        _delete_voice_files(list(moved_files.values()))
+        raise
+
+    _delete_voice_files(list(moved_files.keys()))
+    form_cache.invalidate(form_id=form_id)
+    logger.info(f"Restored form {form_id}: {responses} responses, {fields} answers, {len(moved_files)} voice files")
+    return {"responses": responses, "fields": fields, "voice_files": len(moved_files)}
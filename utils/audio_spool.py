@@ -0,0 +1,70 @@
+import os
+import json
+import logging
+from typing import List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Voice files a shutdown could not upload in time wait here for resume_interrupted; keep it on a
+# volume that outlives the instance, shared by the instances if another one should resume them
+AUDIO_SPOOL_DIR = os.getenv("AUDIO_SPOOL_DIR", "audio_spool")
+
+
+def _paths(field_id: int) -> Tuple[str, str]:
+    base = os.path.join(AUDIO_SPOOL_DIR, str(field_id))
+    return f"{base}.audio", f"{base}.json"
+
+
+def _write(path: str, data: bytes):
+    """Write a file atomically, a crash never leaves a partial one under its name"""
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def spool_audio(field_id: int, content: bytes, file_name: str, content_type: Optional[str]):
+    """
+    Keep a field's voice file on local disk until it is uploaded
+
+    The metadata is written last, a field is only spooled once both files exist.
+
+    Raises:
+        OSError: If the files could not be written
+    """
+    os.makedirs(AUDIO_SPOOL_DIR, exist_ok=True)
+    audio_path, meta_path = _paths(field_id)
+    _write(audio_path, content)
+    _write(meta_path, json.dumps({"file_name": file_name, "content_type": content_type}).encode())
+    logger.info(f"Spooled the voice file of field {field_id} ({len(content)} bytes)")
+
+
+def load_spooled_audio(field_id: int) -> Optional[Tuple[bytes, str, Optional[str]]]:
+    """(content, B2 file name, content type) of a spooled voice file, None if this instance has none"""
+    audio_path, meta_path = _paths(field_id)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        meta = json.load(f)
+    with open(audio_path, "rb") as f:
+        return f.read(), meta["file_name"], meta.get("content_type")
+
+
+def discard_spooled_audio(field_id: int):
+    """Remove a voice file once it is uploaded"""
+    for path in reversed(_paths(field_id)):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def spooled_field_ids() -> List[int]:
+    """Fields with a voice file in this instance's spool"""
+    if not os.path.isdir(AUDIO_SPOOL_DIR):
+        return []
+    return [int(name[:-len(".json")]) for name in os.listdir(AUDIO_SPOOL_DIR) if name.endswith(".json")]
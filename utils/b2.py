@@ -1,14 +1,53 @@
+import io
 import os
-from b2sdk.v2 import InMemoryAccountInfo, B2Api
+import threading
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 B2_KEY_ID = os.getenv("B2_KEY_ID")
 B2_APP_KEY = os.getenv("B2_APP_KEY")
 B2_BUCKET_NAME = os.getenv("B2_BUCKET_NAME")
 
-info = InMemoryAccountInfo()
-b2_api = B2Api(info)
-b2_api.authorize_account("production", B2_KEY_ID, B2_APP_KEY)
-bucket = b2_api.get_bucket_by_name(B2_BUCKET_NAME)
+# Authorized on first use rather than at import, so importing the app needs no network
+_b2_api = None
+_bucket = None
+_client_lock = threading.Lock()
+
+
+def get_bucket():
+    """
+    The B2 bucket, authorizing the account on the first call
+
+    A failed authorization is not cached, the next call tries again.
+    """
+    global _b2_api, _bucket
+    if _bucket is None:
+        with _client_lock:
+            if _bucket is None:
+                from b2sdk.v2 import InMemoryAccountInfo, B2Api
+
+                b2_api = B2Api(InMemoryAccountInfo())
+                b2_api.authorize_account("production", B2_KEY_ID, B2_APP_KEY)
+                _b2_api = b2_api
+                _bucket = b2_api.get_bucket_by_name(B2_BUCKET_NAME)
+                logger.info(f"Authorized B2 bucket {B2_BUCKET_NAME}")
+    return _bucket
+
+
+def get_b2_api():
+    get_bucket()
+    return _b2_api
+
+
+def warm_up():
+    """Authorize ahead of the first request that needs storage"""
+    try:
+        get_bucket()
+    except Exception as e:
+        logger.warning(f"B2 warm-up failed, authorizing on first use instead: {e}")
 
 def upload_file_to_b2(file_bytes: bytes, file_name: str, content_type: str = None) -> str:
     """
@@ -18,7 +57,7 @@ def upload_file_to_b2(file_bytes: bytes, file_name: str, content_type: str = Non
     if content_type:
         file_info['Content-Type'] = content_type
     
-    uploaded_file = bucket.upload_bytes(
+    uploaded_file = get_bucket().upload_bytes(
         file_bytes,
         file_name,
         file_infos=file_info if file_info else None,
@@ -28,15 +67,40 @@ def upload_file_to_b2(file_bytes: bytes, file_name: str, content_type: str = Non
     return file_name
 
 def get_download_authorization(file_name_prefix, valid_duration_seconds=3600):
-    auth_token = bucket.get_download_authorization(
+    auth_token = get_bucket().get_download_authorization(
         file_name_prefix=file_name_prefix,
         valid_duration_in_seconds=valid_duration_seconds
     )
     return auth_token
 
 def generate_download_url(file_path, auth_token):
-    download_url = b2_api.get_download_url_for_file_name(
+    download_url = get_b2_api().get_download_url_for_file_name(
         bucket_name=B2_BUCKET_NAME,
         file_name=file_path
     )
-    return f"{download_url}?Authorization={auth_token}"
\ No newline at end of file
+    return f"{download_url}?Authorization={auth_token}"
+
+def copy_file_in_b2(source_file_name: str, destination_file_name: str) -> str:
+    """
+    Server-side copy of a file to a new name in the same bucket, returns the new name.
+    """
+    bucket = get_bucket()
+    source = bucket.get_file_info_by_name(source_file_name)
+    bucket.copy(source.id_, destination_file_name)
+    return destination_file_name
+
+def delete_file_from_b2(file_name: str):
+    """
+    Deletes the latest version of a file.
+    """
+    bucket = get_bucket()
+    file_version = bucket.get_file_info_by_name(file_name)
+    bucket.delete_file_version(file_version.id_, file_name)
+
+def download_file_from_b2(file_name: str) -> bytes:
+    """
+    Downloads a file and returns its bytes.
+    """
+    buffer = io.BytesIO()
+    get_bucket().download_file_by_name(file_name).save(buffer)
+    return buffer.getvalue()
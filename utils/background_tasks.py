@@ -1,35 +1,391 @@
+import os
 import threading
 import asyncio
-from typing import Optional, Dict, Any
-from sqlalchemy.orm import Session
+import itertools
+import time
+from collections import Counter, deque
 from datetime import datetime
+from functools import partial
+from typing import Optional, Dict, Any, List, Callable
+from sqlalchemy.orm import Session
 import logging
+from utils.processing_status import field_leases
+from utils.scheduler import FairScheduler, percentile, LANE_LIVE_TEXT, LANE_LIVE_AUDIO
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Finished tasks kept for introspection, older ones are dropped
+TASK_HISTORY_SIZE = int(os.getenv("TASK_HISTORY_SIZE", "1000"))
+# How long shutdown waits for running tasks before leaving their work for the next start
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "20"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+
+# Audio bytes that count as one more unit of scheduling cost, a long recording weighs more than a text answer
+AUDIO_COST_BYTES = int(os.getenv("AUDIO_COST_BYTES", str(1024 * 1024)))
+
+# Record of the task running on the current thread, for report_stage/report_error
+_current = threading.local()
+
+
+class TaskRecord:
+    """What the registry knows about one run of a background task"""
+
+    __slots__ = ("task_id", "kind", "form_id", "status", "stage", "error", "started_at", "finished_at",
+                 "duration_seconds", "wait_seconds", "tenant", "lane", "on_interrupt", "_started")
+
+    def __init__(self, task_id: str, kind: str, form_id: Optional[int], on_interrupt: Optional[Callable[[bool], None]] = None):
+        self.task_id = task_id
+        self.kind = kind
+        self.form_id = form_id
+        self.on_interrupt = on_interrupt
+        self.status = RUNNING
+        self.stage: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.duration_seconds: Optional[float] = None
+        self.wait_seconds: Optional[float] = None
+        self.tenant = None
+        self.lane: Optional[str] = None
+        self._started = time.perf_counter()
+
+    def start(self):
+        """Mark a queued task as running, the time it spent queued becomes its wait"""
+        now = time.perf_counter()
+        self.wait_seconds = now - self._started
+        self._started = now
+        self.started_at = datetime.utcnow()
+        self.status = RUNNING
+
+    def to_dict(self) -> Dict[str, Any]:
+        duration = self.duration_seconds
+        if duration is None:
+            duration = time.perf_counter() - self._started if self.status == RUNNING else 0.0
+        return {
+            "task_id": self.task_id,
+            "kind": self.kind,
+            "form_id": self.form_id,
+            "status": self.status,
+            "stage": self.stage,
+            "error": self.error,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_seconds": round(duration, 3),
+            "wait_seconds": round(self.wait_seconds, 3) if self.wait_seconds is not None else None,
+            "tenant": self.tenant,
+            "lane": self.lane,
+        }
+
+
+def report_stage(stage: str):
+    """Record the stage the background task on this thread has reached, a no-op outside one"""
+    record = getattr(_current, "record", None)
+    if record is not None:
+        record.stage = stage
+
+
+def report_error(error: str):
+    """Mark the background task on this thread as failed without it raising, a no-op outside one"""
+    record = getattr(_current, "record", None)
+    if record is not None:
+        record.error = error
+
+
 class BackgroundTaskManager:
-    """Manages background tasks for form response processing"""
+    """
+    Manages background tasks for form response processing
+
+    Running tasks are tracked until they finish, then their record moves to a
+    ring buffer of the last history_size runs, so memory stays constant however
+    long the process lives.
+
+    add_task runs a task on its own thread right away; submit queues answer
+    processing on the fair scheduler's bounded worker pool instead;
+    add_periodic_task repeats a task until shutdown.
+
+    Task threads are daemons and die with the process. On shutdown the manager
+    stops starting tasks and waits a bounded time for the running ones; tasks
+    that cannot finish get their on_interrupt callback to leave their work
+    resumable, with started=False when they never ran.
+    """
     
-    def __init__(self):
-        self.tasks = {}
+    def __init__(self, history_size: int = TASK_HISTORY_SIZE, scheduler: Optional[FairScheduler] = None):
+        self.scheduler = scheduler or FairScheduler()
+        self._live: Dict[int, TaskRecord] = {}
+        self._history: "deque[TaskRecord]" = deque(maxlen=history_size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        # Set once shutdown starts, long tasks check it to stop between units of work
+        self.stopping = threading.Event()
+        self._deadline: Optional[float] = None
+        self.started = 0
+        self.failed = 0
     
-    def add_task(self, task_id: str, task_func, *args, **kwargs):
-        """Add a background task"""
-        def run_task():
-            try:
-                logger.info(f"Starting background task: {task_id}")
-                task_func(*args, **kwargs)
-                logger.info(f"Completed background task: {task_id}")
-            except Exception as e:
-                logger.error(f"Background task {task_id} failed: {str(e)}")
-        
-        thread = threading.Thread(target=run_task, daemon=True)
+    def add_task(
+        self,
+        task_id: str,
+        task_func,
+        *args,
+        form_id: Optional[int] = None,
+        on_interrupt: Optional[Callable[[bool], None]] = None,
+        **kwargs
+    ):
+        """
+        Add a background task
+
+        Args:
+            task_id: Name of the run, shown by the task introspection endpoints
+            task_func: Function run on a new thread with the remaining arguments
+            form_id: Form the task works on, for filtering (not passed to task_func)
+            on_interrupt: Called with started when shutdown leaves the task unfinished
+                (not passed to task_func)
+
+        Returns:
+            The thread running the task, None if the manager is shutting down
+        """
+        if self.stopping.is_set():
+            logger.warning(f"Shutting down, not starting background task: {task_id}")
+            if on_interrupt:
+                self._interrupt(task_id, on_interrupt, started=False)
+            return None
+
+        key, record = self._register(task_id, task_func, form_id, on_interrupt)
+        thread = threading.Thread(target=self._execute, args=(key, record, task_func, args, kwargs), daemon=True)
         thread.start()
-        self.tasks[task_id] = thread
         return thread
 
+    def add_periodic_task(self, task_id: str, task_func, interval_seconds: float, *args, run_now: bool = False, **kwargs):
+        """
+        Run a task every interval_seconds on one thread until shutdown starts
+
+        Each run is recorded like a task started with add_task. A failing run is
+        logged and the next one still happens.
+
+        Args:
+            task_id: Name of the runs, shown by the task introspection endpoints
+            task_func: Function called with the remaining arguments
+            interval_seconds: Pause between the end of a run and the start of the next
+            run_now: Run once right away instead of after the first interval
+
+        Returns:
+            The thread running the task, None if the manager is shutting down
+        """
+        if self.stopping.is_set():
+            logger.warning(f"Shutting down, not starting periodic task: {task_id}")
+            return None
+
+        def repeat():
+            if run_now:
+                self._execute(*self._register(task_id, task_func, None, None), task_func, args, kwargs)
+            while not self.stopping.wait(interval_seconds):
+                self._execute(*self._register(task_id, task_func, None, None), task_func, args, kwargs)
+
+        thread = threading.Thread(target=repeat, name=f"periodic-{task_id}", daemon=True)
+        thread.start()
+        return thread
+
+    def submit(
+        self,
+        task_id: str,
+        task_func,
+        *args,
+        tenant,
+        lane: str,
+        cost: float = 1.0,
+        form_id: Optional[int] = None,
+        on_interrupt: Optional[Callable[[bool], None]] = None,
+        **kwargs
+    ) -> bool:
+        """
+        Queue a background task on the fair scheduler
+
+        Args:
+            task_id: Name of the run, shown by the task introspection endpoints
+            task_func: Function run on a worker with the remaining arguments
+            tenant: Form owner the work belongs to
+            lane: Scheduler lane, see utils.scheduler
+            cost: Relative size of the task within its tenant's share
+            form_id: Form the task works on, for filtering
+            on_interrupt: Called with started when shutdown leaves the task unfinished
+
+        Returns:
+            False if the manager is shutting down and the task was not queued
+        """
+        if self.stopping.is_set():
+            logger.warning(f"Shutting down, not queueing background task: {task_id}")
+            if on_interrupt:
+                self._interrupt(task_id, on_interrupt, started=False)
+            return False
+
+        key, record = self._register(task_id, task_func, form_id, on_interrupt, status=QUEUED)
+        record.tenant = tenant
+        record.lane = lane
+
+        def run():
+            record.start()
+            self._execute(key, record, task_func, args, kwargs)
+
+        def drop():
+            record.error = "Interrupted by shutdown before it started"
+            self._finish(key, record, status=INTERRUPTED)
+            if on_interrupt:
+                self._interrupt(task_id, on_interrupt, started=False)
+
+        if not self.scheduler.submit(tenant, lane, run, cost, on_drop=drop):
+            drop()
+            return False
+        return True
+
+    def _register(self, task_id: str, task_func, form_id: Optional[int], on_interrupt, status: str = RUNNING):
+        record = TaskRecord(task_id, task_func.__name__, form_id, on_interrupt)
+        record.status = status
+        with self._lock:
+            key = next(self._ids)
+            self._live[key] = record
+            self.started += 1
+        return key, record
+
+    def _execute(self, key: int, record: TaskRecord, task_func, args, kwargs):
+        _current.record = record
+        try:
+            logger.info(f"Starting background task: {record.task_id}")
+            task_func(*args, **kwargs)
+            logger.info(f"Completed background task: {record.task_id}")
+        except Exception as e:
+            logger.error(f"Background task {record.task_id} failed: {str(e)}")
+            record.error = str(e)
+        finally:
+            _current.record = None
+            self._finish(key, record)
+
+    def _finish(self, key: int, record: TaskRecord, status: Optional[str] = None):
+        record.finished_at = datetime.utcnow()
+        record.duration_seconds = time.perf_counter() - record._started if record.status == RUNNING else 0.0
+        record.status = status or (FAILED if record.error else COMPLETED)
+        with self._lock:
+            self._live.pop(key, None)
+            self._history.append(record)
+            if record.status == FAILED:
+                self.failed += 1
+            if not self._live:
+                self._idle.notify_all()
+
+    @staticmethod
+    def _interrupt(task_id: str, on_interrupt: Callable[[bool], None], started: bool):
+        try:
+            on_interrupt(started)
+        except Exception as e:
+            logger.error(f"Could not save the unfinished work of background task {task_id}: {str(e)}")
+
+    def shutdown(self, timeout: float = SHUTDOWN_DRAIN_SECONDS) -> List[Dict[str, Any]]:
+        """
+        Stop starting tasks and wait up to timeout seconds for the running ones
+
+        Returns:
+            Records of the tasks still running at the deadline, their on_interrupt
+            callbacks have been called
+        """
+        deadline = time.monotonic() + timeout
+        self._deadline = deadline
+        self.stopping.set()
+        # Interrupting the queued tasks counts against the deadline, see time_left
+        dropped = self.scheduler.stop()
+        if dropped:
+            logger.info(f"Left {dropped} queued background tasks for the next start")
+        with self._lock:
+            if self._live:
+                logger.info(f"Waiting up to {timeout:.0f}s for {len(self._live)} background tasks")
+            while self._live:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._idle.wait(remaining)
+            unfinished = list(self._live.values())
+
+        for record in unfinished:
+            logger.warning(f"Background task {record.task_id} still running at shutdown (stage: {record.stage})")
+            if record.on_interrupt:
+                self._interrupt(record.task_id, record.on_interrupt, started=True)
+        if not unfinished:
+            logger.info("All background tasks finished")
+        return [record.to_dict() for record in unfinished]
+
+    def time_left(self) -> float:
+        """Seconds until the shutdown deadline, infinite while not shutting down"""
+        if self._deadline is None:
+            return float("inf")
+        return max(0.0, self._deadline - time.monotonic())
+
+    def list_tasks(
+        self,
+        status: Optional[str] = None,
+        form_id: Optional[int] = None,
+        kind: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """Queued and running tasks, oldest first, then finished ones, most recent first"""
+        with self._lock:
+            records = list(self._live.values()) + list(reversed(self._history))
+        tasks = []
+        for record in records:
+            if status and record.status != status:
+                continue
+            if form_id is not None and record.form_id != form_id:
+                continue
+            if kind and record.kind != kind:
+                continue
+            tasks.append(record.to_dict())
+            if len(tasks) >= limit:
+                break
+        return tasks
+
+    def stats(self) -> Dict[str, Any]:
+        """Live task counts, scheduler state and, per task kind, outcomes and duration percentiles of the history"""
+        with self._lock:
+            live = Counter(record.kind for record in self._live.values() if record.status == RUNNING)
+            queued = sum(1 for record in self._live.values() if record.status == QUEUED)
+            history = list(self._history)
+            summary = {
+                "accepting": not self.stopping.is_set(),
+                "running": sum(live.values()),
+                "queued": queued,
+                "started": self.started,
+                "failed": self.failed,
+                "history_size": len(history),
+                "history_capacity": self._history.maxlen,
+            }
+
+        durations: Dict[str, List[float]] = {}
+        failures = Counter()
+        for record in history:
+            durations.setdefault(record.kind, []).append(record.duration_seconds)
+            if record.status == FAILED:
+                failures[record.kind] += 1
+
+        kinds = {}
+        for kind in sorted(set(durations) | set(live)):
+            values = sorted(durations.get(kind, []))
+            kinds[kind] = {
+                "running": live[kind],
+                "finished": len(values),
+                "failed": failures[kind],
+                "p50_seconds": percentile(values, 0.5),
+                "p90_seconds": percentile(values, 0.9),
+                "p99_seconds": percentile(values, 0.99),
+                "max_seconds": round(values[-1], 3) if values else None,
+            }
+        summary["kinds"] = kinds
+        summary["scheduler"] = self.scheduler.stats()
+        return summary
+
 # Global background task manager
 background_manager = BackgroundTaskManager()
 
@@ -65,64 +421,75 @@ def process_form_response_background(
         # Import here to avoid circular imports
         from utils.b2 import upload_file_to_b2
         from utils.gemini import transcribe_audio_file as gemini_transcribe
-        from utils.translation import detect_language_and_translate, extract_categories_from_text, analyze_sentiment
-        from utils.analytics import process_response_for_analytics
+        from utils.pipeline import analyze_text, update_form_analytics
+        from utils.question_analytics import question_analytics_cache
+        from utils.rollups import record_answer_analysis
+        from utils.processing_status import update_processing_status, RUNNING, DONE, FAILED
         from models.form_response_field import FormResponseField
-        from models.form_analytics import FormAnalytics
+        
+        # Get the record created by the request, its status is updated as each stage starts
+        field = db.query(FormResponseField).filter(
+            FormResponseField.formResponseId == formResponseId,
+            FormResponseField.formfeildId == formfeildId
+        ).first()
+        if not field:
+            logger.error(f"FormResponseField not found for formResponseId: {formResponseId}, formfeildId: {formfeildId}")
+        
+        errors = []
+        
+        def start_stage(stage: str):
+            report_stage(stage)
+            if not field:
+                return
+            try:
+                update_processing_status(db, field, RUNNING, stage)
+            except Exception as e:
+                logger.error(f"Failed to record stage {stage}: {str(e)}")
+                db.rollback()
         
         voiceFileLink = None
         transcribed_text = None
         
         # 1. Handle file upload if present
         if file_content and file_name:
+            start_stage("upload")
             try:
                 voiceFileLink = upload_file_to_b2(file_content, file_name, file_content_type)
                 logger.info(f"File uploaded successfully: {voiceFileLink}")
             except Exception as e:
                 logger.error(f"File upload failed: {str(e)}")
+                errors.append(f"upload: {str(e)}")
         
         # 2. Transcribe audio if file was uploaded
         if file_content and voiceFileLink:
+            start_stage("transcription")
             try:
                 transcribed_text = gemini_transcribe(file_content, file_name)
                 logger.info(f"Transcription completed: {transcribed_text[:100] if transcribed_text else 'None'}...")
             except Exception as e:
                 logger.error(f"Transcription failed: {str(e)}")
+                errors.append(f"transcription: {str(e)}")
         
         # 3. Process text analysis (translation, sentiment, categories)
-        translated_text = None
-        categories = []
-        sentiment = "neutral"
-        language_code = "en"
+        analysis = {"translated_text": None, "language": "en", "sentiment": "neutral", "categories": []}
         
         # Get the text to analyze (prefer transcribed_text over responseText)
         text_to_analyze = transcribed_text if transcribed_text else responseText
         
         if text_to_analyze:
             try:
-                # Detect language and translate if needed
-                translated_text, is_translated, language_code = detect_language_and_translate(text_to_analyze)
-                logger.info(f"Language detection: {language_code}, Translated: {is_translated}")
-                
-                # Analyze sentiment
-                sentiment = analyze_sentiment(text_to_analyze)
-                logger.info(f"Sentiment analysis: {sentiment}")
-                
-                # Extract categories from the text
-                categories = extract_categories_from_text(text_to_analyze)
-                logger.info(f"Extracted {len(categories)} categories")
-                
+                analyze_text(text_to_analyze, start_stage, result=analysis)
             except Exception as e:
                 logger.error(f"Text analysis failed: {str(e)}")
+                errors.append(f"analysis: {str(e)}")
+        
+        translated_text = analysis["translated_text"]
+        language_code = analysis["language"]
+        sentiment = analysis["sentiment"]
+        categories = analysis["categories"]
         
         # 4. Update the database record with processed data
         try:
-            # Get the existing record
-            field = db.query(FormResponseField).filter(
-                FormResponseField.formResponseId == formResponseId,
-                FormResponseField.formfeildId == formfeildId
-            ).first()
-            
             if field:
                 # Update the record with processed data
                 field.voiceFileLink = voiceFileLink
@@ -131,58 +498,40 @@ def process_form_response_background(
                 field.categories = categories
                 field.sentiment = sentiment
                 field.language = language_code
+                record_answer_analysis(db, formId, formResponseId, sentiment, language_code)
                 
                 db.commit()
+                question_analytics_cache.invalidate(formId)
                 logger.info(f"Updated FormResponseField {field.responsefieldId} with processed data")
-            else:
-                logger.error(f"FormResponseField not found for formResponseId: {formResponseId}, formfeildId: {formfeildId}")
                 
         except Exception as e:
             logger.error(f"Database update failed: {str(e)}")
+            errors.append(f"save: {str(e)}")
             db.rollback()
         
         # 5. Process analytics if we have transcribed text
         if transcribed_text:
+            start_stage("analytics")
             try:
-                # Get existing analytics for this form
-                existing_analytics = db.query(FormAnalytics).filter(
-                    FormAnalytics.formId == formId,
-                    FormAnalytics.status == "active"
-                ).first()
-                
-                existing_categories = existing_analytics.response_categories if existing_analytics else []
-                
-                # Process response for analytics
-                analytics_result = process_response_for_analytics(
-                    transcribed_text, 
-                    formId, 
-                    existing_categories
-                )
-                
-                # Calculate total responses
-                total_responses = sum(cat.get('response_count', 0) for cat in analytics_result["categories"])
-                
-                # Update or create analytics
-                if existing_analytics:
-                    existing_analytics.response_categories = analytics_result["categories"]
-                    existing_analytics.total_responses = total_responses
-                    existing_analytics.update_timestamp = datetime.utcnow()
-                    logger.info(f"Updated analytics with {len(analytics_result['categories'])} categories")
-                else:
-                    new_analytics = FormAnalytics(
-                        formId=formId,
-                        response_categories=analytics_result["categories"],
-                        total_responses=total_responses,
-                        status="active"
-                    )
-                    db.add(new_analytics)
-                    logger.info(f"Created new analytics with {len(analytics_result['categories'])} categories")
-                
-                db.commit()
+                update_form_analytics(db, formId, transcribed_text, sentiment)
                 logger.info("Analytics processing completed")
                 
             except Exception as e:
                 logger.error(f"Analytics processing failed: {str(e)}")
+                errors.append(f"analytics: {str(e)}")
+                db.rollback()
+        
+        # 6. Record the final processing status
+        if errors:
+            report_error("; ".join(errors))
+        if field:
+            try:
+                if errors:
+                    update_processing_status(db, field, FAILED, error="; ".join(errors))
+                else:
+                    update_processing_status(db, field, DONE)
+            except Exception as e:
+                logger.error(f"Failed to record final processing status: {str(e)}")
                 db.rollback()
         
         db.close()
@@ -190,8 +539,66 @@ def process_form_response_background(
         
     except Exception as e:
         logger.error(f"Background task failed: {str(e)}")
+        report_error(str(e))
         if 'db' in locals():
             db.close()
+    finally:
+        field_leases.release((formId, formResponseId, formfeildId))
+
+def interrupt_form_response_processing(items: List[Dict[str, Any]], db_session_factory, started: bool):
+    """
+    Leave the fields of an unfinished processing task resumable after a shutdown
+
+    Fields still queued or running are marked interrupted, resume_interrupted picks
+    them up on the next instance that runs it. Voice files of fields processing never
+    reached are uploaded first while the shutdown deadline allows, so a large audio
+    backlog cannot keep the process past its stop timeout. Recordings that were not
+    uploaded are written to the local audio spool instead, resume_interrupted uploads
+    them; only a field whose recording could not even be spooled is marked failed.
+
+    Args:
+        items: Keyword arguments of process_form_response_background for each field
+        db_session_factory: Session factory
+        started: Whether the task had started (unused, the field status tells per field)
+    """
+    from utils.b2 import upload_file_to_b2
+    from utils.audio_spool import spool_audio
+    from utils.processing_status import update_processing_status, QUEUED, RUNNING, FAILED, INTERRUPTED
+    from models.form_response_field import FormResponseField
+    from utils.pipeline import SHUTDOWN_INTERRUPTED, AUDIO_SPOOLED
+
+    db = db_session_factory()
+    try:
+        for item in items:
+            field = db.query(FormResponseField).filter(
+                FormResponseField.formResponseId == item["formResponseId"],
+                FormResponseField.formfeildId == item["formfeildId"]
+            ).first()
+            if not field or field.processing_status not in (QUEUED, RUNNING):
+                continue
+            # A running field's thread may be uploading right now
+            if item.get("file_content") and not field.voiceFileLink and field.processing_status == QUEUED \
+                    and background_manager.time_left() > 0:
+                try:
+                    field.voiceFileLink = upload_file_to_b2(item["file_content"], item["file_name"], item["file_content_type"])
+                except Exception as e:
+                    logger.error(f"Upload of {item['file_name']} at shutdown failed: {str(e)}")
+            if item.get("file_content") and not field.voiceFileLink:
+                try:
+                    spool_audio(field.responsefieldId, item["file_content"], item["file_name"], item["file_content_type"])
+                    update_processing_status(db, field, INTERRUPTED, error=AUDIO_SPOOLED)
+                except OSError as e:
+                    logger.error(f"Spooling {item['file_name']} at shutdown failed: {str(e)}")
+                    update_processing_status(db, field, FAILED, error=f"Interrupted by shutdown, the voice file could not be saved: {str(e)}")
+            else:
+                update_processing_status(db, field, INTERRUPTED, error=SHUTDOWN_INTERRUPTED)
+            logger.info(f"FormResponseField {field.responsefieldId} left as {field.processing_status} at shutdown")
+    except Exception as e:
+        logger.error(f"Saving interrupted fields failed: {str(e)}")
+        db.rollback()
+    finally:
+        db.close()
+        field_leases.release(*((item["formId"], item["formResponseId"], item["formfeildId"]) for item in items))
 
 def start_background_processing(
     formResponseId: int,
@@ -206,23 +613,55 @@ def start_background_processing(
     user_id: str,
     db_session_factory
 ):
-    """Start background processing for a form response field"""
-    task_id = f"form_response_{formResponseId}_{formfeildId}_{question_number}"
+    """Queue background processing for a form response field"""
+    item = {
+        "formResponseId": formResponseId,
+        "formId": formId,
+        "formfeildId": formfeildId,
+        "responseText": responseText,
+        "file_content": file_content,
+        "file_name": file_name,
+        "file_content_type": file_content_type,
+        "question_number": question_number,
+        "responseTime": responseTime,
+        "user_id": user_id,
+    }
     
-    background_manager.add_task(
+    _queue_field_processing(item, db_session_factory)
+
+def _queue_field_processing(item: Dict[str, Any], db_session_factory):
+    """Queue one field on the scheduler: its form owner is the tenant, text answers go ahead of audio"""
+    task_id = f"form_response_{item['formResponseId']}_{item['formfeildId']}_{item['question_number']}"
+    file_content = item.get("file_content")
+    # Renewed until the task finishes or is interrupted, see FieldLeases
+    field_leases.hold((item["formId"], item["formResponseId"], item["formfeildId"]))
+    queued = background_manager.submit(
         task_id,
         process_form_response_background,
-        formResponseId,
-        formId,
-        formfeildId,
-        responseText,
-        file_content,
-        file_name,
-        file_content_type,
-        question_number,
-        responseTime,
-        user_id,
-        db_session_factory
+        db_session_factory=db_session_factory,
+        tenant=item["user_id"],
+        lane=LANE_LIVE_AUDIO if file_content else LANE_LIVE_TEXT,
+        cost=1.0 + (len(file_content) / AUDIO_COST_BYTES if file_content else 0.0),
+        form_id=item["formId"],
+        on_interrupt=partial(interrupt_form_response_processing, [item], db_session_factory),
+        **item
     )
+    if queued:
+        logger.info(f"Queued background task: {task_id}")
+
+def start_batch_background_processing(formResponseId: int, items: List[Dict[str, Any]], db_session_factory):
+    """
+    Queue background processing for all fields of a response
+    
+    Each field is its own scheduler task, so the text answers of a response are
+    not held up behind its recordings.
     
-    logger.info(f"Started background task: {task_id}")
+    Args:
+        formResponseId: ID of the form response the fields belong to
+        items: Keyword arguments of process_form_response_background for each field
+        db_session_factory: Session factory for the background tasks
+    """
+    for item in items:
+        _queue_field_processing(item, db_session_factory)
+    if items:
+        logger.info(f"Queued processing of response {formResponseId} ({len(items)} fields)")
@@ -0,0 +1,366 @@
+import os
+import time
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, case, func, select, update
+from sqlalchemy.orm import Session
+
+from models.form_response_field import FormResponseField
+from utils.gemini_batch import SUCCEEDED, FAILED as BATCH_FAILED, read_responses, write_requests
+from utils.processing_status import (
+    QUEUED, DONE, FAILED, INTERRUPTED, TERMINAL_STATUSES, REQUEUEABLE_STATUSES, BATCH_STAGE, lease_expiry
+)
+from utils.rollups import record_answer_analysis
+from utils.sentiment import classify_sentiment_locally
+from utils.translation import (
+    prefilter_translation,
+    translation_request,
+    parse_translation_response,
+    sentiment_request,
+    parse_sentiment_response,
+    categories_request,
+    parse_categories_response,
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds between status checks of a submitted batch
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "60"))
+
+# Text stages that can run as provider batches; sentiment needs the translation, so it is a second round
+BATCH_STAGES = ["translation", "sentiment", "categories"]
+
+_PARSERS = {
+    "translation": parse_translation_response,
+    "sentiment": parse_sentiment_response,
+    "categories": parse_categories_response,
+}
+
+
+class BatchFailedError(RuntimeError):
+    """The provider reports a submitted batch as failed"""
+
+
+def lease_keys(fields: List[Dict[str, Any]]) -> List[Tuple[int, int, int]]:
+    """FieldLeases keys of the given answers"""
+    return [(field["form_id"], field["response_id"], field["form_field_id"]) for field in fields]
+
+
+def request_key(stage: str, field_id: int) -> str:
+    return f"{stage}:{field_id}"
+
+
+def load_fields(db: Session, field_ids: List[int]) -> List[Dict[str, Any]]:
+    """Text and stored analysis of answers, in the plain form a batch works on"""
+    rows = db.execute(
+        select(
+            FormResponseField.responsefieldId,
+            FormResponseField.formId,
+            FormResponseField.formResponseId,
+            FormResponseField.formfeildId,
+            FormResponseField.transcribed_text,
+            FormResponseField.responseText,
+            FormResponseField.translated_text,
+            FormResponseField.sentiment,
+            FormResponseField.language,
+            FormResponseField.processing_status,
+            FormResponseField.processing_stage,
+            FormResponseField.processing_error,
+        )
+        .where(FormResponseField.responsefieldId.in_(field_ids))
+        .order_by(FormResponseField.responsefieldId)
+    ).all()
+    return [
+        {
+            "id": row.responsefieldId,
+            "form_id": row.formId,
+            "response_id": row.formResponseId,
+            "form_field_id": row.formfeildId,
+            # Same text the online pipeline analyzes
+            "text": row.transcribed_text or row.responseText,
+            "translated_text": row.translated_text,
+            "sentiment": row.sentiment,
+            "language": row.language,
+            "status": row.processing_status,
+            "stage": row.processing_stage,
+            "error": row.processing_error,
+        }
+        for row in rows
+    ]
+
+
+def claim_fields(db: Session, fields: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[int, Optional[list]]]:
+    """
+    Queue the answers a batch will process, skipping those without text or owned by the live pipeline
+
+    Claimed answers are in the batch stage and leased, the caller renews the lease while
+    it waits. Answers not counted in the rollups keep the error they were interrupted
+    with, it tells how to resume them if the batch fails or the run stops; the others
+    have none. Like in reprocess_field, an answer interrupted in the analytics stage
+    is already counted.
+
+    Returns:
+        (claimed fields, sentiment and language counted in the rollups per claimed field id)
+    """
+    claimed = [field for field in fields if field["text"] and field["status"] in REQUEUEABLE_STATUSES]
+    counted = {
+        field["id"]: [field["sentiment"], field["language"]]
+        if field["status"] in TERMINAL_STATUSES or (field["status"] == INTERRUPTED and field["stage"] == "analytics")
+        else None
+        for field in claimed
+    }
+    if claimed:
+        db.execute(
+            update(FormResponseField)
+            .where(
+                FormResponseField.responsefieldId.in_([field["id"] for field in claimed]),
+                FormResponseField.processing_status.in_(REQUEUEABLE_STATUSES),
+            )
+            .values(
+                processing_status=QUEUED,
+                processing_stage=BATCH_STAGE,
+                processing_progress=0,
+                processing_error=case(
+                    (
+                        and_(
+                            FormResponseField.processing_status == INTERRUPTED,
+                            func.coalesce(FormResponseField.processing_stage, "") != "analytics",
+                        ),
+                        FormResponseField.processing_error,
+                    ),
+                    else_=None,
+                ),
+                processing_lease_expires_at=lease_expiry(),
+            )
+        )
+        db.commit()
+    return claimed, counted
+
+
+def first_round(fields: List[Dict[str, Any]], stages: List[str], results: Dict[int, Dict[str, Any]]) -> Iterator[Tuple[str, dict]]:
+    """
+    Requests of the first round: translation, categories, and sentiment when translation is not run
+
+    Answers the local models settle are written to results instead of requested.
+    """
+    for field in fields:
+        result = results.setdefault(field["id"], {})
+        if "translation" in stages:
+            local_result, language_hint = prefilter_translation(field["text"])
+            if local_result:
+                result["translated_text"], _, result["language"] = local_result
+            else:
+                yield request_key("translation", field["id"]), translation_request(field["text"], language_hint)
+        if "categories" in stages:
+            yield request_key("categories", field["id"]), categories_request(field["text"])
+    if "sentiment" in stages and "translation" not in stages:
+        yield from sentiment_round(fields, stages, results)
+
+
+def sentiment_round(fields: List[Dict[str, Any]], stages: List[str], results: Dict[int, Dict[str, Any]]) -> Iterator[Tuple[str, dict]]:
+    """Sentiment requests on the English text, the local classifier settles confident answers"""
+    for field in fields:
+        result = results.setdefault(field["id"], {})
+        translated_text = result.get("translated_text") if "translation" in stages else field["translated_text"]
+        text = translated_text or field["text"]
+        local_sentiment = classify_sentiment_locally(text) if text and text.strip() else "neutral"
+        if local_sentiment:
+            result["sentiment"] = local_sentiment
+        else:
+            yield request_key("sentiment", field["id"]), sentiment_request(text)
+
+
+def apply_responses(
+    output_path: str,
+    expected_keys: List[str],
+    results: Dict[int, Dict[str, Any]],
+    errors: Dict[int, List[str]]
+):
+    """Parse a batch output file into results, requests without a usable response go to errors"""
+    answered = set()
+    for key, response, error in read_responses(output_path):
+        stage, field_id = key.split(":", 1)
+        field_id = int(field_id)
+        answered.add(key)
+        if error:
+            errors[field_id].append(f"{stage}: {error}")
+            continue
+        try:
+            parsed = _PARSERS[stage](response)
+        except Exception as e:
+            errors[field_id].append(f"{stage}: unreadable response ({str(e)})")
+            continue
+        result = results.setdefault(field_id, {})
+        if stage == "translation":
+            result["translated_text"], _, result["language"] = parsed
+        else:
+            result[stage] = parsed
+    for key in set(expected_keys) - answered:
+        stage, field_id = key.split(":", 1)
+        errors[int(field_id)].append(f"{stage}: missing from the batch output")
+
+
+def run_round(
+    provider,
+    job_dir: str,
+    name: str,
+    requests_by_key: List[Tuple[str, dict]],
+    rounds: Dict[str, Dict[str, Any]],
+    save: Callable[[], None],
+    poll_seconds: float = BATCH_POLL_SECONDS
+) -> Optional[str]:
+    """
+    Submit a round's requests as one batch, or pick up the batch a previous run submitted, and wait for it
+
+    Args:
+        provider: Batch provider from utils.gemini_batch
+        job_dir: Directory of the job files
+        name: Round name, unique within the job directory
+        requests_by_key: (key, generateContent request) pairs
+        rounds: Persisted round state, the submitted batch is recorded here
+        save: Persists rounds, called right after submission so a restart does not submit again
+
+    Returns:
+        Path of the downloaded output file, None if the round had no requests
+
+    Raises:
+        BatchFailedError: If the batch failed
+    """
+    state = rounds.get(name)
+    if state is None:
+        if not requests_by_key:
+            return None
+        input_path = os.path.join(job_dir, f"{name}.jsonl")
+        count = write_requests(input_path, iter(requests_by_key))
+        state = {"batch": provider.submit(input_path, name), "requests": count}
+        rounds[name] = state
+        save()
+        print(f"📤 Submitted {count} requests as batch {state['batch']}")
+    elif "batch" not in state:
+        return None
+
+    started = time.monotonic()
+    while True:
+        status, error = provider.status(state["batch"])
+        if status == SUCCEEDED:
+            break
+        if status == BATCH_FAILED:
+            raise BatchFailedError(f"Batch {state['batch']} failed: {error}")
+        print(f"⏳ Batch {state['batch']} still running ({int(time.monotonic() - started)}s)")
+        time.sleep(poll_seconds)
+
+    output_path = os.path.join(job_dir, f"{name}.output.jsonl")
+    provider.download(state["batch"], output_path)
+    return output_path
+
+
+def process_batch(
+    provider,
+    job_dir: str,
+    name: str,
+    fields: List[Dict[str, Any]],
+    stages: List[str],
+    rounds: Dict[str, Dict[str, Any]],
+    save: Callable[[], None],
+    poll_seconds: float = BATCH_POLL_SECONDS
+) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, List[str]]]:
+    """
+    Run the text stages of the given answers as provider batches
+
+    Returns:
+        (new column values per field id, stage errors per field id)
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    errors: Dict[int, List[str]] = defaultdict(list)
+
+    first = list(first_round(fields, stages, results))
+    output_path = run_round(provider, job_dir, f"{name}-1", first, rounds, save, poll_seconds)
+    if output_path:
+        apply_responses(output_path, [key for key, _ in first], results, errors)
+
+    if "sentiment" in stages and "translation" in stages:
+        second = list(sentiment_round(fields, stages, results))
+        output_path = run_round(provider, job_dir, f"{name}-2", second, rounds, save, poll_seconds)
+        if output_path:
+            apply_responses(output_path, [key for key, _ in second], results, errors)
+
+    return results, errors
+
+
+def apply_results(
+    db: Session,
+    fields: List[Dict[str, Any]],
+    counted: Dict[int, Optional[list]],
+    results: Dict[int, Dict[str, Any]],
+    errors: Dict[int, List[str]]
+) -> int:
+    """
+    Write batch results to the answers with one bulk UPDATE, and count them in the rollups
+
+    Returns:
+        Number of answers that failed
+    """
+    rows = []
+    failed = 0
+    for field in fields:
+        result = results.get(field["id"], {})
+        field_errors = errors.get(field["id"])
+        failed += bool(field_errors)
+        rows.append({
+            "responsefieldId": field["id"],
+            "formId": field["form_id"],
+            **result,
+            "processing_status": FAILED if field_errors else DONE,
+            "processing_stage": None,
+            "processing_progress": 100,
+            "processing_error": "; ".join(field_errors) if field_errors else None,
+            "processing_lease_expires_at": None,
+        })
+        if "sentiment" in result or "language" in result:
+            record_answer_analysis(
+                db, field["form_id"], field["response_id"],
+                result.get("sentiment", field["sentiment"]), result.get("language", field["language"]),
+                tuple(counted[field["id"]]) if counted.get(field["id"]) else None,
+            )
+    if rows:
+        # Updated by primary key, formId included so each row only touches its partition;
+        # rows are grouped by the columns they set, one executemany per group
+        db.execute(update(FormResponseField), rows)
+    db.commit()
+    return failed
+
+
+def fail_fields(db: Session, fields: List[Dict[str, Any]], counted: Dict[int, Optional[list]], error: str) -> int:
+    """
+    Release the answers of a failed batch with one bulk UPDATE
+
+    Answers counted in the rollups are marked failed with the error and keep their
+    stored analysis, like an answer failing online. The others were interrupted
+    before the batch claimed them and are marked interrupted again with their
+    previous error, so they are resumed as before.
+
+    Returns:
+        Number of answers marked failed
+    """
+    rows = []
+    failed = 0
+    for field in fields:
+        is_counted = counted.get(field["id"]) is not None
+        failed += is_counted
+        rows.append({
+            "responsefieldId": field["id"],
+            "formId": field["form_id"],
+            "processing_status": FAILED if is_counted else INTERRUPTED,
+            "processing_stage": None,
+            "processing_progress": 0,
+            "processing_error": error if is_counted else field["error"],
+            "processing_lease_expires_at": None,
+        })
+    if rows:
+        db.execute(update(FormResponseField), rows)
+    db.commit()
+    return failed
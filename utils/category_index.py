@@ -0,0 +1,155 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.embeddings import embed_texts
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cosine similarity a centroid must reach for a response to be assigned without the LLM
+CATEGORY_MATCH_THRESHOLD = float(os.getenv("CATEGORY_MATCH_THRESHOLD", "0.80"))
+# A response is assigned to at most this many of the matching categories
+CATEGORY_MAX_MATCHES = int(os.getenv("CATEGORY_MAX_MATCHES", "3"))
+# Number of forms whose indexes are kept in memory
+CATEGORY_INDEX_CACHE_SIZE = int(os.getenv("CATEGORY_INDEX_CACHE_SIZE", "512"))
+
+
+def category_seed_text(category: Dict) -> str:
+    """Text embedded for a category that has no response embeddings yet"""
+    return f"{category.get('category_name', '')}: {category.get('summary_text', '')}"
+
+
+class CategoryIndex:
+    """Category centroids of one form, stored as rows of a float32 matrix"""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.names: List[str] = []
+        self._rows: Dict[str, int] = {}
+        # Running sums of member embeddings and their unit-length centroids
+        self._sums = np.zeros((16, dim), dtype=np.float32)
+        self._centroids = np.zeros((16, dim), dtype=np.float32)
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._rows
+
+    def match(self, vector: np.ndarray, threshold: float = None, max_matches: int = None) -> List[Tuple[str, float]]:
+        """
+        Find the categories whose centroids are closest to a response embedding
+
+        Args:
+            vector: Unit-length response embedding
+            threshold: Minimum cosine similarity, defaults to CATEGORY_MATCH_THRESHOLD
+            max_matches: Maximum number of categories returned, defaults to CATEGORY_MAX_MATCHES
+
+        Returns:
+            List of (category_name, similarity) sorted by similarity, empty if nothing passes the threshold
+        """
+        threshold = CATEGORY_MATCH_THRESHOLD if threshold is None else threshold
+        max_matches = CATEGORY_MAX_MATCHES if max_matches is None else max_matches
+        count = len(self.names)
+        if not count:
+            return []
+
+        similarities = self._centroids[:count] @ vector
+        candidates = np.flatnonzero(similarities >= threshold)
+        if not len(candidates):
+            return []
+        best = candidates[np.argsort(-similarities[candidates])[:max_matches]]
+        return [(self.names[i], float(similarities[i])) for i in best]
+
+    def add(self, name: str, vector: np.ndarray):
+        """Add a response embedding to a category, creating the category row if needed"""
+        row = self._rows.get(name)
+        if row is None:
+            row = len(self.names)
+            if row == len(self._sums):
+                # Grow by doubling so appends stay amortized O(dim)
+                self._sums = np.vstack([self._sums, np.zeros_like(self._sums)])
+                self._centroids = np.vstack([self._centroids, np.zeros_like(self._centroids)])
+            self.names.append(name)
+            self._rows[name] = row
+        self._sums[row] += vector
+        norm = np.linalg.norm(self._sums[row])
+        self._centroids[row] = self._sums[row] / norm if norm else self._sums[row]
+
+    def retain(self, names: List[str]):
+        """Drop categories that no longer exist in the form's analytics"""
+        keep = set(names)
+        if all(name in keep for name in self.names):
+            return
+        kept_rows = [self._rows[name] for name in self.names if name in keep]
+        count = len(kept_rows)
+        self.names = [self.names[row] for row in kept_rows]
+        self._rows = {name: i for i, name in enumerate(self.names)}
+        self._sums[:count] = self._sums[kept_rows]
+        self._centroids[:count] = self._centroids[kept_rows]
+        self._sums[count:] = 0
+        self._centroids[count:] = 0
+
+
+_indexes: "OrderedDict[int, CategoryIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_category_index(
+    form_id: int,
+    categories: List[Dict],
+    dim: int,
+    seed_vectors: Optional[Dict[str, np.ndarray]] = None
+) -> Optional[CategoryIndex]:
+    """
+    Get the form's category index, embedding any categories it does not know yet
+
+    Categories loaded from the database have no stored embeddings, so they are
+    seeded from their name and summary in one batch request the first time the
+    form is seen by this process.
+
+    Args:
+        form_id: ID of the form
+        categories: Current categories from the form's analytics
+        dim: Embedding dimension
+        seed_vectors: Embeddings to seed specific new categories with instead of their summary
+
+    Returns:
+        The form's CategoryIndex or None if seeding embeddings failed
+    """
+    seed_vectors = seed_vectors or {}
+    with _indexes_lock:
+        index = _indexes.get(form_id)
+        if index is None or index.dim != dim:
+            index = CategoryIndex(dim)
+            _indexes[form_id] = index
+        _indexes.move_to_end(form_id)
+        while len(_indexes) > CATEGORY_INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+
+    with index.lock:
+        index.retain([cat['category_name'] for cat in categories])
+        for name, vector in seed_vectors.items():
+            if name not in index:
+                index.add(name, vector)
+        missing = [cat for cat in categories if cat['category_name'] not in index]
+        if missing:
+            seeds = embed_texts([category_seed_text(cat) for cat in missing])
+            if seeds is None:
+                return None
+            for cat, vector in zip(missing, seeds):
+                index.add(cat['category_name'], vector)
+    return index
+
+
+def invalidate_category_index(form_id: int):
+    """Forget the form's index, e.g. after its categories were rebuilt"""
+    with _indexes_lock:
+        _indexes.pop(form_id, None)
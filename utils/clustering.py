@@ -0,0 +1,123 @@
+import math
+from typing import Tuple
+
+import numpy as np
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def choose_cluster_count(n_items: int, max_clusters: int) -> int:
+    """Rule-of-thumb k = sqrt(n/2), bounded by max_clusters"""
+    if n_items <= 0:
+        return 0
+    return max(1, min(max_clusters, n_items, int(round(math.sqrt(n_items / 2)))))
+
+
+def kmeans(X: np.ndarray, k: int, iterations: int = 50, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spherical k-means with k-means++ seeding on unit-length embeddings
+
+    Args:
+        X: (n, dim) float32 matrix of unit-length rows
+        k: Number of clusters
+        iterations: Maximum number of Lloyd iterations
+        seed: Random seed, fixed so reruns on the same data are stable
+
+    Returns:
+        Tuple of (labels, centroids)
+        - labels: (n,) cluster index per row
+        - centroids: (k, dim) unit-length cluster centroids
+    """
+    n = len(X)
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+
+    # k-means++ seeding with cosine distance
+    centroids = np.empty((k, X.shape[1]), dtype=np.float32)
+    centroids[0] = X[rng.integers(n)]
+    closest = np.clip(1.0 - X @ centroids[0], 0.0, None)
+    for i in range(1, k):
+        weights = closest ** 2
+        total = weights.sum()
+        pick = rng.choice(n, p=weights / total) if total > 0 else rng.integers(n)
+        centroids[i] = X[pick]
+        closest = np.minimum(closest, np.clip(1.0 - X @ centroids[i], 0.0, None))
+
+    labels = np.zeros(n, dtype=np.int64)
+    for _ in range(iterations):
+        new_labels = np.argmax(X @ centroids.T, axis=1)
+        one_hot = np.zeros((n, k), dtype=np.float32)
+        one_hot[np.arange(n), new_labels] = 1.0
+        sums = one_hot.T @ X
+        counts = one_hot.sum(axis=0)
+        # Empty clusters keep their previous centroid
+        sums[counts == 0] = centroids[counts == 0]
+        centroids = _normalize_rows(sums).astype(np.float32)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+    return labels, centroids
+
+
+def merge_similar_clusters(
+    centroids: np.ndarray,
+    counts: np.ndarray,
+    threshold: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Agglomeratively merge clusters whose centroids are more similar than threshold
+
+    Args:
+        centroids: (k, dim) unit-length centroids
+        counts: (k,) cluster sizes, used to weight merged centroids
+        threshold: Cosine similarity above which two clusters are merged
+
+    Returns:
+        Tuple of (mapping, centroids, counts)
+        - mapping: (k,) index of the merged cluster each input cluster ended up in
+        - centroids: (m, dim) merged unit-length centroids
+        - counts: (m,) merged cluster sizes
+    """
+    k = len(centroids)
+    groups = [[i] for i in range(k)]
+    sums = centroids * counts[:, None].astype(np.float32)
+    current = centroids.copy()
+    sizes = counts.astype(np.float64).copy()
+
+    while len(groups) > 1:
+        similarities = current @ current.T
+        np.fill_diagonal(similarities, -np.inf)
+        i, j = np.unravel_index(np.argmax(similarities), similarities.shape)
+        if similarities[i, j] < threshold:
+            break
+        i, j = min(i, j), max(i, j)
+        groups[i].extend(groups[j])
+        sums[i] += sums[j]
+        sizes[i] += sizes[j]
+        norm = np.linalg.norm(sums[i])
+        current[i] = sums[i] / norm if norm else current[i]
+        keep = np.arange(len(groups)) != j
+        del groups[j]
+        sums, current, sizes = sums[keep], current[keep], sizes[keep]
+
+    mapping = np.empty(k, dtype=np.int64)
+    for merged, members in enumerate(groups):
+        mapping[members] = merged
+    return mapping, current, sizes.astype(np.int64)
+
+
+def assign_to_centroids(X: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for each row of X"""
+    return np.argmax(X @ centroids.T, axis=1)
+
+
+def representative_indices(X: np.ndarray, centroid: np.ndarray, limit: int) -> np.ndarray:
+    """Indices of the rows of X closest to a centroid, most similar first"""
+    similarities = X @ centroid
+    limit = min(limit, len(X))
+    top = np.argpartition(-similarities, limit - 1)[:limit]
+    return top[np.argsort(-similarities[top])]
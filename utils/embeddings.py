@@ -0,0 +1,98 @@
+import os
+import json
+import logging
+from typing import List, Optional
+
+import numpy as np
+import requests
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("GEMINI_EMBEDDING_MODEL", "text-embedding-004")
+# batchEmbedContents accepts at most 100 requests per call
+EMBEDDING_BATCH_SIZE = 100
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def embed_texts(texts: List[str]) -> Optional[np.ndarray]:
+    """
+    Embed texts with the Gemini embedding API
+
+    Args:
+        texts: Texts to embed
+
+    Returns:
+        float32 matrix of unit-length embeddings (one row per text) or None if the request fails
+    """
+    if not texts:
+        return None
+
+    try:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            logger.error("GEMINI_API_KEY environment variable is not set")
+            return None
+
+        url = f"https://generativelanguage.googleapis.com/v1beta/models/{EMBEDDING_MODEL}:batchEmbedContents?key={api_key}"
+
+        headers = {
+            "Content-Type": "application/json"
+        }
+
+        rows = []
+        for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+            batch = texts[start:start + EMBEDDING_BATCH_SIZE]
+            payload = {
+                "requests": [
+                    {
+                        "model": f"models/{EMBEDDING_MODEL}",
+                        "content": {"parts": [{"text": text}]}
+                    }
+                    for text in batch
+                ]
+            }
+
+            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            if response.status_code != 200:
+                logger.error(f"Gemini API error for embeddings: {response.status_code} - {response.text}")
+                return None
+
+            result = response.json()
+            embeddings = result.get("embeddings") or []
+            if len(embeddings) != len(batch):
+                try:
+                    raw_snippet = json.dumps(result)[:2000]
+                except Exception:
+                    raw_snippet = str(result)[:2000]
+                logger.error("Unexpected response format from Gemini API for embeddings. Raw result (truncated): %s", raw_snippet)
+                return None
+            rows.extend(embedding.get("values") or [] for embedding in embeddings)
+
+        return _normalize_rows(np.asarray(rows, dtype=np.float32))
+
+    except Exception as e:
+        logger.error(f"Error embedding texts: {str(e)}")
+        return None
+
+
+def embed_text(text: str) -> Optional[np.ndarray]:
+    """
+    Embed a single text with the Gemini embedding API
+
+    Args:
+        text: Text to embed
+
+    Returns:
+        Unit-length float32 vector or None if the request fails
+    """
+    if not text or not text.strip():
+        return None
+    matrix = embed_texts([text])
+    return matrix[0] if matrix is not None and len(matrix) else None
@@ -0,0 +1,191 @@
+import csv
+import io
+import json
+import os
+import logging
+from typing import Iterator, List, Sequence
+
+from sqlalchemy import select
+
+from models.form_fields import FormField
+from models.form_response import FormResponse
+from models.form_response_field import FormResponseField
+from models.archive import ArchivedFormResponse, ArchivedFormResponseField
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Rows fetched per server-side cursor batch, and written per CSV chunk / Parquet row group
+EXPORT_ROW_GROUP_SIZE = int(os.getenv("EXPORT_ROW_GROUP_SIZE", "5000"))
+
+EXPORT_COLUMNS = [
+    "response_id",
+    "response_status",
+    "started_at",
+    "submitted_at",
+    "question_id",
+    "question_number",
+    "question",
+    "response_text",
+    "transcribed_text",
+    "translated_text",
+    "language",
+    "sentiment",
+    "categories",
+    "response_time",
+    "voice_file",
+]
+
+
+def export_query(form_id: int, archived: bool = False):
+    """One row per answer, joined with its response and question, from the archive tables for archived forms"""
+    Response, Answer = (ArchivedFormResponse, ArchivedFormResponseField) if archived else (FormResponse, FormResponseField)
+    return (
+        select(
+            Response.responseId,
+            Response.status,
+            Response.created_at,
+            Response.submitTimestamp,
+            FormField.id,
+            FormField.question_number,
+            FormField.question,
+            Answer.responseText,
+            Answer.transcribed_text,
+            Answer.translated_text,
+            Answer.language,
+            Answer.sentiment,
+            Answer.categories,
+            Answer.response_time,
+            Answer.voiceFileLink,
+        )
+        .join(Response, Response.responseId == Answer.formResponseId)
+        .join(FormField, FormField.id == Answer.formfeildId)
+        # Both sides filtered by form so each table prunes to its partition
+        .where(Answer.formId == form_id, Response.formId == form_id)
+        .order_by(Answer.formResponseId, FormField.question_number)
+    )
+
+
+def iter_export_batches(
+    form_id: int,
+    db_session_factory,
+    batch_size: int = None,
+    archived: bool = False
+) -> Iterator[List[Sequence]]:
+    """
+    Stream a form's answers in fixed-size batches through a server-side cursor
+
+    The session is opened here rather than taken from the request, because the
+    response body is produced after the request's dependencies have been closed.
+    """
+    batch_size = batch_size or EXPORT_ROW_GROUP_SIZE
+    db = db_session_factory()
+    try:
+        result = db.execute(export_query(form_id, archived).execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def stream_csv(form_id: int, db_session_factory, archived: bool = False) -> Iterator[bytes]:
+    """Yield the export as UTF-8 CSV, one chunk per row batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in iter_export_batches(form_id, db_session_factory, archived=archived):
+        writer.writerows([_csv_value(value) for value in row] for row in batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the generator"""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+        self.position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_parquet(form_id: int, db_session_factory, archived: bool = False) -> Iterator[bytes]:
+    """Yield the export as a Parquet file, one row group per row batch (requires pyarrow)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("response_id", pa.int64()),
+        ("response_status", pa.string()),
+        ("started_at", pa.timestamp("us")),
+        ("submitted_at", pa.timestamp("us")),
+        ("question_id", pa.int64()),
+        ("question_number", pa.int64()),
+        ("question", pa.string()),
+        ("response_text", pa.string()),
+        ("transcribed_text", pa.string()),
+        ("translated_text", pa.string()),
+        ("language", pa.string()),
+        ("sentiment", pa.string()),
+        ("categories", pa.string()),
+        ("response_time", pa.float64()),
+        ("voice_file", pa.string()),
+    ])
+    categories_index = EXPORT_COLUMNS.index("categories")
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for batch in iter_export_batches(form_id, db_session_factory, archived=archived):
+            columns = [list(column) for column in zip(*batch)]
+            columns[categories_index] = [
+                json.dumps(value, ensure_ascii=False) if value is not None else None
+                for value in columns[categories_index]
+            ]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
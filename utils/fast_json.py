@@ -0,0 +1,39 @@
+import json
+from typing import Any, Dict, Iterable, List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library encoder is used instead
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson when it is installed
+
+    Used as the application's default response class. Handlers on hot paths
+    return it directly with plain dicts/lists built from SQL rows, which skips
+    response model validation and jsonable_encoder; orjson serializes datetimes
+    natively. Without orjson the content goes through jsonable_encoder and the
+    standard library encoder, so the output is the same either way.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=ORJSON_OPTIONS)
+        return json.dumps(
+            jsonable_encoder(content),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+
+def row_dicts(rows: Iterable) -> List[Dict[str, Any]]:
+    """Plain dicts from SQLAlchemy result rows, keyed by column label"""
+    return [dict(row._mapping) for row in rows]
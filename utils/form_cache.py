@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional
+
+from sqlalchemy.orm import Session, selectinload
+
+from models.form import Form
+from schemas.form import FormOut
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Entries are invalidated by update_form/delete_form in this process; the TTL bounds
+# how long other worker processes can serve a stale copy
+FORM_CACHE_TTL_SECONDS = float(os.getenv("FORM_CACHE_TTL_SECONDS", "300"))
+FORM_CACHE_MAX_ENTRIES = int(os.getenv("FORM_CACHE_MAX_ENTRIES", "1024"))
+
+
+class CachedForm:
+    """Serialized public payload of a form plus the lookups the ingestion endpoints need"""
+
+    __slots__ = ("form_id", "form_unique_id", "owner_id", "status", "is_archived", "field_ids",
+                 "required_field_ids", "payload", "etag", "expires_at")
+
+    def __init__(self, form: Form):
+        fields = sorted(form.fields, key=lambda f: f.question_number)
+        self.form_id: int = form.id
+        self.form_unique_id: str = form.form_unique_id
+        self.owner_id: int = form.user_id
+        self.status: str = form.status
+        # Archived forms no longer accept responses, see utils.archival
+        self.is_archived: bool = form.archived_at is not None
+        self.field_ids: FrozenSet[int] = frozenset(field.id for field in fields)
+        self.required_field_ids: FrozenSet[int] = frozenset(field.id for field in fields if field.required)
+
+        data = FormOut.model_validate(form).model_dump(mode="json")
+        data["fields"] = sorted(data["fields"] or [], key=lambda f: f["question_number"])
+        self.payload: bytes = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        self.etag: str = '"' + hashlib.sha256(self.payload).hexdigest()[:32] + '"'
+        self.expires_at: float = time.monotonic() + FORM_CACHE_TTL_SECONDS
+
+    @property
+    def is_deleted(self) -> bool:
+        return self.status == "deleted"
+
+    def etag_matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header value matches this payload"""
+        if not if_none_match:
+            return False
+        # Weak comparison, the compression middleware marks encoded representations as W/
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or self.etag in candidates
+
+
+class FormCache:
+    """LRU cache of forms keyed by form_unique_id, with a form id index for the ingestion endpoints"""
+
+    def __init__(self, max_entries: int = FORM_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._by_unique_id: "OrderedDict[str, CachedForm]" = OrderedDict()
+        self._unique_id_by_form_id: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, form_unique_id: str) -> Optional[CachedForm]:
+        entry = self._by_unique_id.get(form_unique_id)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            self._remove(form_unique_id)
+            return None
+        self._by_unique_id.move_to_end(form_unique_id)
+        return entry
+
+    def _remove(self, form_unique_id: str):
+        entry = self._by_unique_id.pop(form_unique_id, None)
+        if entry is not None:
+            self._unique_id_by_form_id.pop(entry.form_id, None)
+
+    def _put(self, entry: CachedForm):
+        self._by_unique_id[entry.form_unique_id] = entry
+        self._by_unique_id.move_to_end(entry.form_unique_id)
+        self._unique_id_by_form_id[entry.form_id] = entry.form_unique_id
+        while len(self._by_unique_id) > self.max_entries:
+            _, evicted = self._by_unique_id.popitem(last=False)
+            self._unique_id_by_form_id.pop(evicted.form_id, None)
+
+    def _load(self, db: Session, *criteria) -> Optional[CachedForm]:
+        form = db.query(Form).options(selectinload(Form.fields)).filter(*criteria).first()
+        if not form:
+            return None
+        entry = CachedForm(form)
+        with self._lock:
+            self._put(entry)
+        return entry
+
+    def get_by_unique_id(self, db: Session, form_unique_id: str) -> Optional[CachedForm]:
+        """Cached form for the public endpoint, loaded on a miss (deleted forms included, check is_deleted)"""
+        with self._lock:
+            entry = self._get(form_unique_id)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return self._load(db, Form.form_unique_id == form_unique_id)
+
+    def get_by_id(self, db: Session, form_id: int) -> Optional[CachedForm]:
+        """Cached form by primary key, for owner and field lookups on submission"""
+        with self._lock:
+            form_unique_id = self._unique_id_by_form_id.get(form_id)
+            entry = self._get(form_unique_id) if form_unique_id else None
+        if entry is not None:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return self._load(db, Form.id == form_id)
+
+    def invalidate(self, form_id: int = None, form_unique_id: str = None):
+        """Drop a form from the cache after it changed"""
+        with self._lock:
+            if form_unique_id is None and form_id is not None:
+                form_unique_id = self._unique_id_by_form_id.get(form_id)
+            if form_unique_id is not None:
+                self._remove(form_unique_id)
+
+    def clear(self):
+        with self._lock:
+            self._by_unique_id.clear()
+            self._unique_id_by_form_id.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._by_unique_id), "hits": self.hits, "misses": self.misses}
+
+
+form_cache = FormCache()
@@ -0,0 +1,169 @@
+import os
+import json
+import logging
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import requests
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com"
+GEMINI_BATCH_MODEL = os.getenv("GEMINI_BATCH_MODEL", "gemini-2.5-flash")
+# Which provider batch jobs go to, only gemini is available
+BATCH_PROVIDER = os.getenv("BATCH_PROVIDER", "gemini")
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+PENDING = "pending"
+
+# Terminal batch states of the Gemini API
+_GEMINI_STATES = {
+    "BATCH_STATE_SUCCEEDED": SUCCEEDED,
+    "JOB_STATE_SUCCEEDED": SUCCEEDED,
+    "BATCH_STATE_FAILED": FAILED,
+    "BATCH_STATE_CANCELLED": FAILED,
+    "BATCH_STATE_EXPIRED": FAILED,
+    "JOB_STATE_FAILED": FAILED,
+    "JOB_STATE_CANCELLED": FAILED,
+    "JOB_STATE_EXPIRED": FAILED,
+}
+
+
+def write_requests(path: str, requests_by_key: Iterator[Tuple[str, Dict[str, Any]]]) -> int:
+    """
+    Write generateContent requests as a batch input file, one {"key", "request"} object per line
+
+    Returns:
+        Number of requests written
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for key, request in requests_by_key:
+            f.write(json.dumps({"key": key, "request": request}, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def read_responses(path: str) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Read a batch output file
+
+    Yields:
+        (key, generateContent response or None, error message or None) per line
+    """
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            error = entry.get("error") or entry.get("status")
+            if error and not entry.get("response"):
+                yield entry.get("key"), None, error.get("message") if isinstance(error, dict) else str(error)
+            else:
+                yield entry.get("key"), entry.get("response") or {}, None
+
+
+class GeminiBatchProvider:
+    """
+    Gemini Batch Mode: the input file is uploaded through the Files API, a batch is
+    created from it and, once done, its responses file is downloaded
+
+    Batches are billed at a discount and do not draw on the interactive rate limits,
+    at the cost of completing within hours rather than seconds.
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key: Optional[str] = None, model: str = GEMINI_BATCH_MODEL):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
+            raise RuntimeError("GEMINI_API_KEY environment variable is not set")
+        self.model = model
+
+    def _upload(self, path: str, display_name: str) -> str:
+        size = os.path.getsize(path)
+        start = requests.post(
+            f"{GEMINI_API_BASE}/upload/v1beta/files",
+            params={"key": self.api_key},
+            headers={
+                "X-Goog-Upload-Protocol": "resumable",
+                "X-Goog-Upload-Command": "start",
+                "X-Goog-Upload-Header-Content-Length": str(size),
+                "X-Goog-Upload-Header-Content-Type": "application/jsonl",
+                "Content-Type": "application/json",
+            },
+            json={"file": {"display_name": display_name}},
+            timeout=30,
+        )
+        start.raise_for_status()
+        upload_url = start.headers["X-Goog-Upload-URL"]
+        with open(path, "rb") as f:
+            uploaded = requests.post(
+                upload_url,
+                headers={
+                    "Content-Length": str(size),
+                    "X-Goog-Upload-Offset": "0",
+                    "X-Goog-Upload-Command": "upload, finalize",
+                },
+                data=f,
+                timeout=600,
+            )
+        uploaded.raise_for_status()
+        return uploaded.json()["file"]["name"]
+
+    def submit(self, input_path: str, display_name: str) -> str:
+        """Upload an input file and create a batch from it, returns the batch name"""
+        file_name = self._upload(input_path, display_name)
+        response = requests.post(
+            f"{GEMINI_API_BASE}/v1beta/models/{self.model}:batchGenerateContent",
+            params={"key": self.api_key},
+            json={"batch": {"display_name": display_name, "input_config": {"file_name": file_name}}},
+            timeout=60,
+        )
+        response.raise_for_status()
+        batch_name = response.json()["name"]
+        logger.info(f"Submitted Gemini batch {batch_name} from {input_path}")
+        return batch_name
+
+    def _get(self, batch_name: str) -> Dict[str, Any]:
+        response = requests.get(f"{GEMINI_API_BASE}/v1beta/{batch_name}", params={"key": self.api_key}, timeout=30)
+        response.raise_for_status()
+        return response.json()
+
+    def status(self, batch_name: str) -> Tuple[str, Optional[str]]:
+        """(SUCCEEDED, FAILED or PENDING, error message)"""
+        batch = self._get(batch_name)
+        metadata = batch.get("metadata") or {}
+        state = metadata.get("state") or batch.get("state") or ""
+        status = _GEMINI_STATES.get(state, PENDING)
+        if status == PENDING and batch.get("done"):
+            status = FAILED if batch.get("error") else SUCCEEDED
+        error = (batch.get("error") or {}).get("message") or (state if status == FAILED else None)
+        return status, error
+
+    def download(self, batch_name: str, output_path: str):
+        """Save the responses file of a succeeded batch"""
+        batch = self._get(batch_name)
+        output = (batch.get("response") or {}).get("responsesFile") \
+            or ((batch.get("metadata") or {}).get("output") or {}).get("responsesFile")
+        if not output:
+            raise RuntimeError(f"Batch {batch_name} has no responses file")
+        response = requests.get(
+            f"{GEMINI_API_BASE}/download/v1beta/{output}:download",
+            params={"alt": "media", "key": self.api_key},
+            stream=True,
+            timeout=600,
+        )
+        response.raise_for_status()
+        with open(output_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                f.write(chunk)
+
+
+def get_batch_provider(name: str = BATCH_PROVIDER):
+    """Batch provider by name"""
+    if name == GeminiBatchProvider.name:
+        return GeminiBatchProvider()
+    raise ValueError(f"Unknown batch provider: {name}")
@@ -0,0 +1,231 @@
+import math
+import os
+import re
+import logging
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Minimum confidence for "en" before the translation call is skipped entirely
+LANGUAGE_ID_CONFIDENCE = float(os.getenv("LANGUAGE_ID_CONFIDENCE", "0.9"))
+
+NGRAM_SIZE = 3
+# Texts shorter than this many letters never get a high-confidence verdict
+MIN_LETTERS = 12
+
+# Scripts that identify a language on their own, checked before any n-gram scoring
+_SCRIPT_RANGES = [
+    ("ko", ((0xAC00, 0xD7AF), (0x1100, 0x11FF), (0x3130, 0x318F))),
+    ("ja", ((0x3040, 0x309F), (0x30A0, 0x30FF))),
+    ("zh", ((0x4E00, 0x9FFF), (0x3400, 0x4DBF))),
+    ("ru", ((0x0400, 0x04FF),)),
+    ("ar", ((0x0600, 0x06FF), (0x0750, 0x077F))),
+    ("he", ((0x0590, 0x05FF),)),
+    ("el", ((0x0370, 0x03FF),)),
+    ("hi", ((0x0900, 0x097F),)),
+    ("th", ((0x0E00, 0x0E7F),)),
+]
+
+# Small training samples for Latin-script languages, turned into n-gram profiles once per process
+_TRAINING_TEXT = {
+    "en": """
+        the service was very good and the staff were friendly and helpful. i would like to
+        recommend this product to my friends because it works well and it is easy to use.
+        the delivery was late and the package was damaged when it arrived at my house.
+        what did you think about the experience? we are happy with the quality but the price
+        is a little too high for what you get. there is nothing i would change about it.
+        they should improve the app because it is slow and sometimes it crashes. thank you
+        for asking, overall i am satisfied with everything and will come back again soon.
+        it was not what i expected, the instructions were confusing and nobody answered.
+        my favourite part was the customer support, they solved the problem very quickly.
+        this is the best place in town, the food is great and the people are kind.
+    """,
+    "es": """
+        el servicio fue muy bueno y el personal era amable y servicial. me gustaría recomendar
+        este producto a mis amigos porque funciona bien y es fácil de usar. la entrega llegó
+        tarde y el paquete estaba dañado cuando llegó a mi casa. qué te pareció la experiencia?
+        estamos contentos con la calidad pero el precio es un poco alto para lo que ofrece.
+        no hay nada que cambiaría. deberían mejorar la aplicación porque es lenta y a veces
+        se cierra. gracias por preguntar, en general estoy satisfecho con todo y volveré pronto.
+        no era lo que esperaba, las instrucciones eran confusas y nadie respondió. mi parte
+        favorita fue la atención al cliente, resolvieron el problema muy rápido. este es el
+        mejor lugar de la ciudad, la comida es excelente y la gente es muy amable.
+    """,
+    "fr": """
+        le service était très bon et le personnel était aimable et serviable. je voudrais
+        recommander ce produit à mes amis parce qu'il fonctionne bien et il est facile à
+        utiliser. la livraison était en retard et le colis était endommagé quand il est arrivé
+        chez moi. qu'avez-vous pensé de l'expérience? nous sommes contents de la qualité mais
+        le prix est un peu trop élevé pour ce que l'on obtient. il n'y a rien que je changerais.
+        ils devraient améliorer l'application car elle est lente et parfois elle plante. merci
+        de demander, dans l'ensemble je suis satisfait de tout et je reviendrai bientôt. ce
+        n'était pas ce que j'attendais, les instructions étaient confuses et personne n'a
+        répondu. ma partie préférée était le service client, ils ont résolu le problème très
+        vite. c'est le meilleur endroit de la ville, la nourriture est excellente et les gens
+        sont gentils.
+    """,
+    "de": """
+        der service war sehr gut und das personal war freundlich und hilfsbereit. ich würde
+        dieses produkt meinen freunden empfehlen, weil es gut funktioniert und einfach zu
+        benutzen ist. die lieferung war verspätet und das paket war beschädigt, als es bei mir
+        zu hause ankam. was haben sie von der erfahrung gehalten? wir sind mit der qualität
+        zufrieden, aber der preis ist etwas zu hoch für das, was man bekommt. es gibt nichts,
+        was ich ändern würde. sie sollten die app verbessern, weil sie langsam ist und manchmal
+        abstürzt. danke für die nachfrage, insgesamt bin ich mit allem zufrieden und komme bald
+        wieder. es war nicht das, was ich erwartet hatte, die anleitung war verwirrend und
+        niemand hat geantwortet. am besten war der kundendienst, sie haben das problem sehr
+        schnell gelöst. das ist der beste ort in der stadt, das essen ist großartig und die
+        leute sind nett.
+    """,
+    "it": """
+        il servizio è stato molto buono e il personale era gentile e disponibile. vorrei
+        consigliare questo prodotto ai miei amici perché funziona bene ed è facile da usare.
+        la consegna è arrivata in ritardo e il pacco era danneggiato quando è arrivato a casa
+        mia. cosa ne pensi dell'esperienza? siamo contenti della qualità ma il prezzo è un po'
+        troppo alto per quello che si ottiene. non c'è niente che cambierei. dovrebbero
+        migliorare l'applicazione perché è lenta e a volte si blocca. grazie per avermelo
+        chiesto, nel complesso sono soddisfatto di tutto e tornerò presto. non era quello che
+        mi aspettavo, le istruzioni erano confuse e nessuno ha risposto. la mia parte preferita
+        è stata l'assistenza clienti, hanno risolto il problema molto velocemente. questo è il
+        posto migliore della città, il cibo è ottimo e le persone sono simpatiche.
+    """,
+    "pt": """
+        o serviço foi muito bom e os funcionários foram simpáticos e prestativos. eu gostaria
+        de recomendar este produto aos meus amigos porque funciona bem e é fácil de usar. a
+        entrega atrasou e o pacote estava danificado quando chegou na minha casa. o que você
+        achou da experiência? estamos felizes com a qualidade mas o preço é um pouco alto
+        para o que se recebe. não há nada que eu mudaria. eles deveriam melhorar o aplicativo
+        porque é lento e às vezes trava. obrigado por perguntar, no geral estou satisfeito com
+        tudo e voltarei em breve. não era o que eu esperava, as instruções eram confusas e
+        ninguém respondeu. a minha parte favorita foi o atendimento ao cliente, eles
+        resolveram o problema muito rápido. este é o melhor lugar da cidade, a comida é ótima
+        e as pessoas são gentis.
+    """,
+    "nl": """
+        de service was erg goed en het personeel was vriendelijk en behulpzaam. ik zou dit
+        product aan mijn vrienden aanraden omdat het goed werkt en makkelijk te gebruiken is.
+        de levering was te laat en het pakket was beschadigd toen het bij mij thuis aankwam.
+        wat vond je van de ervaring? we zijn blij met de kwaliteit maar de prijs is een beetje
+        te hoog voor wat je krijgt. er is niets dat ik zou veranderen. ze zouden de app moeten
+        verbeteren omdat hij traag is en soms crasht. bedankt voor het vragen, over het
+        algemeen ben ik tevreden over alles en kom ik snel terug. het was niet wat ik had
+        verwacht, de instructies waren verwarrend en niemand antwoordde. mijn favoriete deel
+        was de klantenservice, ze hebben het probleem heel snel opgelost. dit is de beste plek
+        in de stad, het eten is geweldig en de mensen zijn aardig.
+    """,
+}
+
+_NON_LETTER_RE = re.compile(r"[^\w']+|[\d_]+")
+
+
+def _normalize(text: str) -> str:
+    return " " + " ".join(_NON_LETTER_RE.sub(" ", text.lower()).split()) + " "
+
+
+def _ngrams(text: str) -> Counter:
+    normalized = _normalize(text)
+    return Counter(normalized[i:i + NGRAM_SIZE] for i in range(len(normalized) - NGRAM_SIZE + 1))
+
+
+@lru_cache(maxsize=1)
+def _load_profiles() -> Dict[str, Tuple[Dict[str, float], float]]:
+    """
+    Build smoothed log-probability tables per language once per process
+
+    Returns:
+        Mapping of language code to (trigram log-probabilities, log-probability for unseen trigrams)
+    """
+    counts = {lang: _ngrams(sample) for lang, sample in _TRAINING_TEXT.items()}
+    vocabulary_size = len(set().union(*counts.values())) + 1
+    profiles = {}
+    for lang, grams in counts.items():
+        total = sum(grams.values()) + vocabulary_size
+        profiles[lang] = (
+            {gram: math.log((count + 1) / total) for gram, count in grams.items()},
+            math.log(1 / total),
+        )
+    logger.info(f"Loaded language profiles for: {', '.join(sorted(profiles))}")
+    return profiles
+
+
+def _detect_script(text: str) -> Tuple[str, float]:
+    """Return (language, share of letters) for the dominant non-Latin script, if any"""
+    letters = [ord(c) for c in text if c.isalpha()]
+    if not letters:
+        return None, 0.0
+    script_counts = Counter()
+    for code_point in letters:
+        for lang, ranges in _SCRIPT_RANGES:
+            if any(start <= code_point <= end for start, end in ranges):
+                script_counts[lang] += 1
+                break
+    if not script_counts:
+        return None, 0.0
+    lang, count = script_counts.most_common(1)[0]
+    # Japanese text mixes kana with Han characters, any kana settles it
+    if lang == "zh" and script_counts.get("ja"):
+        lang, count = "ja", count + script_counts["ja"]
+    return lang, count / len(letters)
+
+
+def identify_language(text: str) -> Tuple[str, float]:
+    """
+    Identify the language of text with character trigram profiles
+
+    Args:
+        text: Text to identify
+
+    Returns:
+        Tuple of (language_code, confidence)
+        - language_code: ISO 639-1 code of the most likely language (defaults to "en")
+        - confidence: Posterior probability of that language (0.0 to 1.0)
+    """
+    if not text or not text.strip():
+        return "en", 0.0
+
+    script_lang, script_share = _detect_script(text)
+    if script_lang and script_share >= 0.5:
+        return script_lang, script_share
+
+    grams = _ngrams(text)
+    n_grams = sum(grams.values())
+    if not n_grams:
+        return "en", 0.0
+
+    profiles = _load_profiles()
+    scores = {}
+    for lang, (log_probs, unseen) in profiles.items():
+        scores[lang] = sum(count * log_probs.get(gram, unseen) for gram, count in grams.items()) / n_grams
+
+    # Average per-trigram log-likelihoods, sharpened by how much evidence the text carries
+    letters = sum(1 for c in text if c.isalpha())
+    sharpness = min(n_grams, 40) if letters >= MIN_LETTERS else min(n_grams, 40) / 4
+    best = max(scores.values())
+    exps = {lang: math.exp((score - best) * sharpness) for lang, score in scores.items()}
+    total = sum(exps.values())
+    lang = max(exps, key=exps.get)
+    return lang, exps[lang] / total
+
+
+def is_confidently_english(text: str, min_confidence: float = None) -> bool:
+    """
+    Check whether text is English with enough confidence to skip LLM language detection
+
+    Args:
+        text: Text to check
+        min_confidence: Confidence threshold, defaults to LANGUAGE_ID_CONFIDENCE
+
+    Returns:
+        True when the local identifier is confident the text is English
+    """
+    threshold = LANGUAGE_ID_CONFIDENCE if min_confidence is None else min_confidence
+    try:
+        lang, confidence = identify_language(text)
+    except Exception as e:
+        logger.error(f"Local language identification failed: {str(e)}")
+        return False
+    return lang == "en" and confidence >= threshold
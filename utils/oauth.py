@@ -0,0 +1,55 @@
+import os
+import asyncio
+import threading
+import logging
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Google OAuth config
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_OAUTH_CLIENT_ID")
+GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_OAUTH_CLIENT_SECRET")
+GOOGLE_SERVER_METADATA_URL = "https://accounts.google.com/.well-known/openid-configuration"
+
+_oauth = None
+_oauth_lock = threading.Lock()
+
+
+def get_oauth():
+    """OAuth registry with the Google client, created on first use"""
+    global _oauth
+    if _oauth is None:
+        with _oauth_lock:
+            if _oauth is None:
+                from authlib.integrations.starlette_client import OAuth
+
+                oauth = OAuth()
+                oauth.register(
+                    name='google',
+                    client_id=GOOGLE_CLIENT_ID,
+                    client_secret=GOOGLE_CLIENT_SECRET,
+                    server_metadata_url=GOOGLE_SERVER_METADATA_URL,
+                    client_kwargs={
+                        'scope': 'openid email profile',
+                    },
+                )
+                _oauth = oauth
+    return _oauth
+
+
+def google_client():
+    return get_oauth().google
+
+
+def warm_up():
+    """
+    Fetch Google's OpenID metadata ahead of the first login
+
+    The client caches it, otherwise the first login request pays for the discovery round trip.
+    Runs its own event loop, so call it from a background thread.
+    """
+    try:
+        asyncio.run(google_client().load_server_metadata())
+    except Exception as e:
+        logger.warning(f"OAuth warm-up failed, fetching metadata on first login instead: {e}")
@@ -0,0 +1,194 @@
+import os
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Partitioned tables in dependency order: form_response_fields references form_responses
+PARTITIONED_TABLES = ["form_responses", "form_response_fields"]
+
+# Number of consecutive form ids that share one partition
+PARTITION_FORM_RANGE = int(os.getenv("PARTITION_FORM_RANGE", "1000"))
+# Extra ranges pre-created beyond the highest existing form id
+PARTITION_LOOKAHEAD = int(os.getenv("PARTITION_LOOKAHEAD", "2"))
+
+
+def partition_bounds(form_id: int, form_range: int = PARTITION_FORM_RANGE) -> Tuple[int, int]:
+    """Half-open [lower, upper) formId range of the partition holding a form"""
+    lower = (form_id // form_range) * form_range
+    return lower, lower + form_range
+
+
+def partition_name(table: str, lower: int, upper: int) -> str:
+    return f"{table}_f{lower}_{upper}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def list_partitions(conn: Connection, table: str) -> List[Dict]:
+    """
+    Partitions of a table with their bounds and estimated row counts
+
+    Args:
+        conn: Connection to the PostgreSQL database
+        table: Partitioned parent table
+
+    Returns:
+        List of dicts with name, bound expression, lower/upper formId (None for the default partition) and rows
+    """
+    rows = conn.execute(text("""
+        SELECT child.relname,
+               pg_get_expr(child.relpartbound, child.oid),
+               child.reltuples::bigint
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+        ORDER BY child.relname
+    """), {"table": table}).all()
+
+    partitions = []
+    for name, bound, rows_estimate in rows:
+        lower = upper = None
+        if bound and bound.startswith("FOR VALUES FROM"):
+            # FOR VALUES FROM (1000) TO (2000)
+            values = bound.replace("FOR VALUES FROM", "").replace("TO", ",").replace("(", "").replace(")", "")
+            lower, upper = (int(value.strip()) for value in values.split(","))
+        partitions.append({
+            "name": name,
+            "bound": bound,
+            "lower": lower,
+            "upper": upper,
+            "rows": max(rows_estimate, 0),
+        })
+    return sorted(partitions, key=lambda p: (p["lower"] is None, p["lower"] or 0))
+
+
+def _rows_in_default(conn: Connection, table: str, lower: int, upper: int) -> int:
+    return conn.execute(
+        text(f'SELECT count(*) FROM {default_partition_name(table)} WHERE "formId" >= :lower AND "formId" < :upper'),
+        {"lower": lower, "upper": upper}
+    ).scalar()
+
+
+def create_partition_range(conn: Connection, lower: int, upper: int) -> bool:
+    """
+    Create the [lower, upper) partition of every partitioned table
+
+    Rows of the range that already landed in the default partitions are moved
+    into the new partitions. The partitions are built as standalone tables and
+    attached afterwards. Attaching takes a SHARE UPDATE EXCLUSIVE lock on the
+    parents, but it also scans the default partitions under an ACCESS EXCLUSIVE
+    lock to check no row of the range is left there, and validating the cloned
+    foreign key locks form_responses against writes. Everything is held until
+    the caller commits, so submissions wait for the whole call; the lookahead
+    keeps ranges created while the default partitions hold none of their rows.
+
+    Args:
+        conn: Connection inside a transaction, committed by the caller
+        lower: First formId of the range
+        upper: First formId after the range
+
+    Returns:
+        True if the partitions were created, False if they already existed
+    """
+    existing = {p["name"] for p in list_partitions(conn, PARTITIONED_TABLES[0])}
+    if partition_name(PARTITIONED_TABLES[0], lower, upper) in existing:
+        return False
+
+    bounds = {"lower": lower, "upper": upper}
+    for table in PARTITIONED_TABLES:
+        name = partition_name(table, lower, upper)
+        conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        if _rows_in_default(conn, table, lower, upper):
+            conn.execute(text(
+                f'INSERT INTO {name} SELECT * FROM {default_partition_name(table)} '
+                f'WHERE "formId" >= :lower AND "formId" < :upper'
+            ), bounds)
+
+    # Referencing rows go first, the foreign key is checked on delete
+    for table in reversed(PARTITIONED_TABLES):
+        conn.execute(text(
+            f'DELETE FROM {default_partition_name(table)} WHERE "formId" >= :lower AND "formId" < :upper'
+        ), bounds)
+
+    # Referenced partition first, attaching validates the foreign key of the referencing one
+    for table in PARTITIONED_TABLES:
+        conn.execute(text(
+            f"ALTER TABLE {table} ATTACH PARTITION {partition_name(table, lower, upper)} "
+            f"FOR VALUES FROM ({lower}) TO ({upper})"
+        ))
+    logger.info(f"Created partitions for formId range [{lower}, {upper})")
+    return True
+
+
+def ensure_partitions(
+    conn: Connection,
+    upto_form_id: Optional[int] = None,
+    lookahead: int = PARTITION_LOOKAHEAD,
+    form_range: int = PARTITION_FORM_RANGE
+) -> List[Tuple[int, int]]:
+    """
+    Pre-create partitions for every range up to the highest form id plus a lookahead
+
+    Args:
+        conn: Connection inside a transaction, committed by the caller
+        upto_form_id: Highest form id to cover, defaults to the current maximum in forms
+        lookahead: Number of additional ranges created beyond it
+        form_range: Form ids per partition
+
+    Returns:
+        The (lower, upper) ranges that were created
+    """
+    if upto_form_id is None:
+        upto_form_id = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM forms")).scalar()
+
+    _, last_upper = partition_bounds(upto_form_id, form_range)
+    last_upper += lookahead * form_range
+
+    created = []
+    for lower in range(0, last_upper, form_range):
+        if create_partition_range(conn, lower, lower + form_range):
+            created.append((lower, lower + form_range))
+    return created
+
+
+def detach_partition_range(conn: Connection, lower: int, upper: int) -> List[str]:
+    """
+    Detach the [lower, upper) partitions, keeping them as standalone tables
+
+    The detached tables are renamed with a _detached_<timestamp> suffix, so the
+    next ensure_partitions can create the range again, and can be archived or
+    dropped afterwards without touching the live tables. Rows of the range
+    written after detaching go to the default partitions until then.
+
+    Returns:
+        Names of the detached tables
+    """
+    detached = []
+    suffix = datetime.utcnow().strftime("_detached_%y%m%d%H%M%S")
+    # Referencing partition first, the referenced one cannot be detached while it is in use
+    for table in reversed(PARTITIONED_TABLES):
+        name = partition_name(table, lower, upper)
+        conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+        # The detached table keeps its foreign keys into the partitioned tables, which
+        # would block detaching the partitions it references
+        foreign_keys = conn.execute(text("""
+            SELECT conname FROM pg_constraint
+            WHERE contype = 'f' AND conrelid = CAST(:name AS regclass)
+              AND confrelid = ANY(CAST(:tables AS regclass[]))
+        """), {"name": name, "tables": "{" + ",".join(PARTITIONED_TABLES) + "}"}).scalars().all()
+        for constraint in foreign_keys:
+            conn.execute(text(f'ALTER TABLE {name} DROP CONSTRAINT "{constraint}"'))
+        conn.execute(text(f"ALTER TABLE {name} RENAME TO {name}{suffix}"))
+        detached.append(f"{name}{suffix}")
+    logger.info(f"Detached partitions for formId range [{lower}, {upper})")
+    return detached
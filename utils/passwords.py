@@ -0,0 +1,126 @@
+import os
+import asyncio
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Work factor of new hashes; stored hashes below it are upgraded on the next successful login
+PASSWORD_BCRYPT_ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+# Threads hashing passwords, separate from the threadpool serving sync routes
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# Hashes running or waiting before further logins and signups are rejected with 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=PASSWORD_BCRYPT_ROUNDS,
+)
+
+
+class PasswordHasher:
+    """
+    Bounded pool for bcrypt hashing and verification
+
+    bcrypt releases the GIL while it works, so a small thread pool keeps a burst
+    of logins off the event loop and off the threadpool that runs every sync
+    route. Work beyond max_pending is rejected instead of queued, a client
+    retrying later is better than a backlog that times out anyway.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._rehashed = 0
+        self._busy_seconds = 0.0
+
+    def _timed(self, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._busy_seconds += time.perf_counter() - started
+
+    async def _run(self, func, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                rejected = True
+            else:
+                self._pending += 1
+                rejected = False
+        if rejected:
+            logger.warning(f"Password hashing saturated ({self.max_pending} pending), rejecting request")
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-in attempts right now, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        try:
+            return await asyncio.wrap_future(self._executor.submit(self._timed, func, *args))
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password with the current work factor
+
+        Raises:
+            HTTPException: 503 when the pool is saturated
+        """
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password, rehashing it when the stored hash uses an outdated work factor
+
+        Returns:
+            (valid, new hash to store or None); stored values that are not a
+            password hash (e.g. accounts created through OAuth) never match
+
+        Raises:
+            HTTPException: 503 when the pool is saturated
+        """
+        if password is None or not hashed or not pwd_context.identify(hashed):
+            return False, None
+        valid, new_hash = await self._run(pwd_context.verify_and_update, password, hashed)
+        if new_hash:
+            with self._lock:
+                self._rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and counters of the pool"""
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "running": min(self._pending, self.workers),
+                "queued": max(0, self._pending - self.workers),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "rehashed": self._rehashed,
+                "avg_seconds": round(self._busy_seconds / self._completed, 4) if self._completed else None,
+            }
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,454 @@
+import logging
+import threading
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import and_, case, func, null, or_, update
+from sqlalchemy.orm import Session
+
+from models.form_analytics import FormAnalytics
+from models.form_response_field import FormResponseField
+from utils.analytics import process_response_for_analytics
+from utils.audio_spool import load_spooled_audio, discard_spooled_audio, spooled_field_ids
+from utils.background_tasks import background_manager, report_error, report_stage
+from utils.gemini import transcribe_audio_file as gemini_transcribe
+from utils.processing_status import (
+    update_processing_status, field_leases, lease_expiry,
+    QUEUED, RUNNING, DONE, FAILED, INTERRUPTED, TERMINAL_STATUSES, REQUEUEABLE_STATUSES, BATCH_STAGE
+)
+from utils.question_analytics import question_analytics_cache
+from utils.rollups import record_answer_analysis
+from utils.scheduler import LANE_BACKFILL
+from utils.translation import detect_language_and_translate, extract_categories_from_text, analyze_sentiment
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Stages that work on the text of an answer, in execution order
+TEXT_STAGES = ["translation", "sentiment", "categories"]
+# Stages that can be re-run on stored answers (the upload only happens on submission)
+REPROCESS_STAGES = ["transcription"] + TEXT_STAGES + ["analytics"]
+
+# processing_error of fields interrupted while reprocessing, their answer is already in the analytics
+REPROCESSING_INTERRUPTED = "Interrupted before reprocessing finished"
+# processing_error of fields interrupted in the live pipeline
+SHUTDOWN_INTERRUPTED = "Interrupted by shutdown"
+# processing_error of live fields whose voice file a shutdown left in the audio spool of its instance
+AUDIO_SPOOLED = "Interrupted by shutdown, the voice file is in the audio spool"
+# processing_error of fields reclaimed from a process that stopped without releasing them
+ABANDONED_INTERRUPTED = "Interrupted, the process working on it stopped"
+# processing_error of counted answers reclaimed from a batch run that stopped, retry them with --status failed
+BATCH_ABANDONED = "Batch run stopped before its results were applied"
+
+# Fields reprocess_field has queued in this process and not finished yet
+_reprocessing: Set[int] = set()
+_reprocessing_lock = threading.Lock()
+
+
+def analyze_text(
+    text: str,
+    start_stage: Optional[Callable[[str], None]] = None,
+    stages: List[str] = TEXT_STAGES,
+    translated_text: Optional[str] = None,
+    result: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Run the text stages of the pipeline on an answer
+
+    Args:
+        text: Transcribed or typed answer
+        start_stage: Called with the stage name before each stage starts
+        stages: Text stages to run
+        translated_text: Existing English translation, used for sentiment when translation is not run
+        result: Dict to fill in place, keeps the results of earlier stages when a later one fails
+
+    Returns:
+        Dict with translated_text and language (translation), sentiment and categories,
+        only for the stages that were run
+
+    Raises:
+        Exception: The first stage failure
+    """
+    result = {} if result is None else result
+
+    if "translation" in stages:
+        # Detect language and translate if needed
+        start_stage and start_stage("translation")
+        translated_text, is_translated, language_code = detect_language_and_translate(text)
+        logger.info(f"Language detection: {language_code}, Translated: {is_translated}")
+        result["translated_text"] = translated_text
+        result["language"] = language_code
+
+    if "sentiment" in stages:
+        # Analyze sentiment on the English text so the local classifier can handle it
+        start_stage and start_stage("sentiment")
+        result["sentiment"] = analyze_sentiment(translated_text or text)
+        logger.info(f"Sentiment analysis: {result['sentiment']}")
+
+    if "categories" in stages:
+        start_stage and start_stage("categories")
+        result["categories"] = extract_categories_from_text(text)
+        logger.info(f"Extracted {len(result['categories'])} categories")
+
+    return result
+
+
+def update_form_analytics(db: Session, formId: int, transcribed_text: str, sentiment: Optional[str]):
+    """
+    Merge one transcribed answer into the form's active analytics, creating them if needed
+
+    Raises:
+        Exception: Analytics or database failures, the caller rolls back
+    """
+    existing_analytics = db.query(FormAnalytics).filter(
+        FormAnalytics.formId == formId,
+        FormAnalytics.status == "active"
+    ).first()
+
+    existing_categories = existing_analytics.response_categories if existing_analytics else []
+
+    analytics_result = process_response_for_analytics(
+        transcribed_text,
+        formId,
+        existing_categories,
+        sentiment=sentiment
+    )
+
+    total_responses = sum(cat.get('response_count', 0) for cat in analytics_result["categories"])
+
+    if existing_analytics:
+        existing_analytics.response_categories = analytics_result["categories"]
+        existing_analytics.total_responses = total_responses
+        existing_analytics.update_timestamp = datetime.utcnow()
+        logger.info(f"Updated analytics with {len(analytics_result['categories'])} categories")
+    else:
+        db.add(FormAnalytics(
+            formId=formId,
+            response_categories=analytics_result["categories"],
+            total_responses=total_responses,
+            status="active"
+        ))
+        logger.info(f"Created new analytics with {len(analytics_result['categories'])} categories")
+
+    db.commit()
+
+
+def reprocess_field(
+    responsefieldId: int,
+    db_session_factory,
+    stages: List[str] = TEXT_STAGES,
+    claimed: bool = False
+) -> Optional[bool]:
+    """
+    Re-run pipeline stages on a stored answer
+
+    The field is queued again and moves through the usual processing states, so
+    clients following its status see the reprocessing. A voice file a shutdown left
+    in this instance's audio spool is uploaded first. Transcription downloads the
+    voice file from B2; the text stages use the new transcript, the stored one or
+    the typed answer. Only the columns of the stages that ran are overwritten.
+
+    Fields the live pipeline still has queued or running are skipped. A counted
+    answer is taken out of the rollups when it is queued and counted again when
+    its results are saved, so a field left interrupted before the save is never
+    in the rollups, whichever pipeline it was interrupted in.
+
+    Args:
+        responsefieldId: Answer to reprocess
+        db_session_factory: Session factory, one session is used per answer
+        stages: Subset of REPROCESS_STAGES to run
+        claimed: The caller already moved the field from interrupted to queued
+
+    Returns:
+        True if every requested stage succeeded, None if the field was skipped
+    """
+    from utils.b2 import download_file_from_b2, upload_file_to_b2
+
+    lease_key = None
+    db = db_session_factory()
+    try:
+        field = db.query(FormResponseField).filter(FormResponseField.responsefieldId == responsefieldId).first()
+        if not field:
+            logger.error(f"FormResponseField {responsefieldId} not found")
+            return False
+
+        if field.processing_status not in REQUEUEABLE_STATUSES and not (claimed and field.processing_status == QUEUED):
+            logger.info(f"FormResponseField {responsefieldId} is {field.processing_status} in the live pipeline, skipping")
+            return None
+        spooled = None if field.voiceFileLink else load_spooled_audio(responsefieldId)
+        if spooled is None and field.processing_error == AUDIO_SPOOLED:
+            logger.warning(f"The voice file of FormResponseField {responsefieldId} is in another instance's spool, skipping")
+            return None
+
+        # The sentiment and language counted in the rollups, held out of them until the new results are saved.
+        # Interrupted fields are counted once their results were saved, i.e. from the analytics stage on
+        saved = field.processing_status in TERMINAL_STATUSES or (
+            field.processing_status == INTERRUPTED and field.processing_stage == "analytics"
+        )
+        counted = (field.sentiment, field.language) if saved else None
+        if counted:
+            record_answer_analysis(db, field.formId, field.formResponseId, None, None, counted)
+        with _reprocessing_lock:
+            _reprocessing.add(responsefieldId)
+        lease_key = (field.formId, field.formResponseId, field.formfeildId)
+        field_leases.hold(lease_key)
+        update_processing_status(db, field, QUEUED)
+
+        errors = []
+
+        def start_stage(stage: str):
+            report_stage(stage)
+            try:
+                update_processing_status(db, field, RUNNING, stage)
+            except Exception as e:
+                logger.error(f"Failed to record stage {stage}: {str(e)}")
+                db.rollback()
+
+        if spooled:
+            # Saved right away, the spooled copy is only dropped once the upload is recorded
+            start_stage("upload")
+            try:
+                field.voiceFileLink = upload_file_to_b2(*spooled)
+                db.commit()
+                discard_spooled_audio(responsefieldId)
+            except Exception as e:
+                logger.error(f"Upload of the spooled voice file of field {responsefieldId} failed: {str(e)}")
+                errors.append(f"upload: {str(e)}")
+                db.rollback()
+
+        transcribed_text = field.transcribed_text
+        if "transcription" in stages and field.voiceFileLink:
+            start_stage("transcription")
+            try:
+                audio = spooled[0] if spooled else download_file_from_b2(field.voiceFileLink)
+                transcribed_text = gemini_transcribe(audio, field.voiceFileLink)
+                field.transcribed_text = transcribed_text
+            except Exception as e:
+                logger.error(f"Transcription of field {responsefieldId} failed: {str(e)}")
+                errors.append(f"transcription: {str(e)}")
+
+        text_to_analyze = transcribed_text or field.responseText
+        text_stages = [stage for stage in TEXT_STAGES if stage in stages]
+        result = {}
+        if text_to_analyze and text_stages:
+            try:
+                analyze_text(text_to_analyze, start_stage, text_stages, field.translated_text, result)
+            except Exception as e:
+                logger.error(f"Text analysis of field {responsefieldId} failed: {str(e)}")
+                errors.append(f"analysis: {str(e)}")
+            for column, value in result.items():
+                setattr(field, column, value)
+        if counted or "sentiment" in result or "language" in result:
+            record_answer_analysis(db, field.formId, field.formResponseId, field.sentiment, field.language)
+
+        try:
+            db.commit()
+            question_analytics_cache.invalidate(field.formId)
+        except Exception as e:
+            errors.append(f"save: {str(e)}")
+            db.rollback()
+            if counted:
+                # Nothing was saved, the stored results are counted again
+                try:
+                    record_answer_analysis(db, field.formId, field.formResponseId, *counted)
+                    db.commit()
+                except Exception as e:
+                    logger.error(f"Could not count field {responsefieldId} again: {str(e)}")
+                    db.rollback()
+
+        if "analytics" in stages and transcribed_text:
+            start_stage("analytics")
+            try:
+                update_form_analytics(db, field.formId, transcribed_text, field.sentiment)
+            except Exception as e:
+                logger.error(f"Analytics of field {responsefieldId} failed: {str(e)}")
+                errors.append(f"analytics: {str(e)}")
+                db.rollback()
+
+        if errors:
+            report_error("; ".join(errors))
+            update_processing_status(db, field, FAILED, error="; ".join(errors))
+        else:
+            update_processing_status(db, field, DONE)
+        return not errors
+    finally:
+        with _reprocessing_lock:
+            _reprocessing.discard(responsefieldId)
+        if lease_key:
+            field_leases.release(lease_key)
+        db.close()
+
+
+def release_reprocessing(db_session_factory) -> int:
+    """
+    Mark the fields this process is reprocessing as interrupted, when it is stopped
+
+    A field whose task still finishes afterwards ends up done or failed as usual.
+
+    Returns:
+        Number of fields released
+    """
+    with _reprocessing_lock:
+        field_ids = list(_reprocessing)
+    if not field_ids:
+        return 0
+    db = db_session_factory()
+    try:
+        released = db.execute(
+            update(FormResponseField)
+            .where(
+                FormResponseField.responsefieldId.in_(field_ids),
+                FormResponseField.processing_status.in_([QUEUED, RUNNING]),
+            )
+            .values(processing_status=INTERRUPTED, processing_error=REPROCESSING_INTERRUPTED, processing_lease_expires_at=None)
+        ).rowcount
+        db.commit()
+        return released
+    finally:
+        db.close()
+
+
+def reclaim_abandoned(db_session_factory) -> int:
+    """
+    Mark queued or running fields whose lease ran out as interrupted
+
+    Their process stopped without releasing them (killed, out of memory), so
+    resume_interrupted can pick them up like fields a shutdown interrupted. A
+    field resumed after a shutdown keeps the error telling where it was first
+    interrupted. Answers of a batch run are released like when their batch
+    fails: failed if they are counted in the rollups, interrupted as before the
+    claim otherwise.
+
+    Returns:
+        Number of fields reclaimed
+    """
+    in_batch = FormResponseField.processing_stage == BATCH_STAGE
+    db = db_session_factory()
+    try:
+        reclaimed = db.execute(
+            update(FormResponseField)
+            .where(
+                FormResponseField.processing_status.in_([QUEUED, RUNNING]),
+                FormResponseField.processing_lease_expires_at < datetime.utcnow(),
+            )
+            .values(
+                processing_status=case((and_(in_batch, FormResponseField.processing_error.is_(None)), FAILED), else_=INTERRUPTED),
+                processing_stage=case((in_batch, null()), else_=FormResponseField.processing_stage),
+                processing_error=func.coalesce(
+                    FormResponseField.processing_error,
+                    case((in_batch, BATCH_ABANDONED), else_=ABANDONED_INTERRUPTED),
+                ),
+                processing_lease_expires_at=None,
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+    finally:
+        db.close()
+    if reclaimed:
+        logger.warning(f"Reclaimed {reclaimed} fields whose process stopped without releasing them")
+    return reclaimed
+
+
+def resume_interrupted(db_session_factory, stages: List[str] = REPROCESS_STAGES) -> int:
+    """
+    Queue the fields a shutdown or a stopped process left interrupted for processing
+
+    Fields are claimed by moving them back to queued in one UPDATE, so when several
+    workers run this at once each field is resumed by one of them. They run in the
+    scheduler's backfill lane, behind the answers of live respondents. Transcription
+    and analytics only run for fields with a voice file, like on submission.
+
+    Processing resumes from the recorded stage: results are only saved together,
+    so a field interrupted before the analytics stage is processed again from the
+    start, and one interrupted in it is only marked done, since its results and
+    rollups were saved and its analytics merge may have been committed as well.
+    Fields interrupted while reprocessing are not merged into the analytics again,
+    nor are abandoned fields whose transcript was already saved.
+
+    Returns:
+        Number of fields queued
+    """
+    db = db_session_factory()
+    try:
+        finished = db.execute(
+            update(FormResponseField)
+            .where(FormResponseField.processing_status == INTERRUPTED, FormResponseField.processing_stage == "analytics")
+            .values(processing_status=DONE, processing_stage=None, processing_progress=100, processing_error=None)
+        ).rowcount
+        # The error tells where a field was interrupted, it is cleared once processing starts.
+        # Voice files in another instance's spool can only be uploaded by that instance
+        claimed = db.execute(
+            update(FormResponseField)
+            .where(
+                FormResponseField.processing_status == INTERRUPTED,
+                or_(
+                    func.coalesce(FormResponseField.processing_error, "") != AUDIO_SPOOLED,
+                    FormResponseField.responsefieldId.in_(spooled_field_ids()),
+                ),
+            )
+            .values(processing_status=QUEUED, processing_progress=0, processing_lease_expires_at=lease_expiry())
+            .returning(
+                FormResponseField.responsefieldId,
+                FormResponseField.formId,
+                FormResponseField.formResponseId,
+                FormResponseField.formfeildId,
+                FormResponseField.user_id,
+                FormResponseField.processing_error,
+                FormResponseField.transcribed_text.isnot(None),
+            )
+        ).all()
+        db.commit()
+    finally:
+        db.close()
+
+    if finished:
+        logger.info(f"Marked {finished} fields interrupted during the analytics stage as done")
+    if claimed:
+        logger.info(f"Resuming {len(claimed)} interrupted fields")
+    queued = 0
+    for field_id, form_id, form_response_id, form_field_id, user_id, error, transcribed in claimed:
+        key = (form_id, form_response_id, form_field_id)
+        field_leases.hold(key)
+        field_stages = stages
+        if error == REPROCESSING_INTERRUPTED or (error == ABANDONED_INTERRUPTED and transcribed):
+            field_stages = [stage for stage in stages if stage != "analytics"]
+        queued += background_manager.submit(
+            f"resume_field_{field_id}",
+            reprocess_field,
+            field_id,
+            db_session_factory,
+            field_stages,
+            claimed=True,
+            tenant=user_id,
+            lane=LANE_BACKFILL,
+            form_id=form_id,
+            on_interrupt=partial(_release_claimed, db_session_factory, field_id, key, error or SHUTDOWN_INTERRUPTED),
+        )
+    return queued
+
+
+def resume_unfinished(db_session_factory, stages: List[str] = REPROCESS_STAGES) -> int:
+    """Reclaim abandoned fields and resume every interrupted one, run periodically by each worker"""
+    reclaim_abandoned(db_session_factory)
+    return resume_interrupted(db_session_factory, stages)
+
+
+def _release_claimed(db_session_factory, field_id: int, key, error: str, started: bool):
+    """Mark a claimed field that shutdown cut off as interrupted again, keeping where it was first interrupted"""
+    db = db_session_factory()
+    try:
+        db.execute(
+            update(FormResponseField)
+            .where(
+                FormResponseField.responsefieldId == field_id,
+                FormResponseField.processing_status.in_([QUEUED, RUNNING]),
+            )
+            .values(processing_status=INTERRUPTED, processing_error=error, processing_lease_expires_at=None)
+        )
+        db.commit()
+    finally:
+        db.close()
+        field_leases.release(key)
@@ -0,0 +1,244 @@
+import os
+import asyncio
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import tuple_, update
+from sqlalchemy.orm import Session
+
+from models.form_response_field import FormResponseField
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+# Left unfinished by a shutdown or a stopped process, picked up again by resume_interrupted or reprocess.py
+INTERRUPTED = "interrupted"
+
+TERMINAL_STATUSES = {DONE, FAILED}
+# Statuses reprocessing may queue a field from
+REQUEUEABLE_STATUSES = TERMINAL_STATUSES | {INTERRUPTED}
+
+# Allowed processing_status transitions; done/failed/interrupted can be queued again for reprocessing.
+# A stopping process marks its unfinished fields interrupted while their tasks may still finish them
+STATUS_TRANSITIONS = {
+    QUEUED: {RUNNING, DONE, FAILED, INTERRUPTED},
+    RUNNING: {RUNNING, DONE, FAILED, INTERRUPTED},
+    DONE: {QUEUED},
+    FAILED: {QUEUED},
+    INTERRUPTED: {QUEUED, RUNNING, DONE, FAILED},
+}
+
+# Pipeline stages in execution order, processing_progress is the share of them finished
+PROCESSING_STAGES = ["upload", "transcription", "translation", "sentiment", "categories", "analytics"]
+# Stage of the answers reprocess.py --batch has claimed, they wait on a provider batch
+BATCH_STAGE = "batch"
+
+# Seconds a queued or running field stays claimed without its process renewing the lease;
+# reclaim_abandoned hands fields whose lease ran out to another worker
+PROCESSING_LEASE_SECONDS = float(os.getenv("PROCESSING_LEASE_SECONDS", "300"))
+# How often a process renews the leases of the fields it holds, well below PROCESSING_LEASE_SECONDS
+PROCESSING_LEASE_RENEW_SECONDS = float(os.getenv("PROCESSING_LEASE_RENEW_SECONDS", "60"))
+# Fields whose leases are renewed per UPDATE
+LEASE_RENEW_CHUNK_SIZE = 1000
+
+
+class InvalidStatusTransition(ValueError):
+    pass
+
+
+def field_status_event(field) -> Dict[str, Any]:
+    """Status payload of a FormResponseField as pushed to clients"""
+    return {
+        "responsefieldId": field.responsefieldId,
+        "formResponseId": field.formResponseId,
+        "formfeildId": field.formfeildId,
+        "processing_status": field.processing_status,
+        "processing_stage": field.processing_stage,
+        "processing_progress": field.processing_progress,
+        "processing_error": field.processing_error,
+    }
+
+
+class ProcessingEventBroker:
+    """
+    In-process fan-out of field status changes to SSE subscribers
+
+    Publishers are background threads, subscribers are asyncio queues on the
+    event loop, so events are handed over with call_soon_threadsafe. Only
+    subscribers in the same process are reached; the SSE endpoint re-reads
+    the database periodically to pick up changes made by other workers.
+    """
+
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self._subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, form_response_id: int) -> asyncio.Queue:
+        """Register a queue for a response's events, must be called from the event loop"""
+        queue = asyncio.Queue(maxsize=self.max_queue_size)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.setdefault(form_response_id, set()).add((loop, queue))
+        return queue
+
+    def unsubscribe(self, form_response_id: int, queue: asyncio.Queue):
+        with self._lock:
+            subscribers = self._subscribers.get(form_response_id)
+            if not subscribers:
+                return
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                del self._subscribers[form_response_id]
+
+    def publish(self, form_response_id: int, event: Dict[str, Any]):
+        """Push an event to every subscriber of the response, safe to call from any thread"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(form_response_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, event)
+            except RuntimeError:
+                # Loop already closed, the subscriber is gone
+                self.unsubscribe(form_response_id, queue)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Dict[str, Any]):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client, it will catch up from the next database snapshot
+            pass
+
+
+processing_events = ProcessingEventBroker()
+
+
+def update_processing_status(
+    db: Session,
+    field,
+    status: str,
+    stage: Optional[str] = None,
+    error: Optional[str] = None,
+    commit: bool = True
+):
+    """
+    Move a FormResponseField through the processing state machine and notify subscribers
+
+    Args:
+        db: Database session the field belongs to
+        field: FormResponseField to update
+        status: New processing status
+        stage: Pipeline stage now running (for "running"), progress is derived from it
+        error: Error description (for "failed")
+        commit: Commit the change immediately
+
+    Raises:
+        InvalidStatusTransition: If the state machine does not allow the change
+    """
+    current = field.processing_status or QUEUED
+    if status != current and status not in STATUS_TRANSITIONS.get(current, set()):
+        raise InvalidStatusTransition(f"Cannot move field {field.responsefieldId} from {current} to {status}")
+
+    field.processing_status = status
+    if status == RUNNING:
+        field.processing_stage = stage
+        field.processing_progress = round(100 * PROCESSING_STAGES.index(stage) / len(PROCESSING_STAGES)) if stage in PROCESSING_STAGES else field.processing_progress
+    elif status == DONE:
+        field.processing_stage = None
+        field.processing_progress = 100
+        field.processing_error = None
+    elif status == QUEUED:
+        field.processing_stage = None
+        field.processing_progress = 0
+        field.processing_error = None
+    if error is not None:
+        field.processing_error = error
+    # Every change of a field still being processed extends its lease
+    field.processing_lease_expires_at = lease_expiry() if status in (QUEUED, RUNNING) else None
+
+    if commit:
+        # Build the event first, committing expires the field's attributes
+        event = field_status_event(field)
+        db.commit()
+        processing_events.publish(field.formResponseId, event)
+
+
+def status_snapshot(fields: List) -> List[Dict[str, Any]]:
+    return [field_status_event(field) for field in fields]
+
+
+def lease_expiry() -> datetime:
+    """Lease end of a field claimed or renewed now"""
+    return datetime.utcnow() + timedelta(seconds=PROCESSING_LEASE_SECONDS)
+
+
+class FieldLeases:
+    """
+    Fields this process has queued or running, by (formId, formResponseId, formfeildId)
+
+    The leases of the held fields are renewed periodically, so only the fields of a
+    process that stopped without releasing them (killed, out of memory) expire and
+    are reclaimed. Keys include the partition key, renewals only touch the
+    partitions of the held fields.
+    """
+
+    def __init__(self):
+        self._held: Set[Tuple[int, int, int]] = set()
+        self._lock = threading.Lock()
+
+    def hold(self, *keys: Tuple[int, int, int]):
+        with self._lock:
+            self._held.update(keys)
+
+    def release(self, *keys: Tuple[int, int, int]):
+        with self._lock:
+            self._held.difference_update(keys)
+
+    def held(self) -> int:
+        with self._lock:
+            return len(self._held)
+
+    def renew(self, db_session_factory) -> int:
+        """
+        Extend the leases of the held fields that are still queued or running
+
+        Returns:
+            Number of fields renewed
+        """
+        with self._lock:
+            keys = list(self._held)
+        if not keys:
+            return 0
+        expires_at = lease_expiry()
+        renewed = 0
+        db = db_session_factory()
+        try:
+            for start in range(0, len(keys), LEASE_RENEW_CHUNK_SIZE):
+                renewed += db.execute(
+                    update(FormResponseField)
+                    .where(
+                        tuple_(
+                            FormResponseField.formId,
+                            FormResponseField.formResponseId,
+                            FormResponseField.formfeildId,
+                        ).in_(keys[start:start + LEASE_RENEW_CHUNK_SIZE]),
+                        FormResponseField.processing_status.in_([QUEUED, RUNNING]),
+                    )
+                    .values(processing_lease_expires_at=expires_at)
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+            db.commit()
+        finally:
+            db.close()
+        return renewed
+
+
+field_leases = FieldLeases()
@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+from models.form import Form
+from utils.archival import response_models
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Entries are invalidated by submissions and finished processing in this process; the TTL
+# bounds how long other worker processes can serve a stale breakdown
+QUESTION_ANALYTICS_TTL_SECONDS = float(os.getenv("QUESTION_ANALYTICS_TTL_SECONDS", "300"))
+QUESTION_ANALYTICS_MAX_ENTRIES = int(os.getenv("QUESTION_ANALYTICS_MAX_ENTRIES", "256"))
+
+SENTIMENTS = ("positive", "negative", "neutral")
+RESPONSE_TIME_PERCENTILES = (0.5, 0.9, 0.95)
+
+
+def _percentile_label(fraction: float) -> str:
+    return f"p{int(fraction * 100)}"
+
+
+def _seconds(value) -> Optional[float]:
+    return round(float(value), 2) if value is not None else None
+
+
+def compute_question_analytics(db: Session, form: Form) -> Dict[str, Any]:
+    """
+    Per-question answer counts, sentiment, language mix and response-time percentiles of a form
+
+    Answers of completed responses are aggregated by PostgreSQL in a single query. Grouping sets
+    return one row per question plus one row per question and language, so the language mix
+    does not need a second scan.
+
+    Args:
+        db: Database session
+        form: Form with its fields loaded
+
+    Returns:
+        Dict with completed_responses and a questions list in question order
+    """
+    Response, Answer = response_models(form)
+
+    completed_responses = db.scalar(
+        select(func.count()).select_from(Response).where(Response.formId == form.id, Response.status == "completed")
+    ) or 0
+
+    language_rolled_up = func.grouping(Answer.language)
+    rows = db.execute(
+        select(
+            Answer.formfeildId,
+            Answer.language,
+            language_rolled_up.label("language_rolled_up"),
+            func.count().label("answers"),
+            *(func.count().filter(Answer.sentiment == sentiment).label(sentiment) for sentiment in SENTIMENTS),
+            func.count(Answer.response_time).label("timed"),
+            func.avg(Answer.response_time).label("avg_response_time"),
+            *(
+                func.percentile_cont(fraction).within_group(Answer.response_time).label(_percentile_label(fraction))
+                for fraction in RESPONSE_TIME_PERCENTILES
+            ),
+        )
+        .join(
+            Response,
+            (Response.responseId == Answer.formResponseId) & (Response.formId == Answer.formId),
+        )
+        .where(Answer.formId == form.id, Response.status == "completed")
+        .group_by(func.grouping_sets(tuple_(Answer.formfeildId), tuple_(Answer.formfeildId, Answer.language)))
+    ).all()
+
+    by_question: Dict[int, Dict[str, Any]] = {}
+    languages: Dict[int, Dict[str, int]] = {}
+    for row in rows:
+        # Rows of the (question, language) grouping set carry the language mix
+        if not row.language_rolled_up:
+            languages.setdefault(row.formfeildId, {})[row.language or "unknown"] = row.answers
+            continue
+        by_question[row.formfeildId] = {
+            "answers": row.answers,
+            "sentiment": {sentiment: getattr(row, sentiment) for sentiment in SENTIMENTS},
+            "response_time": {
+                "answers": row.timed,
+                "avg": _seconds(row.avg_response_time),
+                **{
+                    _percentile_label(fraction): _seconds(getattr(row, _percentile_label(fraction)))
+                    for fraction in RESPONSE_TIME_PERCENTILES
+                },
+            },
+        }
+
+    questions: List[Dict[str, Any]] = []
+    for field in sorted(form.fields, key=lambda f: f.question_number):
+        stats = by_question.get(field.id) or {
+            "answers": 0,
+            "sentiment": {sentiment: 0 for sentiment in SENTIMENTS},
+            "response_time": {
+                "answers": 0, "avg": None,
+                **{_percentile_label(fraction): None for fraction in RESPONSE_TIME_PERCENTILES},
+            },
+        }
+        answers = stats["answers"]
+        questions.append({
+            "question_id": field.id,
+            "question_number": field.question_number,
+            "question_text": field.question,
+            "answers": answers,
+            "percentage": round(answers / completed_responses * 100, 2) if completed_responses else 0,
+            "sentiment": stats["sentiment"],
+            "languages": dict(sorted(languages.get(field.id, {}).items(), key=lambda item: -item[1])),
+            "response_time": stats["response_time"],
+        })
+
+    return {"form_id": form.id, "completed_responses": completed_responses, "questions": questions}
+
+
+class QuestionAnalyticsCache:
+    """
+    LRU cache of per-question breakdowns keyed by form id
+
+    A breakdown whose form was invalidated while it was being computed is returned
+    but not stored, so a slow query racing a submission cannot cache stale data.
+    Misses are computed on the primary: a lagging replica read right after the
+    invalidation of a submission would be cached for the whole TTL.
+    """
+
+    def __init__(self, max_entries: int = QUESTION_ANALYTICS_MAX_ENTRIES, ttl_seconds: float = QUESTION_ANALYTICS_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Computations in flight per form, and the forms invalidated during one
+        self._computing: Dict[int, int] = {}
+        self._stale: Set[int] = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, form: Form, db_session_factory) -> Dict[str, Any]:
+        """
+        Cached breakdown of a form, computed on a miss
+
+        Args:
+            form: Form with its fields loaded, from any session
+            db_session_factory: Factory of primary database sessions, only used on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(form.id)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(form.id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            self._computing[form.id] = self._computing.get(form.id, 0) + 1
+
+        started = time.perf_counter()
+        breakdown = None
+        db = db_session_factory()
+        try:
+            breakdown = compute_question_analytics(db, form)
+            logger.info(f"Computed question analytics of form {form.id} in {time.perf_counter() - started:.3f}s")
+        finally:
+            db.close()
+            with self._lock:
+                if breakdown is not None and form.id not in self._stale:
+                    self._entries[form.id] = (time.monotonic() + self.ttl_seconds, breakdown)
+                    self._entries.move_to_end(form.id)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                self._computing[form.id] -= 1
+                if not self._computing[form.id]:
+                    del self._computing[form.id]
+                    self._stale.discard(form.id)
+        return breakdown
+
+    def invalidate(self, form_id: int):
+        """Drop a form's breakdown after a submission or a processed answer changed it"""
+        with self._lock:
+            self._entries.pop(form_id, None)
+            if form_id in self._computing:
+                self._stale.add(form_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stale.update(self._computing)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+question_analytics_cache = QuestionAnalyticsCache()
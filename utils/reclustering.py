@@ -0,0 +1,202 @@
+import os
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, List
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.form_analytics import FormAnalytics
+from models.form_response_field import FormResponseField
+from utils.analytics import name_category_cluster, calculate_category_percentages
+from utils.background_tasks import report_error
+from utils.category_index import get_category_index, invalidate_category_index
+from utils.clustering import (
+    assign_to_centroids,
+    choose_cluster_count,
+    kmeans,
+    merge_similar_clusters,
+    representative_indices,
+)
+from utils.embeddings import embed_texts
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RECLUSTER_MAX_CLUSTERS = int(os.getenv("RECLUSTER_MAX_CLUSTERS", "40"))
+# Clusters whose centroids are closer than this are merged into one category
+RECLUSTER_MERGE_THRESHOLD = float(os.getenv("RECLUSTER_MERGE_THRESHOLD", "0.85"))
+# Clusters are fitted on at most this many responses, the rest are assigned to the fitted centroids
+RECLUSTER_SAMPLE_SIZE = int(os.getenv("RECLUSTER_SAMPLE_SIZE", "20000"))
+RECLUSTER_CHUNK_SIZE = 1000
+RECLUSTER_SAMPLES_PER_CLUSTER = 8
+
+
+def _analyzed_text_query(db: Session, form_id: int):
+    """Responses that feed form analytics: voice answers, in English where a translation exists"""
+    return db.query(
+        FormResponseField.responsefieldId,
+        func.coalesce(FormResponseField.translated_text, FormResponseField.transcribed_text),
+    ).filter(
+        FormResponseField.formId == form_id,
+        FormResponseField.transcribed_text.isnot(None),
+        FormResponseField.transcribed_text != "",
+    ).order_by(FormResponseField.responsefieldId)
+
+
+def recluster_form(db: Session, form_id: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    Rebuild a form's categories from scratch by clustering its response embeddings
+
+    The LLM is called once per cluster to name it, instead of once per response,
+    and the form's analytics are replaced in a single transaction.
+
+    Args:
+        db: Database session
+        form_id: ID of the form
+        seed: Random seed for sampling and k-means
+
+    Returns:
+        Summary with the number of responses, clusters and LLM calls, and the job status
+    """
+    started = time.perf_counter()
+    summary = {"form_id": form_id, "responses": 0, "clusters": 0, "llm_calls": 0, "status": "skipped"}
+
+    ids = [row[0] for row in _analyzed_text_query(db, form_id).with_entities(FormResponseField.responsefieldId)]
+    summary["responses"] = len(ids)
+    if not ids:
+        return summary
+
+    rng = np.random.default_rng(seed)
+    if len(ids) > RECLUSTER_SAMPLE_SIZE:
+        sample_ids = set(rng.choice(ids, size=RECLUSTER_SAMPLE_SIZE, replace=False).tolist())
+    else:
+        sample_ids = set(ids)
+
+    sample_texts = [
+        text for field_id, text in _analyzed_text_query(db, form_id).yield_per(RECLUSTER_CHUNK_SIZE)
+        if field_id in sample_ids
+    ]
+    sample_vectors = embed_texts(sample_texts)
+    if sample_vectors is None:
+        summary["status"] = "failed"
+        return summary
+
+    k = choose_cluster_count(len(sample_texts), RECLUSTER_MAX_CLUSTERS)
+    labels, centroids = kmeans(sample_vectors, k, seed=seed)
+    sizes = np.bincount(labels, minlength=len(centroids))
+    mapping, centroids, _ = merge_similar_clusters(centroids, sizes, RECLUSTER_MERGE_THRESHOLD)
+    labels = mapping[labels]
+
+    # Name every cluster from its most typical responses
+    names = []
+    clusters = []
+    for cluster, centroid in enumerate(centroids):
+        members = np.flatnonzero(labels == cluster)
+        if not len(members):
+            clusters.append(None)
+            continue
+        top = members[representative_indices(sample_vectors[members], centroid, RECLUSTER_SAMPLES_PER_CLUSTER)]
+        named = name_category_cluster([sample_texts[i] for i in top], names)
+        summary["llm_calls"] += 1
+        if not named:
+            summary["status"] = "failed"
+            return summary
+        names.append(named["category_name"])
+        clusters.append(named)
+
+    # Responses outside the sample are assigned to the fitted centroids chunk by chunk
+    counts = np.bincount(labels, minlength=len(centroids))
+    pending = []
+    for field_id, text in _analyzed_text_query(db, form_id).yield_per(RECLUSTER_CHUNK_SIZE):
+        if field_id in sample_ids:
+            continue
+        pending.append(text)
+        if len(pending) == RECLUSTER_CHUNK_SIZE:
+            vectors = embed_texts(pending)
+            if vectors is None:
+                summary["status"] = "failed"
+                return summary
+            counts += np.bincount(assign_to_centroids(vectors, centroids), minlength=len(centroids))
+            pending = []
+    if pending:
+        vectors = embed_texts(pending)
+        if vectors is None:
+            summary["status"] = "failed"
+            return summary
+        counts += np.bincount(assign_to_centroids(vectors, centroids), minlength=len(centroids))
+
+    # Clusters the LLM gave the same name are folded into one category
+    categories_by_name: Dict[str, Dict] = {}
+    centroid_sums: Dict[str, np.ndarray] = {}
+    for cluster, named in enumerate(clusters):
+        if named is None or not counts[cluster]:
+            continue
+        name = named["category_name"]
+        category = categories_by_name.setdefault(name, {**named, "response_count": 0, "percentage": 0.0})
+        category["response_count"] += int(counts[cluster])
+        centroid_sums[name] = centroid_sums.get(name, 0) + centroids[cluster] * counts[cluster]
+
+    categories: List[Dict] = sorted(categories_by_name.values(), key=lambda cat: -cat["response_count"])
+    total_responses = sum(cat["response_count"] for cat in categories)
+    categories = calculate_category_percentages(categories, total_responses)
+
+    try:
+        analytics = db.query(FormAnalytics).filter(
+            FormAnalytics.formId == form_id,
+            FormAnalytics.status == "active"
+        ).with_for_update().first()
+        if analytics:
+            analytics.response_categories = categories
+            analytics.total_responses = total_responses
+            analytics.update_timestamp = datetime.utcnow()
+        else:
+            db.add(FormAnalytics(
+                formId=form_id,
+                response_categories=categories,
+                total_responses=total_responses,
+                status="active"
+            ))
+        db.commit()
+    except Exception as e:
+        logger.error(f"Failed to save reclustered analytics for form {form_id}: {str(e)}")
+        db.rollback()
+        summary["status"] = "failed"
+        return summary
+
+    # The fitted centroids become the form's category index, no re-embedding needed
+    invalidate_category_index(form_id)
+    seeds = {name: vector / (np.linalg.norm(vector) or 1.0) for name, vector in centroid_sums.items()}
+    get_category_index(form_id, categories, centroids.shape[1], seed_vectors=seeds)
+
+    summary.update({
+        "clusters": len(categories),
+        "status": "completed",
+        "duration_seconds": round(time.perf_counter() - started, 2),
+    })
+    logger.info(f"Reclustered form {form_id}: {summary}")
+    return summary
+
+
+def run_recluster_job(form_id: int, db_session_factory) -> Dict[str, Any]:
+    """Recluster one form with its own database session, for background tasks and the CLI"""
+    db = db_session_factory()
+    try:
+        summary = recluster_form(db, form_id)
+    finally:
+        db.close()
+    if summary["status"] == "failed":
+        report_error(f"reclustering of form {form_id} failed, see the logs")
+    return summary
+
+
+def forms_with_analytics(db: Session) -> List[int]:
+    """IDs of forms that have active analytics and therefore categories to rebuild"""
+    return [
+        row[0] for row in db.query(FormAnalytics.formId).filter(
+            FormAnalytics.status == "active"
+        ).distinct().order_by(FormAnalytics.formId)
+    ]
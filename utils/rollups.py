@@ -0,0 +1,346 @@
+import os
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import TIMESTAMP, delete, func, insert, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models.form import Form
+from models.form_response import FormResponse
+from models.form_rollup import FormRollup, FormRollupCount
+from utils.archival import response_models
+from utils.processing_status import TERMINAL_STATUSES
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ROLLUP_GRANULARITIES = ["hour", "day"]
+ROLLUP_DIMENSIONS = ["sentiment", "language"]
+# Hourly buckets older than this are dropped by the compaction job, the daily ones are kept
+ROLLUP_HOURLY_RETENTION_DAYS = float(os.getenv("ROLLUP_HOURLY_RETENTION_DAYS", "14"))
+# Largest number of buckets a trends request may span
+ROLLUP_MAX_BUCKETS = int(os.getenv("ROLLUP_MAX_BUCKETS", "1000"))
+# Range returned when the trends request does not give one
+DEFAULT_TREND_RANGES = {"hour": timedelta(hours=48), "day": timedelta(days=90)}
+BUCKET_SIZES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+COUNTER_COLUMNS = ["submitted", "completed", "answers", "response_time_sum", "response_time_count"]
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    """Start of the hour or day containing a timestamp"""
+    if granularity == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _execute_in_savepoint(db: Session, statement) -> bool:
+    """Run a rollup upsert, a failure is logged and leaves the caller's transaction usable"""
+    try:
+        with db.begin_nested():
+            db.execute(statement)
+        return True
+    except Exception as e:
+        logger.error(f"Rollup update failed: {str(e)}")
+        return False
+
+
+def record_responses(
+    db: Session,
+    form_id: int,
+    at: datetime,
+    submitted: int = 0,
+    completed: int = 0,
+    response_times: Iterable[Optional[float]] = ()
+) -> bool:
+    """
+    Add to the counters of the hour and day containing `at`, in the caller's transaction
+
+    Args:
+        db: Session of the request or task that caused the change, committed by the caller
+        form_id: Form the responses belong to
+        at: Bucket timestamp; the response's created_at, or its submitTimestamp for completions
+        submitted: Responses started
+        completed: Responses submitted in full
+        response_times: Response time of each answer added (None for answers without one)
+
+    Returns:
+        False if the update failed (logged), the caller's changes are unaffected
+    """
+    response_times = list(response_times)
+    timed = [value for value in response_times if value is not None]
+    counters = {
+        "submitted": submitted,
+        "completed": completed,
+        "answers": len(response_times),
+        "response_time_sum": float(sum(timed)),
+        "response_time_count": len(timed),
+    }
+    if not any(counters.values()):
+        return True
+
+    # Same row order in every writer, concurrent upserts of one bucket cannot deadlock
+    statement = pg_insert(FormRollup).values([
+        {"formId": form_id, "granularity": granularity, "bucket_start": bucket_start(at, granularity), **counters}
+        for granularity in ROLLUP_GRANULARITIES
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=["formId", "granularity", "bucket_start"],
+        set_={column: FormRollup.__table__.c[column] + statement.excluded[column] for column in COUNTER_COLUMNS},
+    )
+    return _execute_in_savepoint(db, statement)
+
+
+def record_answer_analysis(
+    db: Session,
+    form_id: int,
+    form_response_id: int,
+    sentiment: Optional[str],
+    language: Optional[str],
+    previous: Optional[Tuple[Optional[str], Optional[str]]] = None
+) -> bool:
+    """
+    Count a processed answer's sentiment and language, in the caller's transaction
+
+    Args:
+        db: Session of the processing task, committed by the caller
+        form_id: Form the answer belongs to
+        form_response_id: Response of the answer, its created_at selects the bucket
+        sentiment: Sentiment stored for the answer
+        language: Language stored for the answer
+        previous: (sentiment, language) counted for the answer before, when it is reprocessed
+
+    Returns:
+        False if the update failed (logged), the caller's changes are unaffected
+    """
+    deltas = defaultdict(int)
+    for dimension, value in zip(ROLLUP_DIMENSIONS, (sentiment, language)):
+        if value:
+            deltas[(dimension, value)] += 1
+    if previous:
+        for dimension, value in zip(ROLLUP_DIMENSIONS, previous):
+            if value:
+                deltas[(dimension, value)] -= 1
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return True
+
+    created_at = db.scalar(
+        select(FormResponse.created_at)
+        .where(FormResponse.responseId == form_response_id, FormResponse.formId == form_id)
+    )
+    if created_at is None:
+        return False
+
+    statement = pg_insert(FormRollupCount).values([
+        {
+            "formId": form_id,
+            "granularity": granularity,
+            "bucket_start": bucket_start(created_at, granularity),
+            "dimension": dimension,
+            "value": value,
+            "count": delta,
+        }
+        for granularity in ROLLUP_GRANULARITIES
+        for (dimension, value), delta in sorted(deltas.items())
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=["formId", "granularity", "bucket_start", "dimension", "value"],
+        set_={"count": FormRollupCount.count + statement.excluded.count},
+    )
+    return _execute_in_savepoint(db, statement)
+
+
+def compact_rollups(db: Session, now: Optional[datetime] = None,
+                    retention_days: float = ROLLUP_HOURLY_RETENTION_DAYS) -> int:
+    """
+    Drop hourly buckets older than the retention window
+
+    The daily buckets are maintained alongside the hourly ones, so nothing is
+    lost at daily resolution.
+
+    Returns:
+        Number of rollup rows deleted
+    """
+    cutoff = bucket_start((now or datetime.utcnow()) - timedelta(days=retention_days), "day")
+    deleted = 0
+    for model in (FormRollup, FormRollupCount):
+        deleted += db.execute(
+            delete(model).where(model.granularity == "hour", model.bucket_start < cutoff)
+        ).rowcount
+    db.commit()
+    return deleted
+
+
+def rebuild_rollups(db: Session, form_id: int, now: Optional[datetime] = None,
+                    retention_days: float = ROLLUP_HOURLY_RETENTION_DAYS) -> Dict[str, int]:
+    """
+    Recompute a form's rollups from its responses, for backfilling and correcting drift
+
+    Hourly buckets are only rebuilt within the retention window. Submissions
+    arriving while it runs may be counted twice or not at all, so run it for
+    quiet forms or repeat it afterwards.
+
+    Returns:
+        Number of rollup and count rows written
+    """
+    form = db.query(Form).filter(Form.id == form_id).first()
+    if not form:
+        raise ValueError(f"Form {form_id} not found")
+    Response, Answer = response_models(form)
+
+    hour_cutoff = bucket_start((now or datetime.utcnow()) - timedelta(days=retention_days), "day")
+    analyzed = [or_(Answer.responseText.isnot(None), Answer.voiceFileLink.isnot(None))]
+    if hasattr(Answer, "processing_status"):
+        analyzed.append(Answer.processing_status.in_(TERMINAL_STATUSES))
+
+    rollups = defaultdict(lambda: dict.fromkeys(COUNTER_COLUMNS, 0))
+    counts = {}
+    for granularity in ROLLUP_GRANULARITIES:
+        in_window = [Response.created_at >= hour_cutoff] if granularity == "hour" else []
+        bucket = func.date_trunc(granularity, Response.created_at, type_=TIMESTAMP).label("bucket")
+
+        for row in db.execute(
+            select(bucket, func.count()).where(Response.formId == form_id, *in_window).group_by(bucket)
+        ):
+            rollups[(granularity, row[0])]["submitted"] = row[1]
+
+        completed_bucket = func.date_trunc(granularity, Response.submitTimestamp, type_=TIMESTAMP).label("bucket")
+        completed_window = [Response.submitTimestamp >= hour_cutoff] if granularity == "hour" else []
+        for row in db.execute(
+            select(completed_bucket, func.count())
+            .where(
+                Response.formId == form_id,
+                Response.status == "completed",
+                Response.submitTimestamp.isnot(None),
+                *completed_window,
+            )
+            .group_by(completed_bucket)
+        ):
+            rollups[(granularity, row[0])]["completed"] = row[1]
+
+        for row in db.execute(
+            select(
+                bucket,
+                func.count(Answer.responsefieldId),
+                func.coalesce(func.sum(Answer.response_time), 0),
+                func.count(Answer.response_time),
+            )
+            .select_from(Answer)
+            .join(Response, (Response.responseId == Answer.formResponseId) & (Response.formId == Answer.formId))
+            .where(Answer.formId == form_id, *in_window)
+            .group_by(bucket)
+        ):
+            rollups[(granularity, row[0])].update(
+                answers=row[1], response_time_sum=float(row[2]), response_time_count=row[3]
+            )
+
+        for dimension in ROLLUP_DIMENSIONS:
+            column = getattr(Answer, dimension)
+            for row in db.execute(
+                select(bucket, column, func.count())
+                .select_from(Answer)
+                .join(Response, (Response.responseId == Answer.formResponseId) & (Response.formId == Answer.formId))
+                .where(Answer.formId == form_id, column.isnot(None), *analyzed, *in_window)
+                .group_by(bucket, column)
+            ):
+                counts[(granularity, row[0], dimension, row[1])] = row[2]
+
+    for model in (FormRollup, FormRollupCount):
+        db.execute(delete(model).where(model.formId == form_id))
+    if rollups:
+        db.execute(insert(FormRollup), [
+            {"formId": form_id, "granularity": granularity, "bucket_start": start, **counters}
+            for (granularity, start), counters in rollups.items()
+        ])
+    if counts:
+        db.execute(insert(FormRollupCount), [
+            {"formId": form_id, "granularity": granularity, "bucket_start": start,
+             "dimension": dimension, "value": value, "count": count}
+            for (granularity, start, dimension, value), count in counts.items()
+        ])
+    db.commit()
+    return {"rollups": len(rollups), "counts": len(counts)}
+
+
+def load_trends(db: Session, form_id: int, interval: str = "day",
+                since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Time series of a form's responses read from the rollups
+
+    Args:
+        db: Database session
+        form_id: Form to report on
+        interval: hour or day
+        since: First bucket to include, defaults to DEFAULT_TREND_RANGES before until
+        until: End of the range (exclusive), defaults to now
+
+    Returns:
+        Dict with one entry per bucket in the range (empty buckets included) and totals
+
+    Raises:
+        ValueError: If the range spans more than ROLLUP_MAX_BUCKETS buckets
+    """
+    until = until or datetime.utcnow()
+    since = bucket_start(since or until - DEFAULT_TREND_RANGES[interval], interval)
+    step = BUCKET_SIZES[interval]
+    if (until - since) / step > ROLLUP_MAX_BUCKETS:
+        raise ValueError(f"Range spans more than {ROLLUP_MAX_BUCKETS} {interval} buckets")
+
+    in_range = lambda model: (
+        model.formId == form_id,
+        model.granularity == interval,
+        model.bucket_start >= since,
+        model.bucket_start < until,
+    )
+    rollups = {row.bucket_start: row for row in db.execute(
+        select(FormRollup.bucket_start, *(FormRollup.__table__.c[column] for column in COUNTER_COLUMNS))
+        .where(*in_range(FormRollup))
+    )}
+    counts = defaultdict(lambda: {dimension: {} for dimension in ROLLUP_DIMENSIONS})
+    for row in db.execute(
+        select(FormRollupCount.bucket_start, FormRollupCount.dimension, FormRollupCount.value, FormRollupCount.count)
+        .where(*in_range(FormRollupCount), FormRollupCount.count != 0)
+    ):
+        counts[row.bucket_start][row.dimension][row.value] = row.count
+
+    buckets = []
+    totals = dict.fromkeys(COUNTER_COLUMNS, 0)
+    total_counts = {dimension: defaultdict(int) for dimension in ROLLUP_DIMENSIONS}
+    start = since
+    while start < until:
+        row = rollups.get(start)
+        counters = {column: getattr(row, column) if row else 0 for column in COUNTER_COLUMNS}
+        for column in COUNTER_COLUMNS:
+            totals[column] += counters[column]
+        for dimension in ROLLUP_DIMENSIONS:
+            for value, count in counts[start][dimension].items():
+                total_counts[dimension][value] += count
+        buckets.append({
+            "bucket_start": start,
+            "submitted": counters["submitted"],
+            "completed": counters["completed"],
+            "answers": counters["answers"],
+            "avg_response_time": counters["response_time_sum"] / counters["response_time_count"] if counters["response_time_count"] else None,
+            **counts[start],
+        })
+        start += step
+
+    return {
+        "form_id": form_id,
+        "interval": interval,
+        "since": since,
+        "until": until,
+        "totals": {
+            "submitted": totals["submitted"],
+            "completed": totals["completed"],
+            "answers": totals["answers"],
+            "avg_response_time": totals["response_time_sum"] / totals["response_time_count"] if totals["response_time_count"] else None,
+            **{dimension: dict(values) for dimension, values in total_counts.items()},
+        },
+        "buckets": buckets,
+    }
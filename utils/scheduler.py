@@ -0,0 +1,288 @@
+import os
+import threading
+import time
+import logging
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Threads running answer processing, keep below the database pool size
+PROCESSING_WORKERS = int(os.getenv("PROCESSING_WORKERS", "4"))
+# Jobs of one tenant (form owner) running at once while other tenants have queued work,
+# idle workers are still lent to a tenant at its cap when nobody else is waiting
+SCHEDULER_TENANT_MAX_RUNNING = int(os.getenv("SCHEDULER_TENANT_MAX_RUNNING", str(max(1, PROCESSING_WORKERS // 2))))
+# Share of the workers per tenant relative to the default of 1, as "owner_id:weight,owner_id:weight"
+SCHEDULER_TENANT_WEIGHTS = os.getenv("SCHEDULER_TENANT_WEIGHTS", "")
+# Share of the workers per lane while several lanes have queued work, as "lane:weight,lane:weight";
+# a backlog in a higher lane slows the lower ones down instead of starving them
+SCHEDULER_LANE_WEIGHTS = os.getenv("SCHEDULER_LANE_WEIGHTS", "live_text:8,live_audio:4,backfill:1")
+# Queue waits kept per lane for the wait percentiles
+SCHEDULER_WAIT_SAMPLES = int(os.getenv("SCHEDULER_WAIT_SAMPLES", "1000"))
+
+# Lanes in priority order: answers of live respondents before backfills, and text before audio;
+# a lane runs first when it is behind its share, see SCHEDULER_LANE_WEIGHTS
+LANE_LIVE_TEXT = "live_text"
+LANE_LIVE_AUDIO = "live_audio"
+LANE_BACKFILL = "backfill"
+LANES = [LANE_LIVE_TEXT, LANE_LIVE_AUDIO, LANE_BACKFILL]
+
+
+def parse_tenant_weights(value: str) -> Dict[int, float]:
+    """Parse SCHEDULER_TENANT_WEIGHTS, invalid entries are logged and skipped"""
+    weights = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        try:
+            tenant, weight = entry.split(":")
+            weights[int(tenant)] = float(weight)
+        except ValueError:
+            logger.warning(f"Ignoring invalid tenant weight: {entry}")
+    return weights
+
+
+def parse_lane_weights(value: str) -> Dict[str, float]:
+    """Parse SCHEDULER_LANE_WEIGHTS, unknown lanes and invalid or non-positive weights are logged and skipped"""
+    weights = {}
+    for entry in filter(None, (part.strip() for part in value.split(","))):
+        try:
+            lane, weight = entry.split(":")
+            weight = float(weight)
+        except ValueError:
+            weight = 0.0
+        if lane.strip() not in LANES or weight <= 0:
+            logger.warning(f"Ignoring invalid lane weight: {entry}")
+            continue
+        weights[lane.strip()] = weight
+    return weights
+
+
+class ScheduledJob:
+    __slots__ = ("tenant", "lane", "cost", "start_tag", "run", "on_drop", "enqueued_at")
+
+    def __init__(self, tenant: Hashable, lane: str, cost: float, start_tag: float,
+                 run: Callable[[], None], on_drop: Optional[Callable[[], None]]):
+        self.tenant = tenant
+        self.lane = lane
+        self.cost = cost
+        self.start_tag = start_tag
+        self.run = run
+        self.on_drop = on_drop
+        self.enqueued_at = time.monotonic()
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return round(sorted_values[index], 3)
+
+
+class FairScheduler:
+    """
+    Worker pool that shares processing fairly between tenants
+
+    Lanes share the workers by weight: the lane whose next job would finish
+    first in virtual time, advanced by cost / weight per job, runs next, ties
+    going to the earlier lane. A job arriving in a live lane runs next, and
+    while the live lanes stay busy a backfill still gets its share (1 in 13
+    jobs with the default weights) instead of waiting for them to drain.
+
+    Within a lane, tenants get start-time fair queuing: each job is tagged with
+    its tenant's virtual start time, advanced by cost / weight per job, and the
+    smallest tag runs next. A tenant with a 50k-response backlog therefore gets
+    its share of the workers instead of all of them, and a tenant submitting
+    one answer runs next.
+    Tenants at their concurrency cap are skipped while another tenant has
+    queued work; when nobody else is waiting the idle workers are lent to them,
+    and the cap applies again as their jobs end.
+    """
+
+    def __init__(
+        self,
+        workers: int = PROCESSING_WORKERS,
+        tenant_max_running: int = SCHEDULER_TENANT_MAX_RUNNING,
+        tenant_weights: Optional[Dict[Hashable, float]] = None,
+        lanes: List[str] = LANES,
+        lane_weights: Optional[Dict[str, float]] = None
+    ):
+        self.workers = workers
+        self.tenant_max_running = tenant_max_running
+        self.tenant_weights = parse_tenant_weights(SCHEDULER_TENANT_WEIGHTS) if tenant_weights is None else tenant_weights
+        self.lanes = list(lanes)
+        self.lane_weights = parse_lane_weights(SCHEDULER_LANE_WEIGHTS) if lane_weights is None else lane_weights
+        # Fair queuing between the lanes, per lane the virtual time its next job starts at
+        self._lane_virtual_time = 0.0
+        self._lane_finish: Dict[str, float] = {lane: 0.0 for lane in self.lanes}
+        self._queues: Dict[str, Dict[Hashable, deque]] = {lane: {} for lane in self.lanes}
+        self._virtual_time: Dict[str, float] = {lane: 0.0 for lane in self.lanes}
+        self._last_finish: Dict[str, Dict[Hashable, float]] = {lane: {} for lane in self.lanes}
+        self._running: Counter = Counter()
+        self._waits: Dict[str, deque] = {lane: deque(maxlen=SCHEDULER_WAIT_SAMPLES) for lane in self.lanes}
+        self._dispatched: Counter = Counter()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._lock = threading.Lock()
+        self._work = threading.Condition(self._lock)
+
+    def submit(
+        self,
+        tenant: Hashable,
+        lane: str,
+        run: Callable[[], None],
+        cost: float = 1.0,
+        on_drop: Optional[Callable[[], None]] = None
+    ) -> bool:
+        """
+        Queue a job
+
+        Args:
+            tenant: Whose work it is, fairness and the concurrency cap apply per tenant
+            lane: One of the lanes, earlier lanes run first
+            run: Called on a worker thread, exceptions are logged
+            cost: Relative size of the job, e.g. larger for long recordings
+            on_drop: Called instead of run if the scheduler stops before the job started
+
+        Returns:
+            False if the scheduler is stopping and the job was not queued
+        """
+        if lane not in self._queues:
+            raise ValueError(f"Unknown lane: {lane}")
+        with self._lock:
+            if self._stopping:
+                return False
+            weight = self.tenant_weights.get(tenant, 1.0)
+            start_tag = max(self._virtual_time[lane], self._last_finish[lane].get(tenant, 0.0))
+            self._last_finish[lane][tenant] = start_tag + cost / weight
+            if not self._queues[lane]:
+                # An idle lane does not save up its share, it starts again from the lanes' virtual time
+                self._lane_finish[lane] = max(self._lane_finish[lane], self._lane_virtual_time)
+            self._queues[lane].setdefault(tenant, deque()).append(
+                ScheduledJob(tenant, lane, cost, start_tag, run, on_drop)
+            )
+            self._start_workers()
+            self._work.notify()
+        return True
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"processing-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _next_job(self) -> Optional[ScheduledJob]:
+        """Next job among tenants under their cap, or among all tenants if none of them has queued work"""
+        return self._pick_job(enforce_cap=True) or self._pick_job(enforce_cap=False)
+
+    def _pick_job(self, enforce_cap: bool) -> Optional[ScheduledJob]:
+        """
+        Job with the smallest start tag in the lane whose next job finishes first in virtual time,
+        skipping tenants at their cap if enforce_cap
+
+        Lanes with equal finish tags go in priority order.
+        """
+        best = None
+        best_start = best_finish = None
+        for lane in self.lanes:
+            candidate = None
+            for tenant, queue in self._queues[lane].items():
+                if enforce_cap and self._running[tenant] >= self.tenant_max_running:
+                    continue
+                if candidate is None or queue[0].start_tag < candidate.start_tag:
+                    candidate = queue[0]
+            if candidate is None:
+                continue
+            start = self._lane_finish[lane]
+            finish = start + candidate.cost / self.lane_weights.get(lane, 1.0)
+            if best is None or finish < best_finish:
+                best, best_start, best_finish = candidate, start, finish
+        if best is None:
+            return None
+
+        lane = best.lane
+        self._lane_virtual_time = best_start
+        self._lane_finish[lane] = best_finish
+        queues = self._queues[lane]
+        queue = queues[best.tenant]
+        queue.popleft()
+        self._virtual_time[lane] = best.start_tag
+        if not queue:
+            del queues[best.tenant]
+        # Tenants without queued work and no tag ahead of the virtual time carry no state
+        last_finish = self._last_finish[lane]
+        for tenant in [t for t, finish in last_finish.items() if finish <= best.start_tag and t not in queues]:
+            del last_finish[tenant]
+        return best
+
+    def _worker(self):
+        while True:
+            with self._lock:
+                job = None
+                while not self._stopping:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self._work.wait()
+                if job is None:
+                    return
+                self._running[job.tenant] += 1
+                self._dispatched[job.lane] += 1
+                self._waits[job.lane].append(time.monotonic() - job.enqueued_at)
+
+            try:
+                job.run()
+            except Exception as e:
+                logger.error(f"Scheduled job of tenant {job.tenant} failed: {str(e)}")
+            finally:
+                with self._lock:
+                    self._running[job.tenant] -= 1
+                    if not self._running[job.tenant]:
+                        del self._running[job.tenant]
+                    # A tenant below its cap again may have queued work
+                    self._work.notify_all()
+
+    def stop(self) -> int:
+        """
+        Stop dispatching and drop the queued jobs, calling their on_drop
+
+        Running jobs are not waited for. Returns the number of dropped jobs.
+        """
+        with self._lock:
+            self._stopping = True
+            dropped = [job for lane in self.lanes for queue in self._queues[lane].values() for job in queue]
+            for lane in self.lanes:
+                self._queues[lane].clear()
+                self._last_finish[lane].clear()
+            self._work.notify_all()
+
+        for job in dropped:
+            if job.on_drop:
+                try:
+                    job.on_drop()
+                except Exception as e:
+                    logger.error(f"Dropping a job of tenant {job.tenant} failed: {str(e)}")
+        return len(dropped)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depths, running jobs per tenant and queue wait percentiles per lane"""
+        with self._lock:
+            lanes = {}
+            for lane in self.lanes:
+                waits = sorted(self._waits[lane])
+                lanes[lane] = {
+                    "weight": self.lane_weights.get(lane, 1.0),
+                    "queued": sum(len(queue) for queue in self._queues[lane].values()),
+                    "tenants_queued": len(self._queues[lane]),
+                    "dispatched": self._dispatched[lane],
+                    "wait_p50_seconds": percentile(waits, 0.5),
+                    "wait_p95_seconds": percentile(waits, 0.95),
+                }
+            return {
+                "workers": self.workers,
+                "busy": sum(self._running.values()),
+                "tenant_max_running": self.tenant_max_running,
+                "running_by_tenant": {str(tenant): count for tenant, count in self._running.most_common(10)},
+                "lanes": lanes,
+            }
@@ -0,0 +1,245 @@
+import json
+import math
+import os
+import re
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from utils.language_id import identify_language, is_confidently_english
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Minimum confidence for the local label to be trusted without asking Gemini
+LOCAL_SENTIMENT_CONFIDENCE = float(os.getenv("LOCAL_SENTIMENT_CONFIDENCE", "0.75"))
+# Threshold for answers of under 4 words made only of known English words ("good", "It was fine"),
+# one lexicon word never accumulates the evidence of a sentence but there is no other context to flip it
+LOCAL_SENTIMENT_SHORT_CONFIDENCE = float(os.getenv("LOCAL_SENTIMENT_SHORT_CONFIDENCE", "0.6"))
+# Optional JSON file ({"word": weight, ...}) merged over the built-in lexicon
+SENTIMENT_LEXICON_PATH = os.getenv("SENTIMENT_LEXICON_PATH")
+
+SENTIMENT_LABELS = ("positive", "negative", "neutral")
+
+_POSITIVE_WORDS = {
+    "good": 1.0, "great": 1.5, "excellent": 2.0, "amazing": 2.0, "awesome": 2.0,
+    "love": 1.8, "loved": 1.8, "loving": 1.5, "like": 0.6, "liked": 0.8, "enjoy": 1.2,
+    "enjoyed": 1.2, "happy": 1.4, "glad": 1.0, "pleased": 1.2, "satisfied": 1.2,
+    "nice": 1.0, "fantastic": 2.0, "wonderful": 2.0, "perfect": 1.8, "best": 1.5,
+    "better": 0.7, "helpful": 1.2, "friendly": 1.2, "easy": 0.9, "fast": 0.8,
+    "quick": 0.8, "smooth": 0.9, "clean": 0.7, "recommend": 1.4, "recommended": 1.4,
+    "impressed": 1.5, "impressive": 1.5, "beautiful": 1.5, "convenient": 1.0,
+    "reliable": 1.1, "useful": 1.0, "thanks": 0.8, "thank": 0.8, "fine": 0.4,
+    "positive": 1.0, "delighted": 1.8, "superb": 2.0, "brilliant": 1.8, "fun": 1.0,
+    "comfortable": 1.0, "affordable": 0.9, "polite": 1.0, "professional": 0.9,
+    "efficient": 1.0, "intuitive": 1.0, "outstanding": 2.0, "exceeded": 1.5,
+}
+
+_NEGATIVE_WORDS = {
+    "bad": 1.2, "terrible": 2.0, "awful": 2.0, "horrible": 2.0, "poor": 1.3,
+    "worst": 2.0, "worse": 1.2, "hate": 1.8, "hated": 1.8, "dislike": 1.2,
+    "disappointed": 1.6, "disappointing": 1.6, "unhappy": 1.5, "angry": 1.6,
+    "annoyed": 1.3, "annoying": 1.3, "frustrated": 1.5, "frustrating": 1.5,
+    "slow": 0.9, "broken": 1.4, "broke": 1.2, "rude": 1.6, "useless": 1.6,
+    "difficult": 1.0, "hard": 0.6, "confusing": 1.1, "confused": 0.9, "expensive": 0.9,
+    "overpriced": 1.3, "late": 0.8, "delay": 0.9, "delayed": 1.0, "problem": 0.9,
+    "problems": 0.9, "issue": 0.7, "issues": 0.7, "bug": 0.9, "bugs": 0.9,
+    "crash": 1.2, "crashes": 1.2, "crashed": 1.2, "fail": 1.2, "failed": 1.2,
+    "failure": 1.3, "wrong": 1.0, "missing": 0.8, "dirty": 1.2, "noisy": 0.9,
+    "negative": 1.0, "complaint": 1.0, "refund": 0.8, "waste": 1.4, "wasted": 1.4,
+    "unacceptable": 1.8, "sad": 1.2, "upset": 1.4, "scam": 2.0,
+    "defective": 1.5, "damaged": 1.3, "unreliable": 1.3, "unhelpful": 1.4,
+    "mediocre": 1.3, "meh": 0.8, "lousy": 1.5, "subpar": 1.4,
+}
+
+_NEGATIONS = {"not", "no", "never", "dont", "don't", "didnt", "didn't", "isnt", "isn't",
+              "wasnt", "wasn't", "cant", "can't", "couldnt", "couldn't", "wont", "won't",
+              "hardly", "barely", "without", "nothing", "neither", "nor"}
+
+_INTENSIFIERS = {"very": 1.5, "really": 1.4, "extremely": 1.8, "so": 1.3, "super": 1.5,
+                 "incredibly": 1.8, "absolutely": 1.7, "totally": 1.5, "quite": 1.2,
+                 "too": 1.3, "slightly": 0.6, "somewhat": 0.7, "bit": 0.7}
+
+# Clause markers after which the sentiment of the rest of the sentence dominates
+_CONTRAST_WORDS = {"but", "however", "although", "though", "yet"}
+
+# "good at best" is faint praise, the lexicon word after "at" carries no sentiment
+_HEDGED_AFTER = {"at"}
+
+# Common English function words, used to decide whether the text is English at all
+_ENGLISH_STOPWORDS = {"the", "a", "an", "and", "or", "is", "are", "was", "were", "be",
+                      "i", "you", "he", "she", "it", "we", "they", "my", "your", "our",
+                      "this", "that", "to", "of", "in", "on", "for", "with", "at", "from",
+                      "have", "has", "had", "do", "does", "did", "not", "very", "but",
+                      "so", "me", "what", "when", "would", "could", "will", "there"}
+
+# Nouns common in short English answers ("great service"), so they do not need language identification
+_ENGLISH_ANSWER_WORDS = {"service", "product", "staff", "experience", "quality", "support", "team",
+                         "price", "food", "app", "job", "work", "everything", "overall", "people"}
+
+# Weights of the linear model mapping (positive score, negative score) to label logits
+_MODEL_WEIGHTS = {
+    "positive": (0.0, 1.6, -1.2),
+    "negative": (0.0, -1.2, 1.6),
+    "neutral": (2.0, -1.0, -1.0),
+}
+
+_TOKEN_RE = re.compile(r"[a-z']+")
+
+
+@lru_cache(maxsize=1)
+def _load_lexicon() -> Dict[str, float]:
+    """Build the signed word lexicon once per process"""
+    lexicon = {word: weight for word, weight in _POSITIVE_WORDS.items()}
+    lexicon.update({word: -weight for word, weight in _NEGATIVE_WORDS.items()})
+    if SENTIMENT_LEXICON_PATH:
+        try:
+            with open(SENTIMENT_LEXICON_PATH, "r", encoding="utf-8") as f:
+                lexicon.update({str(k).lower(): float(v) for k, v in json.load(f).items()})
+            logger.info(f"Loaded sentiment lexicon overrides from {SENTIMENT_LEXICON_PATH}")
+        except Exception as e:
+            logger.error(f"Failed to load sentiment lexicon from {SENTIMENT_LEXICON_PATH}: {str(e)}")
+    return lexicon
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower().replace("’", "'"))
+
+
+def _is_known_english_word(token: str) -> bool:
+    return (
+        token in _load_lexicon() or token in _ENGLISH_STOPWORDS or token in _NEGATIONS
+        or token in _INTENSIFIERS or token in _CONTRAST_WORDS or token in _ENGLISH_ANSWER_WORDS
+    )
+
+
+def _is_short_known_answer(tokens: List[str]) -> bool:
+    return 0 < len(tokens) < 4 and all(_is_known_english_word(t) for t in tokens)
+
+
+def _looks_english(text: str, tokens: List[str]) -> bool:
+    """Cheap check that the lexicon is applicable to this text"""
+    if not tokens:
+        return False
+    letters = [c for c in text if c.isalpha()]
+    if letters and sum(1 for c in letters if c.isascii()) / len(letters) < 0.95:
+        return False
+    if len(tokens) < 4:
+        # Too few words for the stopword ratio or trigram identification ("Great service" is en at 0.44),
+        # an answer made only of words the classifier knows is English, anything else needs a confident identification
+        if _is_short_known_answer(tokens):
+            return True
+        return is_confidently_english(text)
+    if sum(1 for t in tokens if t in _ENGLISH_STOPWORDS) / len(tokens) < 0.15:
+        return False
+    return identify_language(text)[0] == "en"
+
+
+def _score_tokens(tokens: List[str]) -> Tuple[float, float]:
+    """Accumulate positive and negative evidence with negation and intensifier handling"""
+    lexicon = _load_lexicon()
+    positive = 0.0
+    negative = 0.0
+    negate_window = 0
+    intensity = 1.0
+    previous = None
+
+    for token in tokens:
+        hedged = previous in _HEDGED_AFTER
+        previous = token
+        if token in _CONTRAST_WORDS:
+            # Down-weight everything said so far, the part after "but" usually wins
+            positive *= 0.5
+            negative *= 0.5
+            negate_window = 0
+            continue
+        if token in _NEGATIONS:
+            negate_window = 3
+            continue
+        if token in _INTENSIFIERS:
+            intensity = _INTENSIFIERS[token]
+            continue
+
+        weight = lexicon.get(token)
+        if weight is not None and not hedged:
+            weight *= intensity
+            if negate_window > 0:
+                # "not good" is weaker than "bad", "not bad" is mildly positive
+                weight = -weight * 0.6
+            if weight > 0:
+                positive += weight
+            else:
+                negative += -weight
+        intensity = 1.0
+        if negate_window > 0:
+            negate_window -= 1
+
+    # Long answers accumulate evidence, keep the scale comparable to short ones
+    scale = max(1.0, math.sqrt(len(tokens) / 12.0))
+    return positive / scale, negative / scale
+
+
+def classify_sentiment(text: str) -> Tuple[str, float, bool]:
+    """
+    Classify sentiment locally with a lexicon and a small linear model
+
+    Args:
+        text: Text to classify
+
+    Returns:
+        Tuple of (label, confidence, is_english)
+        - label: "positive", "negative", or "neutral"
+        - confidence: Probability of the label under the local model (0.0 to 1.0),
+          0.0 when no lexicon word was found since the model then only reflects its neutral prior
+        - is_english: Whether the text looked like English, the lexicon is English only
+    """
+    if not text or not text.strip():
+        return "neutral", 1.0, True
+
+    tokens = _tokenize(text)
+    is_english = _looks_english(text, tokens)
+    positive, negative = _score_tokens(tokens)
+    if not positive and not negative:
+        # "Muy malo" or "I want my money back": no evidence is not the same as neutral
+        return "neutral", 0.0, is_english
+
+    logits = {
+        label: bias + w_pos * positive + w_neg * negative
+        for label, (bias, w_pos, w_neg) in _MODEL_WEIGHTS.items()
+    }
+    max_logit = max(logits.values())
+    exps = {label: math.exp(value - max_logit) for label, value in logits.items()}
+    total = sum(exps.values())
+    label = max(exps, key=exps.get)
+    return label, exps[label] / total, is_english
+
+
+def classify_sentiment_locally(text: str, min_confidence: float = None) -> Optional[str]:
+    """
+    Return the local sentiment label when it is trustworthy, None when the caller should escalate to the LLM
+
+    Args:
+        text: Text to classify
+        min_confidence: Confidence threshold, defaults to LOCAL_SENTIMENT_CONFIDENCE, or to
+            LOCAL_SENTIMENT_SHORT_CONFIDENCE for short plain answers made only of known English words
+
+    Returns:
+        Sentiment label or None for low-confidence and non-English text, and for text without any lexicon word
+    """
+    try:
+        label, confidence, is_english = classify_sentiment(text)
+    except Exception as e:
+        logger.error(f"Local sentiment classification failed: {str(e)}")
+        return None
+
+    threshold = min_confidence
+    if threshold is None:
+        tokens = _tokenize(text)
+        # Negated and hedged answers ("not terrible", "good at best") stay on the regular threshold
+        plain = not any(t in _NEGATIONS or t in _HEDGED_AFTER for t in tokens)
+        short = plain and _is_short_known_answer(tokens)
+        threshold = LOCAL_SENTIMENT_SHORT_CONFIDENCE if short else LOCAL_SENTIMENT_CONFIDENCE
+    if is_english and confidence >= threshold:
+        logger.info(f"Local sentiment: {label} ({confidence:.2f})")
+        return label
+    return None
@@ -2,6 +2,101 @@ import os
 import requests
 import json
 from typing import Optional, Tuple
+from utils.sentiment import classify_sentiment_locally
+from utils.language_id import identify_language, is_confidently_english
+
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={api_key}"
+
+
+def prefilter_translation(text: str) -> Tuple[Optional[Tuple[Optional[str], bool, str]], str]:
+    """
+    Settle language detection locally when possible
+    
+    Returns:
+        (result of detect_language_and_translate if no Gemini call is needed, else None;
+        language hint to add to the Gemini prompt)
+    """
+    if not text or not text.strip():
+        return (None, False, "en"), ""
+    
+    # Most responses are English, the local identifier settles those without a network call
+    if is_confidently_english(text):
+        return (None, False, "en"), ""
+    
+    # Identified again for the hint only on the way to Gemini, next to which it costs nothing
+    detected_language, confidence = identify_language(text)
+    language_hint = ""
+    if confidence >= 0.5:
+        language_hint = f"A local language detector suggests the language code is \"{detected_language}\" (confidence {confidence:.2f}); verify it before relying on it."
+    return None, language_hint
+
+def translation_request(text: str, language_hint: str = "") -> dict:
+    """generateContent payload detecting the language of a text and translating it to English"""
+    prompt = f"""
+        Analyze the following text and determine if it's in English or another language.
+        
+        Text: "{text}"
+        {language_hint}
+        If the text is in English, respond with: {{"is_english": true, "translated_text": null, "language_code": "en"}}
+        
+        If the text is in another language, translate it to English and respond with: {{"is_english": false, "translated_text": "translated_english_text", "language_code": "detected_language_code"}}
+        
+        For language_code, use standard ISO 639-1 codes like: en, es, fr, de, it, pt, ru, ja, ko, zh, ar, etc.
+        
+        IMPORTANT: Respond with ONLY valid JSON. Do not use markdown code blocks, do not add any extra text, do not explain anything. Just return the JSON object.
+        """
+    
+    return {
+        "contents": [{
+            "parts": [{
+                "text": prompt
+            }]
+        }],
+        "generationConfig": {
+            "temperature": 0.1,
+            "maxOutputTokens": 1000
+        }
+    }
+
+def parse_translation_response(result: dict) -> Tuple[Optional[str], bool, str]:
+    """Result of detect_language_and_translate from a generateContent response"""
+    if "candidates" in result and len(result["candidates"]) > 0:
+        content = result["candidates"][0]["content"]["parts"][0]["text"]
+        
+        # Parse the JSON response
+        try:
+            # Clean the response - remove markdown code blocks if present
+            cleaned_content = content.strip()
+            if cleaned_content.startswith("```json"):
+                cleaned_content = cleaned_content[7:]  # Remove ```json
+            if cleaned_content.startswith("```"):
+                cleaned_content = cleaned_content[3:]   # Remove ```
+            if cleaned_content.endswith("```"):
+                cleaned_content = cleaned_content[:-3]  # Remove trailing ```
+            
+            cleaned_content = cleaned_content.strip()
+            print(f"Cleaned Gemini response: {cleaned_content}")
+            
+            parsed = json.loads(cleaned_content)
+            is_english = parsed.get("is_english", True)
+            translated_text = parsed.get("translated_text")
+            language_code = parsed.get("language_code", "en")
+            
+            # Ensure proper UTF-8 encoding for translated text
+            if translated_text and isinstance(translated_text, str):
+                translated_text = translated_text.encode('utf-8').decode('utf-8')
+            
+            if is_english:
+                return None, False, language_code
+            else:
+                return translated_text, True, language_code
+        except json.JSONDecodeError as e:
+            print(f"Failed to parse Gemini response: {content}")
+            print(f"JSON decode error: {str(e)}")
+            return None, False, "en"
+    else:
+        print("No candidates in Gemini response")
+        return None, False, "en"
 
 def detect_language_and_translate(text: str) -> Tuple[Optional[str], bool, str]:
     """
@@ -16,8 +111,9 @@ def detect_language_and_translate(text: str) -> Tuple[Optional[str], bool, str]:
         - is_translated: Boolean indicating if translation was performed
         - language_code: Detected language code (e.g., 'en', 'es', 'fr', 'de')
     """
-    if not text or not text.strip():
-        return None, False, "en"
+    local_result, language_hint = prefilter_translation(text)
+    if local_result:
+        return local_result
     
     try:
         # Use Gemini to detect language and translate if needed
@@ -25,89 +121,105 @@ def detect_language_and_translate(text: str) -> Tuple[Optional[str], bool, str]:
         if not api_key:
             print("GEMINI_API_KEY not found")
             return None, False, "en"
-            
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={api_key}"
-        
-        prompt = f"""
-        Analyze the following text and determine if it's in English or another language.
-        
-        Text: "{text}"
-        
-        If the text is in English, respond with: {{"is_english": true, "translated_text": null, "language_code": "en"}}
-        
-        If the text is in another language, translate it to English and respond with: {{"is_english": false, "translated_text": "translated_english_text", "language_code": "detected_language_code"}}
-        
-        For language_code, use standard ISO 639-1 codes like: en, es, fr, de, it, pt, ru, ja, ko, zh, ar, etc.
-        
-        IMPORTANT: Respond with ONLY valid JSON. Do not use markdown code blocks, do not add any extra text, do not explain anything. Just return the JSON object.
-        """
-        
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }],
-            "generationConfig": {
-                "temperature": 0.1,
-                "maxOutputTokens": 1000
-            }
-        }
         
         headers = {
             "Content-Type": "application/json"
         }
         
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
+        response = requests.post(GEMINI_URL.format(api_key=api_key), json=translation_request(text, language_hint), headers=headers, timeout=30)
         response.raise_for_status()
         
-        result = response.json()
-        
-        if "candidates" in result and len(result["candidates"]) > 0:
-            content = result["candidates"][0]["content"]["parts"][0]["text"]
-            
-            # Parse the JSON response
-            try:
-                # Clean the response - remove markdown code blocks if present
-                cleaned_content = content.strip()
-                if cleaned_content.startswith("```json"):
-                    cleaned_content = cleaned_content[7:]  # Remove ```json
-                if cleaned_content.startswith("```"):
-                    cleaned_content = cleaned_content[3:]   # Remove ```
-                if cleaned_content.endswith("```"):
-                    cleaned_content = cleaned_content[:-3]  # Remove trailing ```
-                
-                cleaned_content = cleaned_content.strip()
-                print(f"Cleaned Gemini response: {cleaned_content}")
-                
-                parsed = json.loads(cleaned_content)
-                is_english = parsed.get("is_english", True)
-                translated_text = parsed.get("translated_text")
-                language_code = parsed.get("language_code", "en")
-                
-                # Ensure proper UTF-8 encoding for translated text
-                if translated_text and isinstance(translated_text, str):
-                    translated_text = translated_text.encode('utf-8').decode('utf-8')
-                
-                if is_english:
-                    return None, False, language_code
-                else:
-                    return translated_text, True, language_code
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse Gemini response: {content}")
-                print(f"JSON decode error: {str(e)}")
-                return None, False, "en"
-        else:
-            print("No candidates in Gemini response")
-            return None, False, "en"
+        return parse_translation_response(response.json())
             
     except Exception as e:
         print(f"Error in language detection and translation: {str(e)}")
         return None, False, "en"
 
+def sentiment_request(text: str) -> dict:
+    """generateContent payload classifying the sentiment of a text"""
+    prompt = f"Classify the sentiment of the following text. Text: \"{text}\""
+    
+    return {
+        "contents": [{
+            "parts": [{
+                "text": prompt
+            }]
+        }],
+        "generationConfig": {
+            "temperature": 0.0,
+            "maxOutputTokens": 128,
+            "responseMimeType": "application/json",
+            "responseSchema": {
+                "type": "OBJECT",
+                "properties": {
+                    "sentiment": { "type": "STRING", "enum": ["positive","negative","neutral"] }
+                },
+                "required": ["sentiment"]
+            }
+        }
+    }
+
+def _candidate_text(result: dict) -> Optional[str]:
+    """Text of the first candidate of a generateContent response, whatever shape it came in"""
+    candidates = result.get("candidates") or []
+    if not candidates:
+        return None
+    candidate = candidates[0] or {}
+    content = candidate.get("content") or {}
+    parts = content.get("parts") or []
+    text_val = None
+    if parts:
+        first = parts[0]
+        if isinstance(first, dict) and isinstance(first.get("text"), str):
+            text_val = first.get("text")
+    if not text_val and isinstance(candidate.get("text"), str):
+        text_val = candidate.get("text")
+    if not text_val and isinstance(candidate.get("output_text"), str):
+        text_val = candidate.get("output_text")
+    return text_val
+
+def _raw_snippet(result: dict) -> str:
+    try:
+        return json.dumps(result)[:2000]
+    except Exception:
+        return str(result)[:2000]
+
+def parse_sentiment_response(result: dict) -> str:
+    """Sentiment label from a generateContent response, neutral when it cannot be read"""
+    if not result.get("candidates"):
+        print("No candidates in sentiment response")
+        return "neutral"
+    text_val = _candidate_text(result)
+    if not text_val:
+        print(f"Error in sentiment analysis: Unexpected response shape. Raw (truncated): {_raw_snippet(result)}")
+        return "neutral"
+    # Parse JSON with optional quotes or code fences
+    raw = (text_val or "").strip()
+    if raw.startswith("```json"):
+        raw = raw[7:]
+    if raw.startswith("```"):
+        raw = raw[3:]
+    if raw.endswith("```"):
+        raw = raw[:-3]
+    raw = raw.strip()
+    try:
+        data = json.loads(raw)
+        sentiment = (data.get("sentiment") or "").strip().lower()
+        if sentiment in ["positive","negative","neutral"]:
+            return sentiment
+    except Exception:
+        pass
+    # Fallback: treat raw text as direct label
+    fallback = raw.lower()
+    if fallback in ["positive","negative","neutral"]:
+        return fallback
+    print(f"Unexpected sentiment response: {raw}")
+    return "neutral"
+
 def analyze_sentiment(text: str) -> str:
     """
-    Analyze sentiment of text using Gemini.
+    Analyze sentiment of text, using the local classifier first and Gemini for
+    low-confidence or non-English text.
     
     Args:
         text: The text to analyze for sentiment
@@ -118,118 +230,32 @@ def analyze_sentiment(text: str) -> str:
     if not text or not text.strip():
         return "neutral"
     
+    local_sentiment = classify_sentiment_locally(text)
+    if local_sentiment:
+        return local_sentiment
+    
     try:
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             print("GEMINI_API_KEY not found")
             return "neutral"
-            
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={api_key}"
-        
-        prompt = f"Classify the sentiment of the following text. Text: \"{text}\""
-        
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }],
-            "generationConfig": {
-                "temperature": 0.0,
-                "maxOutputTokens": 128,
-                "responseMimeType": "application/json",
-                "responseSchema": {
-                    "type": "OBJECT",
-                    "properties": {
-                        "sentiment": { "type": "STRING", "enum": ["positive","negative","neutral"] }
-                    },
-                    "required": ["sentiment"]
-                }
-            }
-        }
         
         headers = {
             "Content-Type": "application/json"
         }
         
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
+        response = requests.post(GEMINI_URL.format(api_key=api_key), json=sentiment_request(text), headers=headers, timeout=30)
         response.raise_for_status()
         
-        result = response.json()
-        candidates = result.get("candidates") or []
-        if not candidates:
-            print("No candidates in sentiment response")
-            return "neutral"
-        candidate = candidates[0] or {}
-        content = candidate.get("content") or {}
-        parts = content.get("parts") or []
-        text_val = None
-        if parts:
-            first = parts[0]
-            if isinstance(first, dict) and isinstance(first.get("text"), str):
-                text_val = first.get("text")
-        if not text_val and isinstance(candidate.get("text"), str):
-            text_val = candidate.get("text")
-        if not text_val and isinstance(candidate.get("output_text"), str):
-            text_val = candidate.get("output_text")
-        if not text_val:
-            try:
-                import json as _json
-                snippet = _json.dumps(result)[:2000]
-            except Exception:
-                snippet = str(result)[:2000]
-            print(f"Error in sentiment analysis: Unexpected response shape. Raw (truncated): {snippet}")
-            return "neutral"
-        # Parse JSON with optional quotes or code fences
-        raw = (text_val or "").strip()
-        if raw.startswith("```json"):
-            raw = raw[7:]
-        if raw.startswith("```"):
-            raw = raw[3:]
-        if raw.endswith("```"):
-            raw = raw[:-3]
-        raw = raw.strip()
-        import json as _json
-        try:
-            data = _json.loads(raw)
-            sentiment = (data.get("sentiment") or "").strip().lower()
-            if sentiment in ["positive","negative","neutral"]:
-                return sentiment
-        except Exception:
-            pass
-        # Fallback: treat raw text as direct label
-        fallback = raw.lower()
-        if fallback in ["positive","negative","neutral"]:
-            return fallback
-        print(f"Unexpected sentiment response: {raw}")
-        return "neutral"
+        return parse_sentiment_response(response.json())
         
     except Exception as e:
         print(f"Error in sentiment analysis: {str(e)}")
         return "neutral"
 
-def extract_categories_from_text(text: str) -> list:
-    """
-    Extract categories from text using Gemini.
-    
-    Args:
-        text: The text to analyze for categories
-        
-    Returns:
-        List of category dictionaries
-    """
-    if not text or not text.strip():
-        return []
-    
-    try:
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            print("GEMINI_API_KEY not found")
-            return []
-            
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={api_key}"
-        
-        prompt = f"""
+def categories_request(text: str) -> dict:
+    """generateContent payload extracting the categories of a text"""
+    prompt = f"""
         Analyze the following text and extract relevant categories/topics.
         
         Text: "{text}"
@@ -252,80 +278,85 @@ def extract_categories_from_text(text: str) -> list:
         
         Respond with ONLY valid JSON array. Do not use markdown code blocks, do not add any extra text, do not explain anything. Just return the JSON array.
         """
-        
-        payload = {
-            "contents": [{
-                "parts": [{
-                    "text": prompt
-                }]
-            }],
-            "generationConfig": {
-                "temperature": 0.3,
-                "maxOutputTokens": 4096,
-                "responseMimeType": "application/json"
-            }
+    
+    return {
+        "contents": [{
+            "parts": [{
+                "text": prompt
+            }]
+        }],
+        "generationConfig": {
+            "temperature": 0.3,
+            "maxOutputTokens": 4096,
+            "responseMimeType": "application/json"
         }
+    }
+
+def parse_categories_response(result: dict) -> list:
+    """Categories from a generateContent response, empty when they cannot be read"""
+    if not result.get("candidates"):
+        print("No candidates in categories response")
+        return []
+    text_val = _candidate_text(result)
+    if not text_val:
+        print(f"Error in category extraction: Unexpected response shape. Raw (truncated): {_raw_snippet(result)}")
+        return []
+    # Parse the JSON response
+    try:
+        cleaned_content = text_val.strip()
+        if cleaned_content.startswith("```json"):
+            cleaned_content = cleaned_content[7:]
+        if cleaned_content.startswith("```"):
+            cleaned_content = cleaned_content[3:]
+        if cleaned_content.endswith("```"):
+            cleaned_content = cleaned_content[:-3]
+        cleaned_content = cleaned_content.strip()
+        print(f"Cleaned categories response: {cleaned_content}")
+        categories = json.loads(cleaned_content)
+        if isinstance(categories, list):
+            for category in categories:
+                if 'name' in category and isinstance(category['name'], str):
+                    category['name'] = category['name'].encode('utf-8').decode('utf-8')
+                if 'keywords' in category and isinstance(category['keywords'], list):
+                    category['keywords'] = [
+                        keyword.encode('utf-8').decode('utf-8')
+                        if isinstance(keyword, str) else keyword
+                        for keyword in category['keywords']
+                    ]
+            return categories
+        return []
+    except json.JSONDecodeError as e:
+        print(f"Failed to parse categories response: {text_val}")
+        print(f"JSON decode error: {str(e)}")
+        return []
+
+def extract_categories_from_text(text: str) -> list:
+    """
+    Extract categories from text using Gemini.
+    
+    Args:
+        text: The text to analyze for categories
+        
+    Returns:
+        List of category dictionaries
+    """
+    if not text or not text.strip():
+        return []
+    
+    try:
+        api_key = os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            print("GEMINI_API_KEY not found")
+            return []
         
         headers = {
             "Content-Type": "application/json"
         }
         
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
+        response = requests.post(GEMINI_URL.format(api_key=api_key), json=categories_request(text), headers=headers, timeout=30)
         response.raise_for_status()
         
-        result = response.json()
-        candidates = result.get("candidates") or []
-        if not candidates:
-            print("No candidates in categories response")
-            return []
-        candidate = candidates[0] or {}
-        content = candidate.get("content") or {}
-        parts = content.get("parts") or []
-        text_val = None
-        if parts:
-            first = parts[0]
-            if isinstance(first, dict) and isinstance(first.get("text"), str):
-                text_val = first.get("text")
-        if not text_val and isinstance(candidate.get("text"), str):
-            text_val = candidate.get("text")
-        if not text_val and isinstance(candidate.get("output_text"), str):
-            text_val = candidate.get("output_text")
-        if not text_val:
-            try:
-                import json as _json
-                snippet = _json.dumps(result)[:2000]
-            except Exception:
-                snippet = str(result)[:2000]
-            print(f"Error in category extraction: Unexpected response shape. Raw (truncated): {snippet}")
-            return []
-        # Parse the JSON response
-        try:
-            cleaned_content = text_val.strip()
-            if cleaned_content.startswith("```json"):
-                cleaned_content = cleaned_content[7:]
-            if cleaned_content.startswith("```"):
-                cleaned_content = cleaned_content[3:]
-            if cleaned_content.endswith("```"):
-                cleaned_content = cleaned_content[:-3]
-            cleaned_content = cleaned_content.strip()
-            print(f"Cleaned categories response: {cleaned_content}")
-            categories = json.loads(cleaned_content)
-            if isinstance(categories, list):
-                for category in categories:
-                    if 'name' in category and isinstance(category['name'], str):
-                        category['name'] = category['name'].encode('utf-8').decode('utf-8')
-                    if 'keywords' in category and isinstance(category['keywords'], list):
-                        category['keywords'] = [
-                            keyword.encode('utf-8').decode('utf-8')
-                            if isinstance(keyword, str) else keyword
-                            for keyword in category['keywords']
-                        ]
-                return categories
-            return []
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse categories response: {text_val}")
-            print(f"JSON decode error: {str(e)}")
-            return []
+        return parse_categories_response(response.json())
             
     except Exception as e:
         print(f"Error in category extraction: {str(e)}")